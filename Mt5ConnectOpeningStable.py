@@ -1,6 +1,7 @@
 import MetaTrader5 as mt5
-import time
-import pandas as pd
+
+from poll_scheduler import scheduler_from_env
+from symbol_mapper import load_mapping
 
 # Master Account (Source)
 MASTER_LOGIN = 9094029  # Your Master account login
@@ -15,22 +16,17 @@ SLAVE_SERVER = "Exness-MT5Trial7"
 # CSV File Path
 CSV_FILE = "symbol_mapping.csv"
 
+# Poll interval bounds (seconds): 5 s when idle, faster right after a copy
+POLL_MIN_INTERVAL = 0.05
+POLL_MAX_INTERVAL = 5
+
 # Store existing trade IDs (to ignore old trades)
 existing_trades = set()
 
 
-# Function to read CSV and create a symbol mapping dictionary
+# Function to read CSV and create a symbol mapping dictionary (csv module, no pandas; see symbol_mapper.py)
 def load_symbol_mapping(csv_file):
-    try:
-        df = pd.read_csv(csv_file)
-        if not all(col in df.columns for col in ["master_symbol", "slave_symbol", "slave_lot"]):
-            print("❌ CSV file must contain 'master_symbol', 'slave_symbol', and 'slave_lot' columns.")
-            return {}
-        return {row["master_symbol"]: {"slave_symbol": row["slave_symbol"], "slave_lot": float(row["slave_lot"])}
-                for _, row in df.iterrows()}
-    except Exception as e:
-        print(f"❌ Error reading CSV file: {e}")
-        return {}
+    return load_mapping(csv_file)
 
 
 # Function to connect to an MT5 account
@@ -60,21 +56,22 @@ def record_existing_trades():
     print(f"ℹ️ Ignoring {len(existing_trades)} existing trades.")
 
 
-# Function to copy trades to Slave account only when new trade appears
+# Function to copy trades to Slave account only when new trade appears.
+# Returns True if there were new trades to copy.
 def copy_trades(symbol_mapping, master_trades):
     global existing_trades
 
     new_trades = [trade for trade in master_trades if trade.ticket not in existing_trades]
 
     if not new_trades:
-        return  # No new trades, no need to switch accounts
+        return False  # No new trades, no need to switch accounts
 
     print("🔍 New trades detected! Switching to Slave account to copy trades...")
 
     # **Switch to Slave Account only when new trades are found**
     if not connect_mt5(SLAVE_LOGIN, SLAVE_PASSWORD, SLAVE_SERVER):
         print("❌ ERROR: Failed to switch to Slave account.")
-        return
+        return True
 
     for trade in new_trades:
         master_symbol = trade.symbol
@@ -123,7 +120,7 @@ def copy_trades(symbol_mapping, master_trades):
     print("🔄 Switching back to Master account...")
     if not connect_mt5(MASTER_LOGIN, MASTER_PASSWORD, MASTER_SERVER):
         print("❌ ERROR: Failed to switch back to Master account.")
-        return
+    return True
 
 
 # Main function to run the trade copier
@@ -139,12 +136,16 @@ def trade_copier():
     record_existing_trades()  # Store existing trades before starting copying
 
     print("📡 Monitoring for new trades...")
+    scheduler = scheduler_from_env(POLL_MIN_INTERVAL, POLL_MAX_INTERVAL)
 
     # Continuous Monitoring for New Trades
     while True:
         master_trades = get_master_trades()
-        copy_trades(symbol_mapping, master_trades)  # Copy only when new trade appears
-        time.sleep(5)  # Check every 5 seconds
+        if copy_trades(symbol_mapping, master_trades):  # Copy only when new trade appears
+            scheduler.mark_activity()
+        if scheduler.report_due():
+            print(scheduler.summary())
+        scheduler.wait()
 
 
 # Run the trade copier
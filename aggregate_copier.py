@@ -0,0 +1,250 @@
+"""
+Many master accounts copied into one slave account (aggregation).
+
+One master watcher per master (dual_copier.master_watcher, each on its own
+terminal) polls concurrently and publishes its snapshots, tagged with the
+master login, onto one merged queue. A single slave executor, logged into the
+slave terminal once, drains that queue and each loop:
+- diffs every master's newest snapshot against that master's previous one;
+- takes at most one slave positions snapshot for all masters together;
+- sends the orders of every master in one dispatch (order_dispatch.py).
+
+Each master keeps its own namespace on the slave side: a private mt5_connect
+instance holding its ticket mapping and existing trades, its own symbol
+mapping and lot multiplier, and its own magic number on the slave orders.
+The magic keeps restart reconciliation (copier_state.reconcile) from claiming
+or closing another master's copies when tickets of different servers
+collide. Filling modes and slave contract specs are per slave symbol and are
+shared. Copies of different masters on the same symbol are separate positions,
+so the slave account should be a hedging account.
+
+Masters are listed in masters.csv:
+    login,password,server,terminal_path,symbol_mapping,lot_multiplier,magic
+    5001,secret,SignalsA-Live,C:\\MT5 Signal A\\terminal64.exe,mapping_a.csv,1.0,
+    5002,secret,SignalsB-Live,C:\\MT5 Signal B\\terminal64.exe,mapping_b.csv,0.5,
+`magic` defaults to the master login. The slave comes from credentials.csv
+(slave_* rows and slave_terminal_path).
+
+Run:
+    python mt5_connect.py --aggregate
+    (or python aggregate_copier.py)
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+
+import MetaTrader5 as mt5
+
+import dual_copier
+import mt5_connect
+import order_log
+from fanout_copier import isolated_copier, load_accounts
+from order_dispatch import dispatcher_from_env
+from position_diff import OPEN, PositionDiffEngine
+from symbol_mapper import MappingWatcher
+
+MASTERS_FILE = "masters.csv"
+
+
+class MasterBook:
+    """Slave-side state of one master: its mt5_connect instance, symbol mapping and diff engine."""
+
+    def __init__(self, master, copier, mapping_watcher):
+        self.master = master
+        self.copier = copier
+        self.mapping_watcher = mapping_watcher
+        self.engine = None
+
+    @property
+    def symbol_mapping(self):
+        # Current table of the master's mapping file (swapped in the background on edits)
+        return self.mapping_watcher.mapping
+
+    def needs_slave_positions(self, events):
+        """True if `events` modify or close a position copied for this master (their orders share a slave snapshot)."""
+        return any(e.kind != OPEN and e.ticket in self.copier.order_mapping for e in events)
+
+
+def _open_book(master):
+    copier = isolated_copier()
+    if not copier.load_credentials():
+        return None
+    copier.MASTER_LOGIN, copier.MASTER_PASSWORD, copier.MASTER_SERVER = master.login, master.password, master.server
+    copier.MASTER_TERMINAL_PATH = master.terminal_path
+    copier.COPIER_MAGIC = master.magic if master.magic is not None else master.login
+    # Per slave symbol, not per master: share them with the executor's own module
+    copier.filling_modes = mt5_connect.filling_modes
+    copier.slave_symbols = mt5_connect.slave_symbols
+    # One set of stage timers for the whole executor
+    copier.stage_metrics = mt5_connect.stage_metrics
+    mapping_watcher = MappingWatcher(master.symbol_mapping, master.lot_multiplier)
+    if not mapping_watcher.mapping:
+        print(f"❌ No symbol mapping found in {master.symbol_mapping} for Master {master.login}.")
+        return None
+    return MasterBook(master, copier, mapping_watcher)
+
+
+def _drain(merged, timeout):
+    """Block for one message, then take everything else queued (in order)."""
+    messages = [merged.get(timeout=timeout)]
+    while True:
+        try:
+            messages.append(merged.get_nowait())
+        except queue.Empty:
+            return messages
+
+
+def _apply_pass(books, latest):
+    pending = []
+    for login, book in books.items():
+        symbol_mapping = book.symbol_mapping  # one table per master per pass
+        events = book.copier._pass_events(book.engine, latest[login], symbol_mapping)[0]
+        if events:
+            pending.append((book, events, symbol_mapping))
+    if not pending:
+        return
+
+    # One slave snapshot for every master's modify / partial / close orders
+    slave_positions = None
+    if any(book.needs_slave_positions(events) for book, events, _ in pending):
+        slave_positions = mt5_connect.get_slave_positions()
+    jobs = []
+    for book, events, symbol_mapping in pending:
+        if symbol_mapping is not book.copier._warmed_mapping:
+            book.copier.warm_slave_symbols(symbol_mapping)  # reloaded mapping: load its new slave symbols
+        jobs += [
+            ((book.master.login, ticket), job)
+            for ticket, job in book.copier._event_jobs(events, symbol_mapping, slave_positions)
+        ]
+    mt5_connect.order_dispatcher.run(jobs)
+    mt5_connect.filling_modes.flush()
+    for book, events, _ in pending:
+        book.copier._retry_failed_orders(events, book.engine)
+
+
+# -----------------------------------------------------------------------------
+# Slave executor: one slave session for all masters
+# -----------------------------------------------------------------------------
+def aggregate_executor(merged, stop_event, masters):
+    mt5_connect.exit_on_terminate()  # as a process: flush the order log on SIGTERM too
+    if not mt5_connect.load_credentials():
+        print("❌ Failed to load credentials. Executor exiting.")
+        stop_event.set()
+        return
+    books = {}
+    for master in masters:
+        book = _open_book(master)
+        if book is None:
+            stop_event.set()
+            return
+        books[master.login] = book
+    if not dual_copier.connect_terminal(mt5_connect.SLAVE_TERMINAL_PATH, mt5_connect.SLAVE_LOGIN,
+                                        mt5_connect.SLAVE_PASSWORD, mt5_connect.SLAVE_SERVER):
+        stop_event.set()
+        return
+    for book in books.values():
+        book.copier.warm_slave_symbols(book.symbol_mapping)
+        book.mapping_watcher.start()
+    mt5_connect.order_dispatcher = dispatcher_from_env(mt5_connect.SLAVE_TERMINAL_PATH)
+
+    try:
+        # The first snapshot of every master is what was open when the copier started: ignore it.
+        initial, latest = {}, {}
+        while len(initial) < len(books) and not stop_event.is_set():
+            try:
+                for message in _drain(merged, dual_copier.EXECUTOR_WAIT):
+                    if message.seq == 0:
+                        initial[message.master_login] = message.positions
+                    else:
+                        latest[message.master_login] = message.positions
+            except queue.Empty:
+                continue
+        if len(initial) < len(books):
+            return
+
+        slave_positions = mt5_connect.get_slave_positions()
+        for login, book in books.items():
+            book.copier.existing_trades = {t.ticket for t in initial[login]}
+            book.engine = PositionDiffEngine(initial[login])
+            print(f"ℹ️ Master {login}: ignoring {len(book.copier.existing_trades)} existing trades.")
+            to_close = book.copier.restore_state(initial[login], slave_positions)
+            if to_close:
+                print(f"🔍 Master {login} closed copied trades while the copier was down! Closing on Slave...")
+                book.copier._do_sync_closures(to_close, slave_positions=slave_positions)
+            latest.setdefault(login, initial[login])
+        print(f"📡 Slave executor ready: {len(books)} master(s) → Slave {mt5_connect.SLAVE_LOGIN}.")
+
+        while not stop_event.is_set():
+            try:
+                for message in _drain(merged, dual_copier.EXECUTOR_WAIT):
+                    latest[message.master_login] = message.positions
+            except queue.Empty:
+                pass  # diff the last snapshots again so failed copies are retried
+            _apply_pass(books, latest)
+    finally:
+        for book in books.values():
+            book.mapping_watcher.stop()
+        if mt5_connect.order_dispatcher is not None:
+            mt5_connect.order_dispatcher.shutdown()
+        # multiprocessing children exit without running atexit: flush the order log here
+        order_log.close()
+        mt5.shutdown()
+
+
+# -----------------------------------------------------------------------------
+# Runner
+# -----------------------------------------------------------------------------
+def run_aggregate_copier(masters=None, use_threads=False, stop_event=None):
+    """
+    Start one watcher per master and the slave executor, and wait for them.
+    `use_threads=True` runs everything in this process (for the simulator in mt5_sim.py).
+    """
+    masters = masters if masters is not None else load_accounts(MASTERS_FILE)
+    if not masters:
+        print(f"❌ No masters found in {MASTERS_FILE}. Exiting.")
+        return
+
+    if use_threads:
+        merged = queue.Queue()
+        stop_event = stop_event or threading.Event()
+        workers = [
+            threading.Thread(target=dual_copier.master_watcher, args=([merged], stop_event, master),
+                             name=f"master-watcher-{master.login}")
+            for master in masters
+        ]
+        workers.append(threading.Thread(target=aggregate_executor, args=(merged, stop_event, masters),
+                                        name="slave-executor"))
+    else:
+        merged = multiprocessing.Queue()
+        stop_event = stop_event or multiprocessing.Event()
+        workers = [
+            multiprocessing.Process(target=dual_copier.master_watcher, args=([merged], stop_event, master),
+                                    name=f"master-watcher-{master.login}")
+            for master in masters
+        ]
+        workers.append(multiprocessing.Process(target=aggregate_executor, args=(merged, stop_event, masters),
+                                               name="slave-executor"))
+
+    for worker in workers:
+        worker.start()
+    print(f"📡 Aggregating copier running: {len(masters)} master watcher(s) → 1 slave executor. (Stop with Ctrl+C)")
+    try:
+        while any(w.is_alive() for w in workers):
+            if stop_event.is_set():
+                break
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        print("\nStopping...")
+    finally:
+        stop_event.set()
+        for worker in workers:
+            worker.join(timeout=5)
+        order_log.close()
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    mt5_connect.exit_on_terminate()
+    run_aggregate_copier()
@@ -0,0 +1,581 @@
+"""
+End-to-end copy-latency benchmark on the simulated MetaTrader5 backend (mt5_sim.py).
+
+- Runs a copier entry point unchanged: mt5_connect.trade_copier,
+  dual_copier.run_dual_copier, fanout_copier.run_fanout_copier,
+  aggregate_copier.run_aggregate_copier,
+  Mt5ConnectOpeningStable.trade_copier or
+  master_feed.main.
+- Scripts master-side activity (single trades, baskets, mass closes, SL/TP
+  storms, partial closes) through the simulated broker.
+- Reports, per scenario and event kind, the latency from the master change to
+  the copier detecting it and to the slave fill (or, for master_feed, to the
+  change being published).
+
+Usage:
+    python bench_copier.py
+    python bench_copier.py --target dual
+    python bench_copier.py --target fanout --slaves 10
+    python bench_copier.py --target aggregate --masters 5
+    python bench_copier.py --scenarios scaling --sizes 10 100 500 1000 2000 --order-ms 5
+    python bench_copier.py --target stable --scenarios single basket
+    python bench_copier.py --target feed
+    python bench_copier.py --login-ms 120 --order-ms 350 --json results.json
+    python bench_copier.py --scenarios basket --orderlog sync --log-ms 2   # vs. --orderlog async
+    python bench_copier.py --scenarios basket mass_close --workers 8      # vs. --workers 1
+"""
+
+import argparse
+import contextlib
+import importlib
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import mt5_sim
+
+MASTER_LOGIN = 5001
+SLAVE_LOGIN = 6001
+PASSWORD = "sim"
+MASTER_SERVER = "Sim-Master"
+SLAVE_SERVER = "Sim-Slave"
+SYMBOLS = ["EURUSD", "GBPUSD", "USDJPY", "XAUUSD", "AUDCAD"]
+SLAVE_SUFFIX = ".s"
+
+ALL_KINDS = ("open", "modify", "partial", "close")
+
+
+# -----------------------------------------------------------------------------
+# Stats helpers
+# -----------------------------------------------------------------------------
+def percentile(values, q):
+    """Linear-interpolated percentile (q in 0..100) of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    pos = (len(ordered) - 1) * q / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def summarize(values):
+    return {
+        "n": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+
+def fmt_ms(value):
+    return "-" if value is None else f"{value:8.1f}"
+
+
+# -----------------------------------------------------------------------------
+# Bench environment: temp working dir with credentials/mapping, simulated broker
+# -----------------------------------------------------------------------------
+def write_inputs(workdir, master_login, slave_login, symbols, lot=1.0, extra=None):
+    with open(os.path.join(workdir, "credentials.csv"), "w", encoding="utf-8") as f:
+        f.write("Title,Value\n")
+        f.write(f"master_login,{master_login}\nmaster_password,{PASSWORD}\nmaster_server,{MASTER_SERVER}\n")
+        f.write(f"slave_login,{slave_login}\nslave_password,{PASSWORD}\nslave_server,{SLAVE_SERVER}\n")
+        for title, value in (extra or {}).items():
+            f.write(f"{title},{value}\n")
+    with open(os.path.join(workdir, "symbol_mapping.csv"), "w", encoding="utf-8") as f:
+        f.write("master_symbol,slave_symbol,slave_lot\n")
+        for sym in symbols:
+            f.write(f"{sym},{sym}{SLAVE_SUFFIX},{lot}\n")
+
+
+def build_broker(args, master_logins, slave_logins, symbols):
+    latency = mt5_sim.SimLatency(
+        login=args.login_ms / 1000.0,
+        order_send=args.order_ms / 1000.0,
+        query=args.query_ms / 1000.0,
+        jitter=args.jitter,
+    )
+    broker = mt5_sim.install(mt5_sim.SimBroker(latency=latency, seed=args.seed))
+    for master in master_logins:
+        broker.add_account(master, PASSWORD, MASTER_SERVER, symbols=symbols, master=True)
+    for slave in slave_logins:
+        acc = broker.add_account(slave, PASSWORD, SLAVE_SERVER, symbols=[s + SLAVE_SUFFIX for s in symbols])
+        broker.symbol_maps[slave] = {s: s + SLAVE_SUFFIX for s in symbols}
+        if args.filling == "mixed":
+            # FOK-only, RETURN-only and IOC-only symbols next to the usual FOK|IOC ones
+            masks = [mt5_sim.SYMBOL_FILLING_FOK, 0, mt5_sim.SYMBOL_FILLING_FOK | mt5_sim.SYMBOL_FILLING_IOC,
+                     mt5_sim.SYMBOL_FILLING_IOC]
+            for i, sym in enumerate(symbols):
+                acc.symbols[sym + SLAVE_SUFFIX].filling_mode = masks[i % len(masks)]
+    return broker
+
+
+class FeedWatcher:
+    """Stands in for the slave EA: marks events as filled once master_feed publishes them."""
+
+    CONSUMER = "feed"
+
+    def __init__(self, broker, get_state):
+        self.broker = broker
+        self.get_state = get_state
+        self.stopped = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        previous = {}
+        while not self.stopped:
+            state = self.get_state()
+            if state:
+                current = {p["ticket"]: (p["volume"], p["sl"], p["tp"]) for p in state["positions"]}
+                if current != previous:
+                    self._mark(previous, current)
+                    previous = current
+            time.sleep(0.0005)
+
+    def _mark(self, previous, current):
+        now = time.perf_counter()
+        changes = []
+        for ticket, (volume, sl, tp) in current.items():
+            old = previous.get(ticket)
+            if old is None:
+                changes.append(("open", ticket))
+            elif volume < old[0]:
+                changes.append(("partial", ticket))
+            elif (sl, tp) != old[1:]:
+                changes.append(("modify", ticket))
+        changes.extend(("close", ticket) for ticket in previous if ticket not in current)
+        with self.broker._lock:
+            for kind, ticket in changes:
+                for ev in self.broker.events:
+                    if ev.kind == kind and ev.master_ticket == ticket and self.CONSUMER not in ev.fills:
+                        ev.fills[self.CONSUMER] = now
+                        break
+
+
+class Bench:
+    """Owns the broker, the copier thread and the master tickets opened by scenarios."""
+
+    def __init__(self, args, broker, master_logins, kinds, fill_slaves=None):
+        self.args = args
+        self.broker = broker
+        self.kinds = kinds
+        self.fill_slaves = fill_slaves
+        self.master_logins = list(master_logins)
+        self.owner = {}  # master ticket -> master login (trades are spread over the masters)
+        self._masters = itertools.cycle(self.master_logins)
+        self.open_tickets = []
+        self.rng = random.Random(args.seed)
+        self.mark()
+
+    def mark(self):
+        """Start measuring here: drop earlier events and reset the call counters' baseline."""
+        self.broker.reset_events()
+        self.calls_before = dict(self.broker.calls)
+        self.logins_before = self.broker.logins
+        self.started = time.perf_counter()
+
+    # -- master actions --------------------------------------------------
+    def open(self, count=1, volume=0.1):
+        tickets = []
+        for _ in range(count):
+            sym = self.rng.choice(SYMBOLS)
+            master = next(self._masters)
+            ticket = self.broker.open_position(master, sym, type=self.rng.randint(0, 1), volume=volume)
+            self.owner[ticket] = master
+            tickets.append(ticket)
+        self.open_tickets.extend(tickets)
+        return tickets
+
+    def modify(self, tickets, step=0):
+        for ticket in tickets:
+            self.broker.modify_position(self.owner[ticket], ticket, sl=0.5 + step * 0.001, tp=1.5 + step * 0.001)
+
+    def partial(self, tickets):
+        for ticket in tickets:
+            pos = self.broker.accounts[self.owner[ticket]].positions[ticket]
+            self.broker.close_position(self.owner[ticket], ticket, volume=round(pos.volume / 2, 2))
+
+    def close(self, tickets):
+        for ticket in tickets:
+            self.broker.close_position(self.owner.pop(ticket), ticket)
+            self.open_tickets.remove(ticket)
+
+    # -- synchronisation -------------------------------------------------
+    def settle(self):
+        """Sleep a random fraction of a poll so events don't phase-lock with the copier loop."""
+        time.sleep(self.rng.uniform(0.0, self.args.settle_ms / 1000.0))
+
+    def wait(self, *kinds, timeout=None):
+        kinds = [k for k in kinds if k in self.kinds]
+        if not kinds:
+            return True
+        return self.broker.wait_filled(timeout=timeout or self.args.timeout, kinds=kinds, slaves=self.fill_slaves)
+
+    def warm_up(self):
+        """Open one trade and wait for its copy, so scenarios start with the copier in its loop."""
+        tickets = self.open(1)
+        self.wait("open")
+        if "close" in self.kinds:
+            self.close(tickets)
+            self.wait("close")
+        self.broker.reset_events()
+
+
+# -----------------------------------------------------------------------------
+# Scenarios: each returns once its events have been filled (or timed out)
+# -----------------------------------------------------------------------------
+def scenario_single(bench):
+    for step in range(bench.args.rounds):
+        bench.settle()
+        tickets = bench.open(1)
+        bench.wait("open")
+        if "modify" in bench.kinds:
+            bench.settle()
+            bench.modify(tickets, step)
+            bench.wait("modify")
+        if "close" in bench.kinds:
+            bench.settle()
+            bench.close(tickets)
+            bench.wait("close")
+
+
+def scenario_basket(bench):
+    bench.settle()
+    bench.open(bench.args.basket)
+    bench.wait("open")
+
+
+def scenario_mass_close(bench):
+    if "close" not in bench.kinds:
+        return
+    tickets = bench.open(bench.args.basket)
+    bench.wait("open")
+    bench.mark()
+    bench.settle()
+    bench.close(list(tickets))
+    bench.wait("close")
+
+
+def scenario_sltp_storm(bench):
+    if "modify" not in bench.kinds:
+        return
+    tickets = bench.open(bench.args.basket)
+    bench.wait("open")
+    bench.mark()
+    for step in range(bench.args.rounds):
+        bench.settle()
+        bench.modify(tickets, step + 1)
+        bench.wait("modify")
+
+
+def scenario_partial(bench):
+    if "partial" not in bench.kinds:
+        return
+    for _ in range(bench.args.rounds):
+        tickets = bench.open(1, volume=0.2)
+        bench.wait("open")
+        bench.settle()
+        bench.partial(tickets)
+        bench.wait("partial")
+
+
+def scenario_scaling(bench, size):
+    """With `size` copied positions open, time single modify / close / open passes."""
+    missing = size - len(bench.open_tickets)
+    if missing > 0:
+        bench.open(missing)
+        # Setup only: allow for the whole basket to be copied one order at a time
+        bench.wait("open", timeout=bench.args.timeout + missing * (bench.args.order_ms + 20.0) / 1000.0)
+    bench.mark()
+    for step in range(bench.args.rounds):
+        bench.settle()
+        bench.modify([bench.rng.choice(bench.open_tickets)], step + 1)
+        bench.wait("modify")
+        bench.settle()
+        bench.close([bench.rng.choice(bench.open_tickets)])
+        bench.wait("close")
+        bench.settle()
+        bench.open(1)
+        bench.wait("open")
+
+
+SCENARIOS = {
+    "single": scenario_single,
+    "basket": scenario_basket,
+    "mass_close": scenario_mass_close,
+    "sltp_storm": scenario_sltp_storm,
+    "partial": scenario_partial,
+    "scaling": scenario_scaling,  # expanded into one run per --sizes entry
+}
+DEFAULT_SCENARIOS = ["single", "basket", "mass_close", "sltp_storm", "partial"]
+
+
+def collect(broker, scenario, elapsed, calls_before, logins_before):
+    results = []
+    for kind in ALL_KINDS:
+        events = [ev for ev in broker.events if ev.kind == kind]
+        if not events:
+            continue
+        filled = [ev for ev in events if ev.t_fill is not None]
+        detected = [ev for ev in events if ev.t_detect is not None]
+        results.append({
+            "scenario": scenario,
+            "kind": kind,
+            "events": len(events),
+            "missed": len(events) - len(filled),
+            "detect_ms": summarize([(ev.t_detect - ev.t_event) * 1000.0 for ev in detected]),
+            "fill_ms": summarize([(ev.t_fill - ev.t_event) * 1000.0 for ev in filled]),
+            "span_ms": (max(ev.t_fill for ev in filled) - min(ev.t_event for ev in events)) * 1000.0
+            if filled else None,
+        })
+    calls = {k: v - calls_before.get(k, 0) for k, v in broker.calls.items() if v - calls_before.get(k, 0)}
+    return results, {
+        "scenario": scenario, "elapsed_s": elapsed, "logins": broker.logins - logins_before, "calls": calls,
+    }
+
+
+# -----------------------------------------------------------------------------
+# Targets
+# -----------------------------------------------------------------------------
+def start_target(args, workdir):
+    """Import the target module against the simulator and start its loop in a thread."""
+    mt5_sim.install()  # so the target module can be imported before its broker is built
+    master_logins = [MASTER_LOGIN]
+    if args.target == "connect":
+        broker = build_broker(args, [MASTER_LOGIN], [SLAVE_LOGIN], SYMBOLS)
+        write_inputs(workdir, MASTER_LOGIN, SLAVE_LOGIN, SYMBOLS)
+        module = importlib.import_module("mt5_connect")
+        entry, kinds, fill_slaves = module.trade_copier, ALL_KINDS, None
+    elif args.target == "dual":
+        broker = build_broker(args, [MASTER_LOGIN], [SLAVE_LOGIN], SYMBOLS)
+        write_inputs(workdir, MASTER_LOGIN, SLAVE_LOGIN, SYMBOLS, extra={
+            "master_terminal_path": "sim://master", "slave_terminal_path": "sim://slave",
+        })
+        module = importlib.import_module("dual_copier")
+        entry, kinds, fill_slaves = (lambda: module.run_dual_copier(use_threads=True)), ALL_KINDS, None
+    elif args.target == "fanout":
+        slaves = [SLAVE_LOGIN + i for i in range(args.slaves)]
+        broker = build_broker(args, [MASTER_LOGIN], slaves, SYMBOLS)
+        write_inputs(workdir, MASTER_LOGIN, SLAVE_LOGIN, SYMBOLS, extra={"master_terminal_path": "sim://master"})
+        with open(os.path.join(workdir, "slaves.csv"), "w", encoding="utf-8") as f:
+            f.write("login,password,server,terminal_path,symbol_mapping,lot_multiplier\n")
+            for login in slaves:
+                f.write(f"{login},{PASSWORD},{SLAVE_SERVER},sim://slave-{login},symbol_mapping.csv,1.0\n")
+        module = importlib.import_module("fanout_copier")
+        entry, kinds, fill_slaves = (lambda: module.run_fanout_copier(use_threads=True)), ALL_KINDS, None
+    elif args.target == "aggregate":
+        master_logins = [MASTER_LOGIN + i for i in range(args.masters)]
+        broker = build_broker(args, master_logins, [SLAVE_LOGIN], SYMBOLS)
+        write_inputs(workdir, MASTER_LOGIN, SLAVE_LOGIN, SYMBOLS, extra={"slave_terminal_path": "sim://slave"})
+        with open(os.path.join(workdir, "masters.csv"), "w", encoding="utf-8") as f:
+            f.write("login,password,server,terminal_path,symbol_mapping,lot_multiplier,magic\n")
+            for login in master_logins:
+                f.write(f"{login},{PASSWORD},{MASTER_SERVER},sim://master-{login},symbol_mapping.csv,1.0,\n")
+        module = importlib.import_module("aggregate_copier")
+        entry, kinds, fill_slaves = (lambda: module.run_aggregate_copier(use_threads=True)), ALL_KINDS, None
+    elif args.target == "stable":
+        module = importlib.import_module("Mt5ConnectOpeningStable")
+        master_logins = [module.MASTER_LOGIN]
+        broker = build_broker(args, [module.MASTER_LOGIN], [module.SLAVE_LOGIN], SYMBOLS)
+        broker.accounts[module.MASTER_LOGIN].password = module.MASTER_PASSWORD
+        broker.accounts[module.SLAVE_LOGIN].password = module.SLAVE_PASSWORD
+        write_inputs(workdir, module.MASTER_LOGIN, module.SLAVE_LOGIN, SYMBOLS)
+        entry, kinds, fill_slaves = module.trade_copier, ("open",), None
+    elif args.target == "feed":
+        broker = build_broker(args, [MASTER_LOGIN], [], SYMBOLS)
+        write_inputs(workdir, MASTER_LOGIN, SLAVE_LOGIN, SYMBOLS)
+        module = importlib.import_module("master_feed")
+        module.OUTPUT_DIR = workdir
+        FeedWatcher(broker, module.get_state_for_http).thread.start()
+        entry, kinds, fill_slaves = module.main, ALL_KINDS, [FeedWatcher.CONSUMER]
+    else:
+        raise SystemExit(f"Unknown target {args.target}")
+
+    def run():
+        try:
+            entry()
+        except mt5_sim.SimulationStopped:
+            pass
+
+    default_hook = threading.excepthook
+
+    def quiet_stop(hook_args):
+        # Worker threads started by the target (dual mode) also unwind via SimulationStopped
+        if not issubclass(hook_args.exc_type, mt5_sim.SimulationStopped):
+            default_hook(hook_args)
+
+    threading.excepthook = quiet_stop
+    thread = threading.Thread(target=run, name=f"copier-{args.target}", daemon=True)
+    thread.start()
+    return broker, thread, module, master_logins, kinds, fill_slaves
+
+
+def slow_disk(delay):
+    """Make every file open in order_log.py take `delay` seconds longer."""
+    order_log = sys.modules.get("order_log")
+    if order_log is None:
+        return
+    real_open = open
+
+    def slow_open(*args, **kwargs):
+        time.sleep(delay)
+        return real_open(*args, **kwargs)
+
+    order_log.open = slow_open  # shadows the builtin inside that module only
+
+
+def orderlog_stats():
+    order_log = sys.modules.get("order_log")
+    writer = getattr(order_log, "_writer", None)
+    if writer is None:
+        return None
+    writer.flush()
+    return {"records": writer.written, "writes": writer.batches}
+
+
+def print_report(target, results, counters):
+    print(f"\nCopy latency on simulated backend — target: {target}")
+    print(f"{'scenario':<12}{'kind':<9}{'events':>7}{'missed':>7} | "
+          f"{'detect p50':>10}{'p95':>9} | {'fill p50':>9}{'p95':>9}{'p99':>9}{'max':>9} | {'span':>9}  (ms)")
+    for r in results:
+        d, f = r["detect_ms"], r["fill_ms"]
+        print(f"{r['scenario']:<12}{r['kind']:<9}{r['events']:>7}{r['missed']:>7} | "
+              f"{fmt_ms(d['p50']):>10}{fmt_ms(d['p95']):>9} | "
+              f"{fmt_ms(f['p50']):>9}{fmt_ms(f['p95']):>9}{fmt_ms(f['p99']):>9}{fmt_ms(f['max']):>9} | "
+              f"{fmt_ms(r['span_ms']):>9}")
+    print("\nTerminal calls per scenario:")
+    for c in counters:
+        calls = ", ".join(f"{k}={v}" for k, v in sorted(c["calls"].items()))
+        print(f"  {c['scenario']:<12} {c['elapsed_s']:6.2f}s  logins={c['logins']}  {calls}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--target", choices=["connect", "dual", "fanout", "aggregate", "stable", "feed"],
+                        default="connect")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=None)
+    parser.add_argument("--rounds", type=int, default=5, help="repetitions for single/storm/partial")
+    parser.add_argument("--basket", type=int, default=50, help="trades per basket")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500, 2000],
+                        help="open-position counts for the scaling scenario")
+    parser.add_argument("--login-ms", type=float, default=80.0)
+    parser.add_argument("--order-ms", type=float, default=30.0)
+    parser.add_argument("--query-ms", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--settle-ms", type=float, default=300.0, help="max random pause before each action")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="seconds to wait for each step's fills (default 5, 15 for the 5 s stable loop)")
+    parser.add_argument("--poll", choices=["adaptive", "fixed"], default="adaptive",
+                        help="poll scheduler used by the target loop (MT5_COPIER_POLL_MODE)")
+    parser.add_argument("--sessions", default="",
+                        help='trading sessions for the adaptive scheduler, e.g. "00:00-23:59"')
+    parser.add_argument("--orderlog", choices=["async", "sync"], default="async",
+                        help="orderlog.txt writer: background thread or inline (MT5_COPIER_ORDERLOG)")
+    parser.add_argument("--log-ms", type=float, default=0.0,
+                        help="simulated disk latency added to every orderlog.txt open (slow disk / antivirus)")
+    parser.add_argument("--slaves", type=int, default=3, help="slave accounts for the fanout target")
+    parser.add_argument("--masters", type=int, default=3, help="master accounts for the aggregate target")
+    parser.add_argument("--filling", choices=["default", "mixed"], default="default",
+                        help="slave symbol filling bitmasks: all FOK|IOC, or a mix incl. FOK-only and RETURN-only")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="parallel slave orders per pass (MT5_COPIER_ORDER_WORKERS)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="show the copier's own output")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.timeout is None:
+        args.timeout = 15.0 if args.target == "stable" else 5.0
+    os.environ["MT5_COPIER_POLL_MODE"] = args.poll
+    os.environ["MT5_COPIER_SESSIONS"] = args.sessions
+    os.environ["MT5_COPIER_ORDERLOG"] = args.orderlog
+    os.environ["MT5_COPIER_ORDER_WORKERS"] = str(args.workers)
+    scenarios = args.scenarios or DEFAULT_SCENARIOS
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, repo_dir)
+    json_path = os.path.abspath(args.json) if args.json else None
+
+    with tempfile.TemporaryDirectory(prefix="mt5_bench_") as workdir:
+        os.chdir(workdir)
+        out = sys.stdout if args.verbose else open(os.devnull, "w")
+        results, counters = [], []
+        with contextlib.redirect_stdout(out):
+            broker, thread, module, master_logins, kinds, fill_slaves = start_target(args, workdir)
+            if args.log_ms > 0:
+                slow_disk(args.log_ms / 1000.0)
+            bench = Bench(args, broker, master_logins, kinds, fill_slaves)
+            bench.warm_up()
+            runs = []
+            for name in scenarios:
+                if name == "scaling":
+                    runs.extend((f"scale_{n}", lambda b, n=n: scenario_scaling(b, n)) for n in sorted(args.sizes))
+                else:
+                    runs.append((name, SCENARIOS[name]))
+            for name, run in runs:
+                print(f"… {name}", file=sys.stderr)
+                # Scaling runs build on the positions the previous size left open
+                if bench.open_tickets and "close" in kinds and not name.startswith("scale_"):
+                    bench.close(list(bench.open_tickets))
+                    bench.wait("close")
+                bench.mark()
+                run(bench)
+                rows, counter = collect(broker, name, time.perf_counter() - bench.started,
+                                        bench.calls_before, bench.logins_before)
+                results.extend(rows)
+                counters.append(counter)
+            scheduler = getattr(module, "poll_scheduler", None)
+            poll_stats = scheduler.stats.snapshot() if scheduler is not None else None
+            log_stats = orderlog_stats()
+            dispatcher = getattr(sys.modules.get("mt5_connect"), "order_dispatcher", None)
+            dispatch_stats = dispatcher.stats.snapshot() if dispatcher is not None else None
+            filling = getattr(sys.modules.get("mt5_connect"), "filling_modes", None)
+            filling_stats = filling.snapshot() if filling is not None else None
+            if filling_stats:
+                filling_stats.pop("symbols")
+            stages = getattr(module, "stage_metrics", None) or getattr(sys.modules.get("mt5_connect"), "stage_metrics", None)
+            stage_stats = stages.snapshot() if stages is not None else None
+            fanout = getattr(module, "fanout_stats", None)
+            fanout_stats = fanout.snapshot() if fanout is not None else None
+            broker.stop()
+            thread.join(timeout=10)
+        os.chdir(repo_dir)
+
+    print_report(args.target, results, counters)
+    if poll_stats:
+        print(f"\nPoll scheduler ({args.poll}): " + ", ".join(f"{k}={v}" for k, v in poll_stats.items()))
+    if filling_stats:
+        print(f"Filling modes ({args.filling}): " + ", ".join(f"{k}={v}" for k, v in filling_stats.items()))
+    if fanout_stats:
+        print("Fan-out (publish → last slave done): " + ", ".join(f"{k}={v}" for k, v in fanout_stats.items()))
+    if dispatch_stats:
+        print(f"Order dispatch (workers={args.workers}): "
+              + ", ".join(f"{k}={v}" for k, v in dispatch_stats.items()))
+    if stage_stats:
+        print(f"\nStages of the {stage_stats['namespace']} hot path (p50 / p99 / max ms, count):")
+        for stage, s in stage_stats["stages"].items():
+            print(f"  {stage:<16} {fmt_ms(s['p50_ms']):>9} {fmt_ms(s['p99_ms']):>9} {fmt_ms(s['max_ms']):>9}  {s['count']}")
+    if log_stats:
+        print(f"Order log ({args.orderlog}, +{args.log_ms:g} ms per open): "
+              + ", ".join(f"{k}={v}" for k, v in log_stats.items()))
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({"target": args.target, "args": vars(args), "results": results, "counters": counters,
+                       "poll": poll_stats, "orderlog": log_stats, "dispatch": dispatch_stats,
+                       "fanout": fanout_stats, "filling": filling_stats, "stages": stage_stats},
+                      f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
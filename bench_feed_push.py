@@ -0,0 +1,321 @@
+"""
+Change-to-consumer latency of master_feed.py's HTTP delivery modes.
+
+Starts master_feed's HTTP server in-process, publishes a stream of position
+changes into its journal (as the feed loop does after each poll) and runs
+several concurrent local consumers per mode:
+
+- poll:     GET /state every --poll-ms (how an EA on a WebRequest timer reads it);
+- longpoll: GET /state?since=<seq>&epoch=<epoch>&wait=<s>, re-issued on every answer;
+- sse:      one held GET /events connection (Server-Sent Events).
+
+For every change, the latency is from its publication to the moment a
+consumer has it. The feed's own poll of the terminal (POLL_INTERVAL /
+adaptive scheduler, see bench_copier.py --target feed) comes on top.
+
+--load instead measures the server under polling load: --clients EAs GET
+/state every --poll-ms against a book of --positions positions that changes
+every --change-ms, once per client variant:
+
+- plain:     a new connection per request, no conditional request;
+- keepalive: one persistent connection per client;
+- etag:      keep-alive + If-None-Match (unchanged polls get 304, no body);
+- gzip:      etag + Accept-Encoding: gzip (the client decompresses).
+
+It reports requests/s, request latency percentiles, the share of 304s and
+the bytes per request.
+
+Usage:
+    python bench_feed_push.py
+    python bench_feed_push.py --consumers 8 --changes 500 --modes longpoll sse
+    python bench_feed_push.py --load --clients 20 --poll-ms 100 --positions 300
+    python bench_feed_push.py --load --poll-ms 0          # saturation
+    python bench_feed_push.py --json push.json
+"""
+
+import argparse
+import http.client
+import json
+import random
+import socket
+import threading
+import time
+
+import mt5_sim
+
+mt5_sim.install()  # master_feed imports MetaTrader5; only its HTTP side is used here
+import master_feed  # noqa: E402
+from bench_copier import fmt_ms, summarize  # noqa: E402
+
+MODES = ("poll", "longpoll", "sse")
+LOAD_VARIANTS = ("plain", "keepalive", "etag", "gzip")
+
+
+class Consumer:
+    """One local consumer; records when it first sees each published seq."""
+
+    def __init__(self, mode, port, args):
+        self.mode = mode
+        self.port = port
+        self.args = args
+        self.seen = {}  # seq -> perf_counter() when received
+        self.last_seq = 0
+        self.requests = 0
+        self.stopped = False
+        self.thread = threading.Thread(target=getattr(self, f"run_{mode}"), daemon=True)
+
+    def _received(self, seq):
+        now = time.perf_counter()
+        for s in range(self.last_seq + 1, seq + 1):
+            self.seen[s] = now
+        self.last_seq = max(self.last_seq, seq)
+
+    def _get(self, conn, path):
+        conn.request("GET", path)
+        self.requests += 1
+        return json.loads(conn.getresponse().read())
+
+    def run_poll(self):
+        while not self.stopped:
+            conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+            self._received(self._get(conn, "/state")["seq"])
+            conn.close()
+            time.sleep(self.args.poll_ms / 1000.0)
+
+    def run_longpoll(self):
+        epoch = master_feed.journal.epoch
+        while not self.stopped:
+            conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+            payload = self._get(conn, f"/state?since={self.last_seq}&epoch={epoch}&wait={self.args.wait}")
+            conn.close()
+            self._received(payload["seq"])
+
+    def run_sse(self):
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+        conn.request("GET", f"/events?since={self.last_seq}&epoch={master_feed.journal.epoch}")
+        self.requests += 1
+        response = conn.getresponse()
+        while not self.stopped:
+            line = response.fp.readline()
+            if not line:
+                break
+            if line.startswith(b"data: "):
+                self._received(json.loads(line[6:])["seq"])
+        conn.close()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server():
+    port = free_port()
+    threading.Thread(target=master_feed.run_http_server, args=(port,), daemon=True).start()
+    for _ in range(200):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return port
+        except OSError:
+            time.sleep(0.01)
+    raise SystemExit(f"feed HTTP server did not start on port {port}")
+
+
+def publish_changes(args):
+    """Publish --changes position changes at random intervals; returns {seq: perf_counter() at publish}."""
+    rng = random.Random(args.seed)
+    book = {}
+    published = {}
+    next_ticket = 1
+    for _ in range(args.changes):
+        time.sleep(rng.uniform(args.min_gap_ms, args.max_gap_ms) / 1000.0)
+        if book and rng.random() < 0.3:
+            del book[rng.choice(list(book))]
+        elif book and rng.random() < 0.5:
+            ticket = rng.choice(list(book))
+            book[ticket] = dict(book[ticket], sl=round(rng.uniform(0.5, 1.0), 5))
+        else:
+            book[next_ticket] = {"ticket": next_ticket, "symbol": "EURUSD", "type": 0, "volume": 0.1,
+                                 "price_open": 1.1, "sl": 0.0, "tp": 0.0, "time": 0, "comment": ""}
+            next_ticket += 1
+        positions = list(book.values())
+        state = {"last_updated": time.time(), "positions": positions}
+        master_feed.journal.publish(positions)
+        published[master_feed.journal.seq] = time.perf_counter()
+        state["seq"] = master_feed.journal.seq
+        state["epoch"] = master_feed.journal.epoch
+        master_feed.set_state_for_http(state)
+    return published
+
+
+# -----------------------------------------------------------------------------
+# Load: --clients EAs polling /state
+# -----------------------------------------------------------------------------
+class LoadClient:
+    """One EA polling /state every --poll-ms in one of LOAD_VARIANTS; records each request's latency."""
+
+    def __init__(self, variant, port, args, deadline):
+        self.variant = variant
+        self.port = port
+        self.args = args
+        self.deadline = deadline
+        self.latencies = []
+        self.not_modified = 0
+        self.bytes = 0
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        import gzip
+
+        conn = None
+        etag = None
+        while time.perf_counter() < self.deadline:
+            headers = {}
+            if self.variant in ("etag", "gzip") and etag:
+                headers["If-None-Match"] = etag
+            if self.variant == "gzip":
+                headers["Accept-Encoding"] = "gzip"
+            started = time.perf_counter()
+            if conn is None or self.variant == "plain":
+                conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+            conn.request("GET", "/state", headers=headers)
+            response = conn.getresponse()
+            body = response.read()
+            if response.status == 304:
+                self.not_modified += 1
+            else:
+                etag = response.getheader("ETag")
+                if response.getheader("Content-Encoding") == "gzip":
+                    self.bytes += len(body)
+                    body = gzip.decompress(body)
+                else:
+                    self.bytes += len(body)
+                json.loads(body)
+            if self.variant == "plain":
+                conn.close()
+            self.latencies.append((time.perf_counter() - started) * 1000.0)
+            pause = self.args.poll_ms / 1000.0 - (time.perf_counter() - started)
+            if pause > 0:
+                time.sleep(pause)
+        if conn is not None:
+            conn.close()
+
+
+def publish_book(args, deadline):
+    """Keep a book of --positions positions, modifying one every --change-ms until `deadline`."""
+    rng = random.Random(args.seed)
+    book = [{"ticket": 1000 + i, "symbol": rng.choice(["EURUSD", "GBPUSD", "XAUUSD"]), "type": i % 2,
+             "volume": 0.1, "price_open": round(rng.uniform(1.0, 2.0), 5), "sl": 0.0, "tp": 0.0,
+             "time": 1739265420 + i, "comment": ""} for i in range(args.positions)]
+    while True:
+        master_feed.journal.publish(book)
+        state = {"last_updated": time.time(), "positions": book, "seq": master_feed.journal.seq,
+                 "epoch": master_feed.journal.epoch, "mapping_version": master_feed.journal.mapping_version}
+        master_feed.set_state_for_http(state)
+        if time.perf_counter() >= deadline:
+            return
+        time.sleep(args.change_ms / 1000.0)
+        i = rng.randrange(len(book))
+        book = list(book)
+        book[i] = dict(book[i], sl=round(rng.uniform(0.5, 1.0), 5))
+
+
+def run_load(args):
+    port = start_server()
+    results = {}
+    for variant in args.variants:
+        deadline = time.perf_counter() + args.seconds
+        publisher = threading.Thread(target=publish_book, args=(args, deadline), daemon=True)
+        publisher.start()
+        time.sleep(0.05)
+        clients = [LoadClient(variant, port, args, deadline) for _ in range(args.clients)]
+        started = time.perf_counter()
+        for c in clients:
+            c.thread.start()
+        for c in clients:
+            c.thread.join()
+        elapsed = time.perf_counter() - started
+        publisher.join()
+        latencies = [ms for c in clients for ms in c.latencies]
+        requests = len(latencies)
+        results[variant] = dict(summarize(latencies), requests_per_s=round(requests / elapsed, 1),
+                                not_modified_pct=round(100.0 * sum(c.not_modified for c in clients) / max(requests, 1), 1),
+                                bytes_per_request=round(sum(c.bytes for c in clients) / max(requests, 1)))
+
+    state_bytes = len(json.dumps(master_feed.get_state_for_http()))
+    print(f"\n{args.clients} client(s) polling /state every {args.poll_ms:.0f} ms for {args.seconds:.0f}s per variant; "
+          f"{args.positions} positions (~{state_bytes // 1024} KiB), one change every {args.change_ms:.0f} ms")
+    print(f"{'variant':<10}{'req/s':>8} | {'p50':>8}{'p95':>9}{'p99':>9}{'max':>9} (ms) | {'304 %':>6}{'bytes/req':>10}")
+    for variant, r in results.items():
+        print(f"{variant:<10}{r['requests_per_s']:>8} | {fmt_ms(r['p50'])}{fmt_ms(r['p95']):>9}"
+              f"{fmt_ms(r['p99']):>9}{fmt_ms(r['max']):>9}      | {r['not_modified_pct']:>6}{r['bytes_per_request']:>10}")
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--consumers", type=int, default=4, help="concurrent consumers per mode")
+    parser.add_argument("--changes", type=int, default=200)
+    parser.add_argument("--min-gap-ms", type=float, default=5.0, help="shortest pause between changes")
+    parser.add_argument("--max-gap-ms", type=float, default=40.0, help="longest pause between changes")
+    parser.add_argument("--poll-ms", type=float, default=100.0, help="interval of the poll consumers")
+    parser.add_argument("--wait", type=float, default=10.0, help="long-poll wait parameter (seconds)")
+    parser.add_argument("--load", action="store_true", help="polling load benchmark instead of push latency")
+    parser.add_argument("--variants", nargs="+", choices=LOAD_VARIANTS, default=list(LOAD_VARIANTS))
+    parser.add_argument("--clients", type=int, default=20, help="--load: polling clients")
+    parser.add_argument("--positions", type=int, default=300, help="--load: positions in the book")
+    parser.add_argument("--change-ms", type=float, default=1000.0, help="--load: interval between book changes")
+    parser.add_argument("--seconds", type=float, default=5.0, help="--load: duration per variant")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="also write results to this JSON file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.load:
+        results = run_load(args)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"args": vars(args), "results": results}, f, indent=2)
+        return results
+    master_feed.set_state_for_http({"last_updated": time.time(), "positions": [], "seq": 0,
+                                    "epoch": master_feed.journal.epoch})
+    port = start_server()
+    consumers = [Consumer(mode, port, args) for mode in args.modes for _ in range(args.consumers)]
+    for c in consumers:
+        c.thread.start()
+    time.sleep(0.2)  # let every consumer connect / issue its first request
+
+    started = time.perf_counter()
+    published = publish_changes(args)
+    elapsed = time.perf_counter() - started
+    time.sleep(args.poll_ms / 1000.0 + 0.2)  # last change reaches the slowest mode
+    for c in consumers:
+        c.stopped = True
+
+    results = {}
+    for mode in args.modes:
+        group = [c for c in consumers if c.mode == mode]
+        latencies = [(c.seen[seq] - t) * 1000.0 for c in group for seq, t in published.items() if seq in c.seen]
+        missed = sum(1 for c in group for seq in published if seq not in c.seen)
+        results[mode] = dict(summarize(latencies), missed=missed,
+                             requests_per_s=round(sum(c.requests for c in group) / elapsed, 1))
+
+    print(f"\n{len(published)} changes over {elapsed:.1f}s, {args.consumers} consumer(s) per mode "
+          f"(poll every {args.poll_ms:.0f} ms)")
+    print(f"{'mode':<10}{'deliveries':>11}{'missed':>7} | {'p50':>8}{'p95':>9}{'p99':>9}{'max':>9} (ms) | "
+          f"{'requests/s':>10}")
+    for mode, r in results.items():
+        print(f"{mode:<10}{r['n']:>11}{r['missed']:>7} | {fmt_ms(r['p50'])}{fmt_ms(r['p95']):>9}"
+              f"{fmt_ms(r['p99']):>9}{fmt_ms(r['max']):>9}      | {r['requests_per_s']:>10}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
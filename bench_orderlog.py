@@ -0,0 +1,339 @@
+"""
+Order-log read benchmark for the dashboard (orderlog_store.py).
+
+Writes a synthetic orderlog.txt (OPEN / CLOSE lines in the copier's format,
+spread evenly over --days days up to today) and times, per size:
+
+- legacy: the dashboard's old per-request path (every line through
+  strptime and a dict, then the "today" filter), for sizes up to --legacy-max;
+- cold: OrderLogStore's first refresh (whole file);
+- append: refresh after --append new lines (what a request costs while the
+  copier is writing);
+- idle: refresh with nothing new (one stat);
+- today / week / all: select() of the date filter plus rows() of the newest
+  ORDERLOG_DISPLAY_ROWS, i.e. the Order Logs tab's work per request;
+- latency report: latency_stats.latency_report() over all rows, first call
+  and repeated (cached) call;
+- delete: --delete records removed the old way (whole file read and rewritten,
+  for sizes up to --legacy-max) and as tombstones (OrderLogStore.delete);
+- compact: OrderLogStore.compact() while an OrderLogWriter keeps appending;
+  the record count afterwards is checked (no append lost, deletes applied).
+
+With --stress, instead runs compact() in a loop (deleting a few records
+before each) while an OrderLogWriter appends and reader threads call rows()
+and follow() on the same store, and checks that every row read back is the
+record its ID names, that follow() never returns a record twice and that
+nothing raises.
+
+Usage:
+    python bench_orderlog.py
+    python bench_orderlog.py --sizes 1000000 --repeat 5
+    python bench_orderlog.py --sizes 1000000 10000000 --legacy-max 1000000
+    python bench_orderlog.py --stress 10
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import order_log
+from latency_stats import latency_report
+from orderlog_store import OrderLogStore, date_bounds
+
+DISPLAY_ROWS = 5000
+
+
+def _line_bodies(count, seed_ticket):
+    """`count` log lines without their date prefix ("HH:MM:SS | ID={:016x} | ..."), spread over one day."""
+    step = 86400.0 / count
+    out = []
+    for i in range(count):
+        second = int(i * step)
+        ticket = seed_ticket + i
+        stamp = f"{second // 3600:02d}:{second // 60 % 60:02d}:{second % 60:02d} | ID={{:016x}}"
+        if i % 2 == 0:
+            out.append(
+                f"{stamp} | MASTER_TICKET={ticket} | SLAVE_TICKET={ticket + 7} | EURUSD->EURUSD.s | "
+                f"MASTER_LOT=0.1 | SLAVE_LOT=0.1 | TYPE=BUY | PRICE=1.08412 | SL=0.0 | TP=0.0 | "
+                f"FILLING=IOC | LATENCY_MS={(i * 37) % 900 + 0.5:.1f}\n"
+            )
+        else:
+            out.append(
+                f"{stamp} | CLOSE | MASTER_TICKET={ticket - 1} | SLAVE_TICKET={ticket + 6} | SYMBOL=EURUSD.s | "
+                f"VOLUME=0.1 | TYPE=BUY | FILLING=IOC | LATENCY_MS={(i * 53) % 700 + 0.5:.1f}\n"
+            )
+    return out
+
+
+def write_log(path, lines, days):
+    per_day = max(1, lines // days)
+    bodies = _line_bodies(per_day, 10 ** 9)
+    first_day = date.today() - timedelta(days=days - 1)
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for d in range(days):
+            prefix = (first_day + timedelta(days=d)).isoformat() + " "
+            count = min(per_day, lines - written)
+            f.write("".join(prefix + body.format(written + i + 1) for i, body in enumerate(bodies[:count])))
+            written += count
+    return written
+
+
+def legacy_today(path):
+    """The dashboard's previous request path: parse every line into a dict, then filter on today."""
+    rows = []
+    with open(path, "r", encoding="utf-8") as f:
+        for idx, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            parts = [p.strip() for p in line.split("|")]
+            try:
+                ts = datetime.strptime(parts[0], "%Y-%m-%d %H:%M:%S")
+            except Exception:
+                ts = None
+            latency_ms = None
+            for p in parts:
+                if "LATENCY_MS=" in p:
+                    try:
+                        latency_ms = float(p.split("LATENCY_MS=")[-1])
+                    except ValueError:
+                        latency_ms = None
+                    break
+            rows.append({"timestamp": ts, "timestamp_str": parts[0], "raw": line, "latency_ms": latency_ms,
+                         "id": idx})
+    today = date.today()
+    return [r for r in rows if r["timestamp"] is not None and r["timestamp"].date() == today]
+
+
+def timed(fn, repeat=1):
+    times = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - started) * 1000.0)
+    return statistics.median(times), result
+
+
+def append_lines(path, count):
+    bodies = _line_bodies(count, 2 * 10 ** 9)
+    prefix = date.today().isoformat() + " "
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("".join(prefix + body.format(order_log.next_record_id()) for body in bodies))
+
+
+def legacy_delete(path, line_numbers):
+    """The dashboard's previous delete: read the whole file, write it back without the selected lines."""
+    with open(path, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(line for idx, line in enumerate(lines) if idx not in line_numbers)
+
+
+def bench_delete(path, store, args, results):
+    lines = len(store)
+    if results["lines"] <= args.legacy_max:
+        step = max(1, lines // args.delete)
+        results["legacy_delete_ms"], _ = timed(lambda: legacy_delete(path, set(range(0, lines, step))))
+        store.refresh()  # the rewrite forces a full parse
+    live = store.select()
+    spread = live[::max(1, len(live) // (args.delete * args.repeat))]
+    batches = iter([row.id for row in store.rows(spread[i::args.repeat][:args.delete])] for i in range(args.repeat))
+    results["delete_ms"], _ = timed(lambda: store.delete(next(batches)), args.repeat)
+    expected = len(store.select())
+
+    writer = order_log.OrderLogWriter(path)
+    stop = threading.Event()
+    appended = [0]
+
+    def append():
+        while not stop.is_set():
+            writer.submit(order_log.format_close, time.time(), False, 1, 2, "EURUSD", 0.1, 0, "IOC", 1.5)
+            appended[0] += 1
+            time.sleep(0.0002)
+        writer.close()
+
+    thread = threading.Thread(target=append)
+    thread.start()
+    results["compact_ms"], results["compacted"] = timed(store.compact)
+    stop.set()
+    thread.join()
+    store.refresh()
+    results["appended_during_compact"] = appended[0]
+    results["compact_ok"] = len(store.select()) == expected + appended[0] and store.deleted_count() == 0
+
+
+def bench_size(lines, args, workdir):
+    path = os.path.join(workdir, f"orderlog_{lines}.txt")
+    started = time.perf_counter()
+    write_log(path, lines, args.days)
+    size_mb = os.path.getsize(path) / 1e6
+    print(f"\n{lines:,} lines ({size_mb:.0f} MB, written in {time.perf_counter() - started:.1f}s)")
+
+    results = {"lines": lines, "mb": round(size_mb, 1)}
+    if lines <= args.legacy_max:
+        results["legacy_ms"], legacy_rows = timed(lambda: legacy_today(path))
+        del legacy_rows
+
+    store = OrderLogStore(path)
+    results["cold_ms"], _ = timed(store.refresh)
+    columns = (*store._row_columns().values(), store.live)
+    results["column_mb"] = round(sum(c.view().nbytes for c in columns) / 1e6, 1)
+
+    def append_and_refresh():
+        append_lines(path, args.append)
+        started = time.perf_counter()
+        store.refresh()
+        return (time.perf_counter() - started) * 1000.0
+
+    results["append_ms"] = statistics.median(append_and_refresh() for _ in range(args.repeat))
+    results["idle_ms"], _ = timed(store.refresh, args.repeat)
+
+    week_start = (date.today() - timedelta(days=args.days // 2)).isoformat()
+    week_end = (date.today() - timedelta(days=args.days // 2 - 6)).isoformat()
+    filters = {
+        "today": ("today", None, None),
+        "week": ("custom", week_start, week_end),
+        "all": ("all", None, None),
+    }
+    for name, (kind, start, end) in filters.items():
+        def view():
+            return store.newest(*date_bounds(kind, start, end), DISPLAY_ROWS)
+
+        results[f"{name}_ms"], (_, matched) = timed(view, args.repeat)
+        results[f"{name}_rows"] = matched
+
+    results["report_ms"], _ = timed(lambda: latency_report(store))
+    results["report_cached_ms"], _ = timed(lambda: latency_report(store), args.repeat)
+    bench_delete(path, store, args, results)
+    if not args.keep:
+        os.unlink(path)
+    return results
+
+
+def stress_compaction(workdir, seconds, lines=20_000):
+    """Compactions racing rows() / follow() / appends on one store. Returns the number of problems found."""
+    path = os.path.join(workdir, "orderlog_stress.txt")
+    write_log(path, lines, 1)
+    store = OrderLogStore(path)
+    store.refresh()
+    writer = order_log.OrderLogWriter(path)
+    stop = threading.Event()
+    problems = []
+    counts = {"appended": 0, "compactions": 0, "rows_read": 0, "followed": 0}
+
+    def check(rows, source):
+        for row in rows:
+            if f"ID={row.id:016x}" not in row.raw:
+                problems.append(f"{source}: row {row.id:016x} read back as {row.raw[:60]!r}")
+
+    def guarded(fn):
+        def run():
+            try:
+                while not stop.is_set():
+                    fn()
+            except Exception as e:
+                problems.append(f"{fn.__name__}: {type(e).__name__}: {e}")
+        return run
+
+    def append():
+        writer.submit(order_log.format_close, time.time(), False, 1, 2, "EURUSD", 0.1, 0, "IOC", 1.5)
+        counts["appended"] += 1
+        time.sleep(0.0005)
+
+    rng = random.Random(1)
+
+    def compact():
+        recent, _ = store.newest(limit=2000)
+        victims = rng.sample(recent, min(50, len(recent)))
+        store.delete([row.id for row in victims])
+        store.compact()
+        counts["compactions"] += 1
+
+    def read_rows():
+        rows, _ = store.newest(limit=500)
+        check(rows, "rows()")
+        counts["rows_read"] += len(rows)
+
+    seen = set()
+    cursor = [None]
+
+    def follow():
+        cursor[0], rows, reset = store.follow(cursor[0])
+        if reset:
+            problems.append("follow(): reset without a reload")
+        check(rows, "follow()")
+        for row in rows:
+            if row.id in seen:
+                problems.append(f"follow(): record {row.id:016x} returned twice")
+            seen.add(row.id)
+        counts["followed"] += len(rows)
+        time.sleep(0.001)
+
+    threads = [threading.Thread(target=guarded(fn)) for fn in (append, compact, read_rows, follow)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    writer.close()
+    print(f"{seconds:g}s: {counts['compactions']} compactions, {counts['appended']} appended, "
+          f"{counts['rows_read']} rows read, {counts['followed']} followed")
+    for problem in problems[:20]:
+        print(f"  ❌ {problem}")
+    print(f"  {'✅ no torn reads or errors' if not problems else f'❌ {len(problems)} problem(s)'}")
+    return len(problems)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1_000_000, 10_000_000])
+    parser.add_argument("--days", type=int, default=365, help="days the log spans (ending today)")
+    parser.add_argument("--append", type=int, default=1000, help="lines appended before each append refresh")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--delete", type=int, default=100, help="records deleted before the compaction")
+    parser.add_argument("--legacy-max", type=int, default=1_000_000,
+                        help="largest size timed with the old parser (it holds a dict per line)")
+    parser.add_argument("--keep", action="store_true", help="keep the generated logs")
+    parser.add_argument("--stress", type=float, metavar="SECONDS",
+                        help="run the compaction / reader concurrency check for SECONDS instead")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.stress:
+        with tempfile.TemporaryDirectory(prefix="mt5_orderlog_") as workdir:
+            return stress_compaction(workdir, args.stress)
+    results = []
+    with tempfile.TemporaryDirectory(prefix="mt5_orderlog_") as workdir:
+        for lines in args.sizes:
+            results.append(bench_size(lines, args, workdir))
+            r = results[-1]
+            legacy = f"{r['legacy_ms']:.0f} ms" if "legacy_ms" in r else "skipped"
+            print(f"  legacy parse + today filter   {legacy}")
+            print(f"  cold refresh                  {r['cold_ms']:.0f} ms  (columns {r['column_mb']} MB)")
+            print(f"  refresh after +{args.append} lines     {r['append_ms']:.2f} ms")
+            print(f"  refresh, nothing new          {r['idle_ms']:.3f} ms")
+            for name in ("today", "week", "all"):
+                print(f"  {name:<5} select + newest rows     {r[f'{name}_ms']:.2f} ms  "
+                      f"({r[f'{name}_rows']:,} rows match)")
+            print(f"  latency report (all rows)     {r['report_ms']:.0f} ms, cached {r['report_cached_ms']:.3f} ms")
+            legacy = f"{r['legacy_delete_ms']:.0f} ms" if "legacy_delete_ms" in r else "skipped"
+            print(f"  delete {args.delete}, rewrite file     {legacy}")
+            print(f"  delete {args.delete}, tombstones       {r['delete_ms']:.2f} ms")
+            print(f"  compact                       {r['compact_ms']:.0f} ms  ({r['compacted']} dropped, "
+                  f"{r['appended_during_compact']} appended meanwhile, "
+                  f"{'no record lost' if r['compact_ok'] else 'RECORD COUNT MISMATCH'})")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Cold-start benchmark of the copier entry points on the simulated MetaTrader5 backend (mt5_sim.py).
+
+For each entry point, in a fresh interpreter:
+- import profile: `python -X importtime` of the entry module, with the total
+  and the heaviest imports (cumulative);
+- time to first poll: from spawning the process until the entry point's loop
+  finishes its first poll (the first call of its poll scheduler's wait()),
+  against a simulated broker with no latency.
+
+Each figure is the median of --repeat runs. The real MetaTrader5 package
+(which imports numpy) adds its own import time on top; the simulator stands
+in for it here.
+
+Usage:
+    python bench_startup.py
+    python bench_startup.py --targets connect feed --repeat 10
+    python bench_startup.py --json startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# target: (module, entry expression run in the child)
+TARGETS = {
+    "connect": ("mt5_connect", "module.trade_copier()"),
+    "feed": ("master_feed", "module.main()"),
+    "stable": ("Mt5ConnectOpeningStable", "module.trade_copier()"),
+    "dual": ("dual_copier", "module.run_dual_copier(use_threads=True)"),
+    "fanout": ("fanout_copier", "module.run_fanout_copier(use_threads=True)"),
+    "aggregate": ("aggregate_copier", "module.run_aggregate_copier(use_threads=True)"),
+}
+
+# Runs in the child: build the simulated accounts and input files, start the
+# entry point, and exit on the first completed poll.
+_CHILD = r"""
+import importlib, os, sys, time
+sys.path.insert(0, {repo!r})
+import mt5_sim
+mt5_sim.install()
+imported_at = time.time()
+module = importlib.import_module({module!r})
+import_done = time.time()
+
+import poll_scheduler
+
+def first_poll(self):
+    sys.stdout.write("FIRST_POLL %f %f %d\n" % (import_done - imported_at, time.time(), "pandas" in sys.modules))
+    sys.stdout.flush()
+    os._exit(0)
+
+poll_scheduler.FixedPollScheduler.wait = first_poll
+
+master = getattr(module, "MASTER_LOGIN", None) or 5001
+slave = getattr(module, "SLAVE_LOGIN", None) or 6001
+master_password = getattr(module, "MASTER_PASSWORD", None) or "sim"
+slave_password = getattr(module, "SLAVE_PASSWORD", None) or "sim"
+broker = mt5_sim.install(mt5_sim.SimBroker(latency=mt5_sim.SimLatency(0, 0, 0, 0, 0)))
+symbols = ["EURUSD", "GBPUSD", "XAUUSD"]
+broker.add_account(master, master_password, "Sim-Master", symbols=symbols, master=True)
+broker.add_account(slave, slave_password, "Sim-Slave", symbols=symbols)
+with open("credentials.csv", "w") as f:
+    f.write("Title,Value\n")
+    f.write(f"master_login,{{master}}\nmaster_password,{{master_password}}\nmaster_server,Sim-Master\n")
+    f.write(f"slave_login,{{slave}}\nslave_password,{{slave_password}}\nslave_server,Sim-Slave\n")
+    f.write("master_terminal_path,sim://master\nslave_terminal_path,sim://slave\n")
+with open("symbol_mapping.csv", "w") as f:
+    f.write("master_symbol,slave_symbol,slave_lot\n" + "".join(f"{{s}},{{s}},1\n" for s in symbols))
+for name in ("slaves.csv", "masters.csv"):
+    with open(name, "w") as f:
+        login, password = (slave, slave_password) if name == "slaves.csv" else (master, master_password)
+        server = "Sim-Slave" if name == "slaves.csv" else "Sim-Master"
+        f.write("login,password,server,terminal_path,symbol_mapping,lot_multiplier,magic\n")
+        f.write(f"{{login}},{{password}},{{server}},sim://{{name}},symbol_mapping.csv,1.0,\n")
+if hasattr(module, "OUTPUT_DIR"):
+    module.OUTPUT_DIR = os.getcwd()
+{entry}
+"""
+
+
+def import_profile(module, top=5):
+    """(total_ms, [(module, cumulative_ms)] heaviest direct imports) of importing `module` in a fresh interpreter."""
+    code = f"import sys; sys.path.insert(0, {REPO_DIR!r}); import mt5_sim; mt5_sim.install(); import {module}"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                          cwd=REPO_DIR)
+    rows, total = [], None
+    recording = False
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if name.strip() == "mt5_sim":
+            recording = True  # everything after the simulator belongs to the entry module
+            continue
+        if not recording or cumulative.strip() == "cumulative":
+            continue
+        ms = int(cumulative) / 1000.0
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0 and name.strip() == module:
+            total = ms
+        elif depth == 1:
+            rows.append((name.strip(), ms))
+    rows.sort(key=lambda r: r[1], reverse=True)
+    return total, rows[:top]
+
+
+def first_poll(target):
+    """(spawn → first poll ms, import ms, pandas loaded) of one cold start of `target`."""
+    module, entry = TARGETS[target]
+    code = _CHILD.format(repo=REPO_DIR, module=module, entry=entry)
+    with tempfile.TemporaryDirectory(prefix="mt5_startup_") as workdir:
+        started = time.time()
+        proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=workdir,
+                              timeout=60)
+    lines = [l for l in proc.stdout.splitlines() if l.startswith("FIRST_POLL ")]
+    if not lines:
+        raise RuntimeError(f"{target}: no poll reported\n{proc.stdout[-2000:]}\n{proc.stderr[-2000:]}")
+    _, import_s, polled_at, pandas_loaded = lines[-1].split()
+    return (float(polled_at) - started) * 1000.0, float(import_s) * 1000.0, pandas_loaded == "1"
+
+
+def pandas_import_ms():
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import pandas"], capture_output=True,
+                          text=True)
+    for line in reversed(proc.stderr.splitlines()):
+        if line.rstrip().endswith("| pandas"):
+            return int(line.split("|")[1]) / 1000.0
+    return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--targets", nargs="+", choices=list(TARGETS), default=list(TARGETS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="heaviest imports to list per entry point")
+    parser.add_argument("--json", help="also write results to this JSON file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = {}
+    for target in args.targets:
+        print(f"… {target}", file=sys.stderr)
+        module = TARGETS[target][0]
+        profiles = [import_profile(module, args.top) for _ in range(args.repeat)]
+        polls = [first_poll(target) for _ in range(args.repeat)]
+        results[target] = {
+            "module": module,
+            "import_ms": round(statistics.median(p[0] for p in profiles), 1),
+            "heaviest_imports": [(name, round(ms, 1)) for name, ms in profiles[-1][1]],
+            "entry_import_ms": round(statistics.median(p[1] for p in polls), 1),
+            "first_poll_ms": round(statistics.median(p[0] for p in polls), 1),
+            "pandas_loaded": any(p[2] for p in polls),
+        }
+
+    print(f"\n{'target':<10} {'module':<24} {'import ms':>10} {'first poll ms':>14} {'pandas':>7}   "
+          f"heaviest imports (cumulative ms)")
+    for target, r in results.items():
+        heaviest = ", ".join(f"{name} {ms:.1f}" for name, ms in r["heaviest_imports"])
+        print(f"{target:<10} {r['module']:<24} {r['import_ms']:>10.1f} {r['first_poll_ms']:>14.1f} "
+              f"{'yes' if r['pandas_loaded'] else 'no':>7}   {heaviest}")
+    pandas_ms = pandas_import_ms()
+    if pandas_ms is not None:
+        print(f"\n(importing pandas alone takes {pandas_ms:.0f} ms here)")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results, "pandas_import_ms": pandas_ms}, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
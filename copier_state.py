@@ -0,0 +1,157 @@
+"""
+Persistent copier state (master ticket -> slave ticket mappings).
+
+Stored in SQLite in WAL mode: every mapping is written as it is made and
+removed when the copy is closed, so a restarted copier picks up where it left
+off instead of treating its own open copies as "existing" trades.
+
+On startup the stored mappings are reconciled against one master snapshot and
+one slave snapshot (see reconcile()):
+- mappings whose slave copy is gone are dropped;
+- slave positions with the copier's magic number that the store missed (crash
+  between order_send and the write) are recovered from their comment;
+- copies whose master position closed while the copier was down are returned
+  so the caller can close them.
+"""
+
+import re
+import sqlite3
+import threading
+import time
+
+STATE_FILE = "copier_state.db"
+
+# Magic number and comment the copier puts on every slave order
+COPIER_MAGIC = 123456
+COPIER_COMMENT = "Copied Trade"
+_COMMENT_RE = re.compile(r"^" + re.escape(COPIER_COMMENT) + r" (\d+)$")
+
+
+def copy_comment(master_ticket):
+    """Order comment for a copy of `master_ticket` (fits MT5's 31-character limit)."""
+    return f"{COPIER_COMMENT} {master_ticket}"
+
+
+def parse_copy_comment(comment):
+    """Master ticket from a comment made by copy_comment(), or None."""
+    match = _COMMENT_RE.match((comment or "").strip())
+    return int(match.group(1)) if match else None
+
+
+class CopierStateStore:
+    def __init__(self, path=STATE_FILE):
+        self.path = path
+        # Autocommit: each statement is its own transaction, appended to the WAL
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        # Orders can complete on several dispatch workers at once (order_dispatch.py)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL survives process crashes; a power loss can drop the last writes,
+        # which reconcile() recovers from the slave order comments.
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS mappings ("
+            " master_login INTEGER NOT NULL,"
+            " master_ticket INTEGER NOT NULL,"
+            " slave_login INTEGER NOT NULL,"
+            " slave_ticket INTEGER NOT NULL,"
+            " symbol TEXT,"
+            " opened_at REAL,"
+            " PRIMARY KEY (master_login, master_ticket, slave_login))"
+        )
+        # Filling-mode stats per slave symbol (filling_cache.py)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS filling_modes ("
+            " slave_login INTEGER NOT NULL,"
+            " symbol TEXT NOT NULL,"
+            " mode INTEGER NOT NULL,"
+            " fills INTEGER NOT NULL,"
+            " invalid INTEGER NOT NULL,"
+            " errors INTEGER NOT NULL,"
+            " latency_ms REAL,"
+            " updated_at REAL,"
+            " PRIMARY KEY (slave_login, symbol, mode))"
+        )
+
+    def record(self, master_login, master_ticket, slave_login, slave_ticket, symbol=None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO mappings VALUES (?, ?, ?, ?, ?, ?)",
+                (master_login, master_ticket, slave_login, slave_ticket, symbol, time.time()),
+            )
+
+    def remove(self, master_login, master_ticket, slave_login):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM mappings WHERE master_login = ? AND master_ticket = ? AND slave_login = ?",
+                (master_login, master_ticket, slave_login),
+            )
+
+    def load(self, master_login, slave_login):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT master_ticket, slave_ticket FROM mappings WHERE master_login = ? AND slave_login = ?",
+                (master_login, slave_login),
+            )
+            return dict(rows.fetchall())
+
+    def replace(self, master_login, slave_login, mapping, symbols=None):
+        """Overwrite the stored mappings of this master/slave pair in one transaction."""
+        symbols = symbols or {}
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "DELETE FROM mappings WHERE master_login = ? AND slave_login = ?", (master_login, slave_login)
+            )
+            self._conn.executemany(
+                "INSERT INTO mappings VALUES (?, ?, ?, ?, ?, ?)",
+                [(master_login, mt, slave_login, st, symbols.get(st), now) for mt, st in mapping.items()],
+            )
+
+    def load_filling(self, slave_login):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT symbol, mode, fills, invalid, errors, latency_ms FROM filling_modes WHERE slave_login = ?",
+                (slave_login,),
+            )
+            return rows.fetchall()
+
+    def save_filling(self, slave_login, rows):
+        """Upsert (symbol, mode, fills, invalid, errors, latency_ms) rows in one transaction."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO filling_modes VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(slave_login, *row, now) for row in rows],
+            )
+
+    def close(self):
+        self._conn.close()
+
+
+def reconcile(stored, master_positions, slave_positions, magic=COPIER_MAGIC):
+    """
+    Rebuild {master_ticket: slave_ticket} from the stored mapping and live snapshots.
+    `slave_positions` is {ticket: position} with magic/comment fields.
+    Returns (mapping, to_close, unmatched) where `to_close` are master tickets whose
+    master position is gone but whose slave copy is still open, and `unmatched` are
+    slave tickets carrying the copier magic that could not be tied to a master ticket.
+    """
+    mapping = {mt: st for mt, st in stored.items() if st in slave_positions}
+
+    mapped_slaves = set(mapping.values())
+    unmatched = []
+    for ticket, pos in slave_positions.items():
+        if pos.magic != magic or ticket in mapped_slaves:
+            continue
+        master_ticket = parse_copy_comment(pos.comment)
+        if master_ticket is not None and master_ticket not in mapping:
+            mapping[master_ticket] = ticket
+        else:
+            unmatched.append(ticket)
+
+    master_tickets = {p.ticket for p in master_positions}
+    to_close = [mt for mt in mapping if mt not in master_tickets]
+    return mapping, to_close, unmatched
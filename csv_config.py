@@ -0,0 +1,42 @@
+"""
+Readers for the copier's small CSV files (credentials.csv, slaves.csv, masters.csv).
+
+The csv module is enough for files of a few rows; the copier, the master
+feed and the dual / fan-out / aggregate modes import nothing heavier at
+startup (pandas stays a dashboard-only dependency). symbol_mapping.csv is
+read by symbol_mapper.py.
+
+Values come back as stripped strings; an empty cell is "" (see blank()).
+"""
+
+import csv
+
+
+class ConfigError(ValueError):
+    pass
+
+
+def read_rows(path, required=()):
+    """Rows of `path` as dicts; raises ConfigError if a `required` column is missing."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        columns = [c.strip() for c in reader.fieldnames or ()]
+        missing = [c for c in required if c not in columns]
+        if missing:
+            raise ConfigError(f"{path} missing columns: {', '.join(missing)}")
+        reader.fieldnames = columns
+        return [
+            {k: (v or "").strip() for k, v in row.items() if k is not None}
+            for row in reader
+            if any((v or "").strip() for v in row.values() if isinstance(v, str))
+        ]
+
+
+def read_titles(path):
+    """{Title: Value} of a two-column Title,Value file such as credentials.csv."""
+    rows = read_rows(path, required=("Title", "Value"))
+    return {row["Title"]: row["Value"] for row in rows}
+
+
+def blank(value):
+    return value is None or str(value).strip() == ""
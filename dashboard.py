@@ -1,31 +1,72 @@
 import os
+import signal
 import sys
 import webbrowser
 import subprocess
-from datetime import datetime, date
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
 
-import pandas as pd
 from flask import (
     Flask,
+    Response,
     render_template,
     request,
     redirect,
     url_for,
     send_file,
     flash,
+    jsonify,
 )
 
+import order_log
+from dashboard_events import EventHub
+from latency_stats import latency_report
+from mapping_repository import DuplicateSymbol, MappingRepository
+from orderlog_store import OrderLogStore, date_bounds
+from symbol_mapper import MappingError, parse_rows
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 SYMBOL_MAPPING_FILE = os.path.join(BASE_DIR, "symbol_mapping.csv")
 ORDERLOG_FILE = os.path.join(BASE_DIR, "orderlog.txt")
 
+# Stage metrics endpoints (stage_metrics.py): the copier started from here serves on
+# COPIER_METRICS_PORT; master_feed.py serves /metrics.json on its HTTP port when enabled.
+COPIER_METRICS_PORT = int(os.environ.get("MT5_COPIER_METRICS_PORT", "8766"))
+FEED_HTTP_PORT = int(os.environ.get("MT5_COPIER_HTTP_PORT", "0"))
+# Mapping control endpoint (symbol_mapper.serve_mapping_control) of the copier started from here:
+# Watchlist edits are pushed to it and take effect on the copier's next pass.
+COPIER_CONTROL_PORT = int(os.environ.get("MT5_COPIER_CONTROL_PORT", "8767"))
+# Seconds Stop waits for the copier to shut down (flushing its order log) before killing it
+COPIER_STOP_TIMEOUT = 10
+
+# Most recent rows of the selected date range rendered in the Order Logs tab
+ORDERLOG_DISPLAY_ROWS = 5000
+# Seconds between background compactions of orderlog.txt (deleted records are dropped from the file)
+ORDERLOG_COMPACT_INTERVAL = float(os.environ.get("MT5_COPIER_ORDERLOG_COMPACT_INTERVAL", "30"))
+# Live events (/events): seconds between checks of the log tail / copier state, and between
+# stage-metrics pushes. Nothing is checked while no browser is subscribed.
+EVENTS_INTERVAL = float(os.environ.get("MT5_COPIER_EVENTS_INTERVAL", "0.25"))
+EVENTS_METRICS_INTERVAL = float(os.environ.get("MT5_COPIER_EVENTS_METRICS_INTERVAL", "2"))
+
 app = Flask(__name__)
 app.secret_key = "mt5_trade_copier_dashboard"
 
 # Track copier subprocess (mt5_connect.py) started from the dashboard
 _copier_process: subprocess.Popen | None = None
 
+# Parsed orderlog.txt; each request only parses the lines appended since the last one
+orderlog_store = OrderLogStore(ORDERLOG_FILE)
+_compactor: threading.Thread | None = None
+_compactor_lock = threading.Lock()
+
+# Live events pushed to browsers (dashboard_events.py)
+events = EventHub()
+_event_watcher: threading.Thread | None = None
+_event_watcher_lock = threading.Lock()
+
 
 def is_copier_running() -> bool:
     global _copier_process
@@ -40,113 +81,147 @@ def is_copier_running() -> bool:
 
 # ----------------------------- Helpers: Watchlist ----------------------------- #
 
-def load_symbol_mapping_df() -> pd.DataFrame:
-    if not os.path.exists(SYMBOL_MAPPING_FILE):
-        return pd.DataFrame(columns=["master_symbol", "slave_symbol", "slave_lot"])
+def push_symbol_mapping(data: bytes) -> None:
+    """Send symbol_mapping.csv contents to the running copier's control endpoint (no-op if it is not listening)."""
+    req = urllib.request.Request(
+        f"http://127.0.0.1:{COPIER_CONTROL_PORT}/mapping", data=data, method="PUT",
+        headers={"Content-Type": "text/csv"},
+    )
     try:
-        df = pd.read_csv(SYMBOL_MAPPING_FILE)
-        # Ensure expected columns exist
-        for col in ["master_symbol", "slave_symbol", "slave_lot"]:
-            if col not in df.columns:
-                df[col] = "" if col != "slave_lot" else 1.0
-        return df
-    except Exception as e:
-        flash(f"Failed to read symbol_mapping.csv: {e}", "danger")
-        return pd.DataFrame(columns=["master_symbol", "slave_symbol", "slave_lot"])
+        with urllib.request.urlopen(req, timeout=1.0) as resp:
+            applied = json.loads(resp.read().decode("utf-8"))
+        print(f"🔄 Symbol mapping pushed to the copier (version {applied['version']}).")
+    except urllib.error.HTTPError as e:
+        raise RuntimeError(f"copier rejected the mapping: {e.read().decode('utf-8', 'replace')}")
+    except (urllib.error.URLError, OSError):
+        pass  # no copier listening: it loads symbol_mapping.csv when started
 
 
-def save_symbol_mapping_df(df: pd.DataFrame) -> None:
-    try:
-        df.to_csv(SYMBOL_MAPPING_FILE, index=False)
-    except Exception as e:
-        flash(f"Failed to save symbol_mapping.csv: {e}", "danger")
+# Watchlist rows by master_symbol; edits are pushed to the copier and written to the CSV behind the request
+symbol_mappings = MappingRepository(SYMBOL_MAPPING_FILE, on_flush=push_symbol_mapping)
 
 
-# ------------------------------ Helpers: Logs -------------------------------- #
+def _mapping_form():
+    """(master_symbol, slave_symbol, slave_lot) of the add / edit form, or None after flashing what is wrong."""
+    master_symbol = request.form.get("master_symbol", "").strip()
+    slave_symbol = request.form.get("slave_symbol", "").strip()
+    slave_lot = request.form.get("slave_lot", "").strip() or "1.0"
 
-def parse_orderlog_line(line: str):
-    line = line.strip()
-    if not line:
+    if not master_symbol or not slave_symbol:
+        flash("Master and slave symbols are required.", "warning")
         return None
-    parts = [p.strip() for p in line.split("|")]
+
     try:
-        ts_str = parts[0]
-        ts = datetime.strptime(ts_str, "%Y-%m-%d %H:%M:%S")
-    except Exception:
-        ts = None
-
-    latency_ms = None
-    for p in parts:
-        if "LATENCY_MS=" in p:
-            try:
-                latency_ms = float(p.split("LATENCY_MS=")[-1])
-            except ValueError:
-                latency_ms = None
-            break
-
-    return {
-        "timestamp": ts,
-        "timestamp_str": parts[0],
-        "raw": line,
-        "latency_ms": latency_ms,
-    }
-
-
-def load_orderlogs():
-    if not os.path.exists(ORDERLOG_FILE):
-        return []
-    rows = []
-    with open(ORDERLOG_FILE, "r", encoding="utf-8") as f:
-        for idx, line in enumerate(f):
-            parsed = parse_orderlog_line(line)
-            if parsed is None:
-                continue
-            parsed["id"] = idx  # line index used for delete
-            rows.append(parsed)
-    return rows
-
-
-def filter_logs(logs, filter_type, start_date_str=None, end_date_str=None):
-    if filter_type == "all":
-        return logs
-
-    if filter_type == "today":
-        today = date.today()
-        return [
-            log
-            for log in logs
-            if log["timestamp"] is not None and log["timestamp"].date() == today
-        ]
-
-    if filter_type == "custom":
+        lot = float(slave_lot)
+    except ValueError:
+        flash("Slave lot must be a number.", "warning")
+        return None
+    return master_symbol, slave_symbol, lot
+
+
+# ------------------------------ Helpers: Logs -------------------------------- #
+
+def _compact_orderlogs():
+    while True:
+        time.sleep(ORDERLOG_COMPACT_INTERVAL)
+        try:
+            if orderlog_store.deleted_count():
+                dropped = orderlog_store.compact()
+                if dropped:
+                    print(f"🔄 orderlog.txt compacted: {dropped} deleted record(s) removed")
+        except Exception as e:
+            print(f"⚠️ orderlog.txt compaction failed: {e}")
+
+
+def start_orderlog_compactor():
+    """Start the background compaction thread (once, in the process that serves requests)."""
+    global _compactor
+    with _compactor_lock:
+        if _compactor is None:
+            _compactor = threading.Thread(target=_compact_orderlogs, name="orderlog-compactor", daemon=True)
+            _compactor.start()
+
+
+def load_orderlogs(filter_type, start_date_str=None, end_date_str=None):
+    """(rows to display, rows matching the filter): the newest ORDERLOG_DISPLAY_ROWS of the date range."""
+    start_orderlog_compactor()
+    orderlog_store.refresh()
+    start, end = date_bounds(filter_type, start_date_str, end_date_str)
+    return orderlog_store.newest(start, end, ORDERLOG_DISPLAY_ROWS)
+
+
+def load_latency_report(filter_type, start_date_str=None, end_date_str=None):
+    """Latency breakdowns (latency_stats.py) of the records in the date range; cached until the log changes."""
+    start_orderlog_compactor()
+    return latency_report(orderlog_store, *date_bounds(filter_type, start_date_str, end_date_str))
+
+
+# ---------------------------- Helpers: Metrics ------------------------------ #
+
+def load_stage_metrics():
+    """[(source, snapshot or None, error)] for the copier and (if enabled) the master feed."""
+    sources = [("Copier", COPIER_METRICS_PORT)]
+    if FEED_HTTP_PORT > 0:
+        sources.append(("Master feed", FEED_HTTP_PORT))
+    results = []
+    for name, port in sources:
+        url = f"http://127.0.0.1:{port}/metrics.json"
         try:
-            start = (
-                datetime.strptime(start_date_str, "%Y-%m-%d").date()
-                if start_date_str
-                else None
-            )
-            end = (
-                datetime.strptime(end_date_str, "%Y-%m-%d").date()
-                if end_date_str
-                else None
-            )
-        except Exception:
-            return logs
-
-        def in_range(d: date):
-            if start and d < start:
-                return False
-            if end and d > end:
-                return False
-            return True
-
-        return [
-            log
-            for log in logs
-            if log["timestamp"] is not None and in_range(log["timestamp"].date())
-        ]
-
-    return logs
+            with urllib.request.urlopen(url, timeout=0.5) as resp:
+                payload = json.loads(resp.read().decode("utf-8"))
+            for snapshot in payload.values():
+                results.append((name, snapshot, None))
+        except Exception as e:
+            results.append((name, None, f"{url} not reachable ({type(e).__name__})"))
+    return results
+
+
+# ---------------------------- Helpers: Events ------------------------------- #
+
+def _log_row_event(row):
+    return {"id": str(row.id), "timestamp_str": row.timestamp_str, "latency_ms": row.latency_ms, "raw": row.raw}
+
+
+def _metrics_event(results):
+    return [{"source": source, "snapshot": snapshot, "error": error} for source, snapshot, error in results]
+
+
+def _watch_events():
+    """Publish appended log records, copier state changes and stage metrics while anyone listens."""
+    cursor, running, metrics_due = None, None, 0.0
+    while True:
+        time.sleep(EVENTS_INTERVAL)
+        if not events.subscribers:
+            cursor, running = None, None  # start from the current tail when someone subscribes again
+            continue
+        try:
+            cursor, rows, reset = orderlog_store.follow(cursor, ORDERLOG_DISPLAY_ROWS)
+            if reset:
+                events.publish("reload", {})
+            elif rows:
+                events.publish("orderlog", {"rows": [_log_row_event(row) for row in rows]})
+
+            now_running = is_copier_running()
+            if now_running != running:
+                if running is not None:
+                    events.publish("copier", {"running": now_running})
+                running = now_running
+
+            now = time.monotonic()
+            if now >= metrics_due:
+                metrics_due = now + EVENTS_METRICS_INTERVAL
+                events.publish("metrics", _metrics_event(load_stage_metrics()))
+        except Exception as e:
+            print(f"⚠️ Dashboard event watcher failed: {e}")
+
+
+def start_event_watcher():
+    """Start the thread that feeds /events (once, on the first subscriber)."""
+    global _event_watcher
+    with _event_watcher_lock:
+        if _event_watcher is None:
+            _event_watcher = threading.Thread(target=_watch_events, name="dashboard-events", daemon=True)
+            _event_watcher.start()
 
 
 # --------------------------------- Routes ----------------------------------- #
@@ -158,34 +233,66 @@ def index():
 
     # Watchlist data + search
     search_query = request.args.get("search", "").strip()
-    mapping_df = load_symbol_mapping_df()
-    filtered_mapping_df = mapping_df
-    if search_query and not mapping_df.empty:
-        mask = (
-            mapping_df["master_symbol"].astype(str).str.contains(search_query, case=False, na=False)
-            | mapping_df["slave_symbol"].astype(str).str.contains(search_query, case=False, na=False)
+    mapping = symbol_mappings.rows()
+    if symbol_mappings.error:
+        flash(symbol_mappings.error, "danger")
+    if symbol_mappings.duplicates:
+        flash(
+            f"symbol_mapping.csv maps {', '.join(symbol_mappings.duplicates)} more than once; the copier uses "
+            "the last row (shown here). Saving any change removes the others.",
+            "warning",
         )
-        filtered_mapping_df = mapping_df[mask]
+    if search_query:
+        needle = search_query.lower()
+        mapping = [row for row in mapping
+                   if needle in row["master_symbol"].lower() or needle in row["slave_symbol"].lower()]
 
     # Orderlogs data and filters
     filter_type = request.args.get("filter", "today")
     start_date_str = request.args.get("start_date", "")
     end_date_str = request.args.get("end_date", "")
 
-    logs = load_orderlogs()
-    filtered_logs = filter_logs(logs, filter_type, start_date_str, end_date_str)
+    logs, logs_total = [], 0
+    if active_tab == "orderlogs":
+        logs, logs_total = load_orderlogs(filter_type, start_date_str, end_date_str)
+
+    metrics = load_stage_metrics() if active_tab == "metrics" else []
+    latency = load_latency_report(filter_type, start_date_str, end_date_str) if active_tab == "latency" else None
 
     return render_template(
         "dashboard.html",
         copier_running=is_copier_running(),
         active_tab=active_tab,
-        mapping=filtered_mapping_df.to_dict(orient="records"),
+        mapping=mapping,
         search=search_query,
-        logs=filtered_logs,
+        logs=logs,
+        logs_total=logs_total,
+        max_log_rows=ORDERLOG_DISPLAY_ROWS,
         filter_type=filter_type,
         start_date=start_date_str,
         end_date=end_date_str,
+        metrics=metrics,
+        latency=latency,
+    )
+
+
+@app.get("/api/latency")
+def api_latency():
+    filter_type = request.args.get("filter", "today")
+    report = load_latency_report(filter_type, request.args.get("start_date", ""), request.args.get("end_date", ""))
+    return jsonify(report)
+
+
+@app.get("/events")
+def events_stream():
+    """Server-Sent Events: new order-log records, copier state and stage metrics as they happen."""
+    start_event_watcher()
+    stream = events.stream(
+        request.headers.get("Last-Event-ID"),
+        initial=[("copier", {"running": is_copier_running()})],
     )
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(stream, mimetype="text/event-stream", headers=headers)
 
 
 # ------------------------------ Watchlist CRUD ------------------------------ #
@@ -193,94 +300,66 @@ def index():
 
 @app.post("/watchlist/add")
 def watchlist_add():
-    master_symbol = request.form.get("master_symbol", "").strip()
-    slave_symbol = request.form.get("slave_symbol", "").strip()
-    slave_lot = request.form.get("slave_lot", "").strip() or "1.0"
-
-    if not master_symbol or not slave_symbol:
-        flash("Master and slave symbols are required.", "warning")
+    row = _mapping_form()
+    if row is None:
         return redirect(url_for("index", tab="watchlist"))
 
     try:
-        lot = float(slave_lot)
-    except ValueError:
-        flash("Slave lot must be a number.", "warning")
+        symbol_mappings.add(*row)
+    except DuplicateSymbol as e:
+        flash(f"{e} Edit that mapping instead.", "warning")
+        return redirect(url_for("index", tab="watchlist"))
+    except MappingError as e:
+        flash(str(e), "danger")
         return redirect(url_for("index", tab="watchlist"))
-
-    df = load_symbol_mapping_df()
-    df = pd.concat(
-        [
-            df,
-            pd.DataFrame(
-                [
-                    {
-                        "master_symbol": master_symbol,
-                        "slave_symbol": slave_symbol,
-                        "slave_lot": lot,
-                    }
-                ]
-            ),
-        ],
-        ignore_index=True,
-    )
-    save_symbol_mapping_df(df)
     flash("Symbol mapping added.", "success")
     return redirect(url_for("index", tab="watchlist"))
 
 
-@app.post("/watchlist/edit/<int:row_index>")
-def watchlist_edit(row_index: int):
-    df = load_symbol_mapping_df()
-    if row_index < 0 or row_index >= len(df):
-        flash("Invalid row selected.", "danger")
-        return redirect(url_for("index", tab="watchlist"))
-
-    master_symbol = request.form.get("master_symbol", "").strip()
-    slave_symbol = request.form.get("slave_symbol", "").strip()
-    slave_lot = request.form.get("slave_lot", "").strip() or "1.0"
-
-    if not master_symbol or not slave_symbol:
-        flash("Master and slave symbols are required.", "warning")
+@app.post("/watchlist/edit")
+def watchlist_edit():
+    key = request.form.get("key", "")
+    row = _mapping_form()
+    if row is None:
         return redirect(url_for("index", tab="watchlist"))
 
     try:
-        lot = float(slave_lot)
-    except ValueError:
-        flash("Slave lot must be a number.", "warning")
+        symbol_mappings.update(key, *row)
+    except KeyError:
+        flash("Invalid row selected.", "danger")
+        return redirect(url_for("index", tab="watchlist"))
+    except DuplicateSymbol as e:
+        flash(str(e), "warning")
+        return redirect(url_for("index", tab="watchlist"))
+    except MappingError as e:
+        flash(str(e), "danger")
         return redirect(url_for("index", tab="watchlist"))
-
-    df.iloc[row_index] = {
-        "master_symbol": master_symbol,
-        "slave_symbol": slave_symbol,
-        "slave_lot": lot,
-    }
-    save_symbol_mapping_df(df)
     flash("Symbol mapping updated.", "success")
     return redirect(url_for("index", tab="watchlist"))
 
 
-@app.post("/watchlist/delete/<int:row_index>")
-def watchlist_delete(row_index: int):
-    df = load_symbol_mapping_df()
-    if 0 <= row_index < len(df):
-        df = df.drop(df.index[row_index]).reset_index(drop=True)
-        save_symbol_mapping_df(df)
+@app.post("/watchlist/delete")
+def watchlist_delete():
+    try:
+        symbol_mappings.delete(request.form.get("key", ""))
         flash("Symbol mapping deleted.", "success")
-    else:
+    except KeyError:
         flash("Invalid row selected.", "danger")
+    except MappingError as e:
+        flash(str(e), "danger")
     return redirect(url_for("index", tab="watchlist"))
 
 
 @app.post("/watchlist/delete_all")
 def watchlist_delete_all():
-    df = pd.DataFrame(columns=["master_symbol", "slave_symbol", "slave_lot"])
-    save_symbol_mapping_df(df)
+    symbol_mappings.replace([])
     flash("All symbol mappings deleted.", "success")
     return redirect(url_for("index", tab="watchlist"))
 
 
 @app.route("/watchlist/export", methods=["GET"])
 def watchlist_export():
+    symbol_mappings.flush()  # include edits not written yet
     if not os.path.exists(SYMBOL_MAPPING_FILE):
         flash("No symbol_mapping.csv to export.", "warning")
         return redirect(url_for("index", tab="watchlist"))
@@ -298,14 +377,14 @@ def watchlist_import():
         flash("No file selected.", "warning")
         return redirect(url_for("index", tab="watchlist"))
     try:
-        df = pd.read_csv(file)
-        if not all(c in df.columns for c in ["master_symbol", "slave_symbol", "slave_lot"]):
-            flash("CSV must contain master_symbol, slave_symbol, slave_lot.", "danger")
-            return redirect(url_for("index", tab="watchlist"))
-        save_symbol_mapping_df(df)
-        flash("Symbol mappings imported (existing settings overwritten).", "success")
-    except Exception as e:
+        rows = parse_rows(file.read().decode("utf-8-sig"))
+    except (MappingError, UnicodeDecodeError) as e:
         flash(f"Failed to import CSV: {e}", "danger")
+        return redirect(url_for("index", tab="watchlist"))
+    duplicates = symbol_mappings.replace(rows)
+    flash("Symbol mappings imported (existing settings overwritten).", "success")
+    if duplicates:
+        flash(f"The file maps {', '.join(duplicates)} more than once; the last row of each was kept.", "warning")
     return redirect(url_for("index", tab="watchlist"))
 
 
@@ -329,15 +408,10 @@ def orderlogs_delete():
         flash("Invalid selection.", "danger")
         return redirect(url_for("index", tab="orderlogs"))
 
-    lines = []
-    with open(ORDERLOG_FILE, "r", encoding="utf-8") as f:
-        lines = f.readlines()
-
-    remaining = [
-        line for idx, line in enumerate(lines) if idx not in selected_ids
-    ]
-    with open(ORDERLOG_FILE, "w", encoding="utf-8") as f:
-        f.writelines(remaining)
+    # Tombstones only (record ids, orderlog_store.py); the background compaction rewrites the file
+    orderlog_store.delete(selected_ids)
+    start_orderlog_compactor()
+    events.publish("deleted", {"ids": [str(record_id) for record_id in selected_ids]})
 
     flash(f"Deleted {len(selected_ids)} log(s).", "success")
     return redirect(url_for("index", tab="orderlogs"))
@@ -346,7 +420,7 @@ def orderlogs_delete():
 @app.post("/orderlogs/delete_all")
 def orderlogs_delete_all():
     if os.path.exists(ORDERLOG_FILE):
-        open(ORDERLOG_FILE, "w", encoding="utf-8").close()
+        order_log.clear(ORDERLOG_FILE)
         flash("All logs deleted.", "success")
     else:
         flash("orderlog.txt not found.", "danger")
@@ -364,8 +438,17 @@ def copier_start():
         return redirect(url_for("index"))
 
     try:
+        symbol_mappings.flush()  # the copier loads symbol_mapping.csv at startup
         cmd = [sys.executable, os.path.join(BASE_DIR, "mt5_connect.py")]
-        _copier_process = subprocess.Popen(cmd, cwd=BASE_DIR)
+        env = dict(
+            os.environ,
+            MT5_COPIER_METRICS_PORT=str(COPIER_METRICS_PORT),
+            MT5_COPIER_CONTROL_PORT=str(COPIER_CONTROL_PORT),
+        )
+        # Own process group on Windows, so Stop can send it CTRL_BREAK (SIGBREAK) instead of killing it
+        flags = subprocess.CREATE_NEW_PROCESS_GROUP if os.name == "nt" else 0
+        _copier_process = subprocess.Popen(cmd, cwd=BASE_DIR, env=env, creationflags=flags)
+        events.publish("copier", {"running": True})
         flash("Copier started.", "success")
     except Exception as e:
         flash(f"Failed to start copier: {e}", "danger")
@@ -380,13 +463,23 @@ def copier_stop():
         return redirect(url_for("index"))
 
     try:
-        _copier_process.terminate()
-        _copier_process.wait(timeout=5)
+        # SIGTERM / CTRL_BREAK let the copier write its queued order log records (mt5_connect.exit_on_terminate);
+        # terminate() on Windows would kill it outright
+        if os.name == "nt":
+            _copier_process.send_signal(signal.CTRL_BREAK_EVENT)
+        else:
+            _copier_process.terminate()
+        try:
+            _copier_process.wait(timeout=COPIER_STOP_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            _copier_process.kill()
+            _copier_process.wait(timeout=5)
         flash("Copier stopped.", "success")
     except Exception as e:
         flash(f"Failed to stop copier: {e}", "danger")
     finally:
         _copier_process = None
+        events.publish("copier", {"running": False})
     return redirect(url_for("index"))
 
 
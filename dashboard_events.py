@@ -0,0 +1,99 @@
+"""
+Live event channel of the dashboard (dashboard.py: /events, Server-Sent Events).
+
+EventHub is a sequenced broadcast log: publish(name, data) gives the event
+the next sequence number and keeps the last `history` events; every SSE
+connection waits on the hub and writes out what was published after the
+last sequence it sent. A browser reconnecting with Last-Event-ID
+("<epoch>:<seq>") resumes where it stopped; one that is too far behind or
+comes from an older dashboard run (epoch differs) gets a "reset" event and
+reloads the page.
+
+Events (data is JSON):
+    orderlog  {"rows": [{"id", "timestamp_str", "latency_ms", "raw"}, ...]}  records appended to orderlog.txt
+    deleted   {"ids": [...]}                records deleted from the dashboard
+    reload    {}                            orderlog.txt was rewritten (compaction, cleared, replaced)
+    copier    {"running": bool}             copier process started / stopped
+    metrics   [{"source", "snapshot", "error"}, ...]  stage metrics (while someone is subscribed)
+
+Record ids are sent as strings (they exceed JavaScript's exact integer range).
+"""
+
+import json
+import threading
+import time
+from collections import deque
+
+# Events kept for reconnecting clients
+HISTORY = 1024
+# Seconds between ": keep-alive" comments on an idle stream
+SSE_KEEPALIVE = 15.0
+
+
+class EventHub:
+    def __init__(self, history=HISTORY, epoch=None):
+        self.epoch = epoch or f"{int(time.time() * 1000):x}"
+        self.seq = 0
+        self.subscribers = 0
+        self._log = deque(maxlen=history)  # (seq, name, data)
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    def publish(self, name, data):
+        with self._lock:
+            self.seq += 1
+            self._log.append((self.seq, name, json.dumps(data, separators=(",", ":"))))
+            self._changed.notify_all()
+
+    def cursor(self, last_event_id=None):
+        """Sequence to resume after for a Last-Event-ID header; None if the client must reload."""
+        if not last_event_id:
+            return self.seq
+        epoch, _, seq = last_event_id.partition(":")
+        try:
+            seq = int(seq)
+        except ValueError:
+            return None
+        with self._lock:
+            if epoch != self.epoch or seq > self.seq or (seq < self.seq and self._log and seq < self._log[0][0] - 1):
+                return None
+        return seq
+
+    def wait(self, after, timeout):
+        """Events [(seq, name, json)] published after sequence `after`; [] after `timeout` seconds without any."""
+        with self._changed:
+            self._changed.wait_for(lambda: self.seq > after, timeout)
+            return [event for event in self._log if event[0] > after]
+
+    def stream(self, last_event_id=None, initial=()):
+        """SSE body: `initial` (name, data) events, then everything published, with keep-alives."""
+        after = self.cursor(last_event_id)
+        with self._lock:
+            self.subscribers += 1
+        try:
+            yield "retry: 2000\n\n"
+            if after is None:
+                after = self.seq
+                yield format_event(f"{self.epoch}:{after}", "reset", "{}")
+            for name, data in initial:
+                yield format_event(None, name, json.dumps(data, separators=(",", ":")))
+            while True:
+                events = self.wait(after, SSE_KEEPALIVE)
+                if not events:
+                    yield ": keep-alive\n\n"
+                    continue
+                if events[0][0] > after + 1:  # fell behind the retained history
+                    after = events[-1][0]
+                    yield format_event(f"{self.epoch}:{after}", "reset", "{}")
+                    continue
+                for seq, name, data in events:
+                    yield format_event(f"{self.epoch}:{seq}", name, data)
+                after = events[-1][0]
+        finally:
+            with self._lock:
+                self.subscribers -= 1
+
+
+def format_event(event_id, name, data):
+    head = f"id: {event_id}\n" if event_id else ""
+    return f"{head}event: {name}\ndata: {data}\n\n"
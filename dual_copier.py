@@ -0,0 +1,250 @@
+"""
+Dual-terminal copier mode (no master/slave login switching).
+
+- Master watcher process: bound to its own MT5 terminal via
+  mt5.initialize(path=...), logged into the MASTER account only. It polls
+  positions continuously and pushes a compact snapshot onto a local queue
+  whenever something changed.
+- Slave executor process: bound to a second terminal, logged into the SLAVE
+  account only. It consumes snapshots and runs the same copy / SL-TP / close
+  logic as mt5_connect.py, so copy latency is one order_send, not two logins
+  plus an order.
+
+Each MT5 terminal can serve one Python process, so two terminal installations
+are needed. Add their paths to credentials.csv:
+    master_terminal_path,C:\\Program Files\\MT5 Master\\terminal64.exe
+    slave_terminal_path,C:\\Program Files\\MT5 Slave\\terminal64.exe
+
+Run:
+    python mt5_connect.py --dual
+    (or python dual_copier.py)
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+from collections import namedtuple
+
+import MetaTrader5 as mt5
+
+import mt5_connect
+import order_log
+from order_dispatch import dispatcher_from_env
+from poll_scheduler import scheduler_from_env
+from position_diff import PositionDiffEngine
+from symbol_mapper import MappingWatcher
+
+# How often the watcher polls master positions (seconds). No login switches happen
+# in this mode, so the watcher can poll much faster than the single-terminal loop.
+# Bursts at the min interval after a change, backs off to the max when idle.
+WATCHER_MIN_INTERVAL = 0.005
+WATCHER_POLL_INTERVAL = 0.05
+# How long the executor blocks on the queue before re-checking the stop flag (seconds).
+EXECUTOR_WAIT = 0.5
+
+# Picklable subset of TradePosition that the slave side needs.
+MasterPosition = namedtuple("MasterPosition", ["ticket", "symbol", "type", "volume", "sl", "tp"])
+# What the watcher publishes: positions plus a sequence number, publish time (time.time())
+# and the master account they came from
+SnapshotMessage = namedtuple("SnapshotMessage", ["seq", "published_at", "positions", "master_login"])
+
+
+def connect_terminal(path, login, password, server):
+    """Bind this process to the terminal at `path` and log in to `login`."""
+    ok = mt5.initialize(path) if path else mt5.initialize()
+    if not ok:
+        print(f"❌ Failed to initialize MT5 terminal {path or '(default)'}: {mt5.last_error()}")
+        return False
+    if not mt5.login(login, password, server):
+        print(f"❌ Failed to login to account {login}: {mt5.last_error()}")
+        mt5.shutdown()
+        return False
+    print(f"✅ Connected to account {login} on terminal {path or '(default)'}")
+    return True
+
+
+def snapshot_positions(positions):
+    return tuple(
+        MasterPosition(p.ticket, p.symbol, p.type, p.volume, p.sl, p.tp)
+        for p in positions or ()
+    )
+
+
+# -----------------------------------------------------------------------------
+# Master watcher: poll master, publish snapshots on change
+# -----------------------------------------------------------------------------
+# `outputs`: one queue per slave executor; every snapshot goes to all of them.
+# `master`: optional account settings (fanout_copier.TerminalAccount) instead of the master_* rows
+# of credentials.csv.
+def master_watcher(outputs, stop_event, master=None):
+    if master is None:
+        if not mt5_connect.load_credentials():
+            print("❌ Failed to load credentials. Watcher exiting.")
+            stop_event.set()
+            return
+        login, password, server = mt5_connect.MASTER_LOGIN, mt5_connect.MASTER_PASSWORD, mt5_connect.MASTER_SERVER
+        path = mt5_connect.MASTER_TERMINAL_PATH
+    else:
+        login, password, server, path = master.login, master.password, master.server, master.terminal_path
+    if not connect_terminal(path, login, password, server):
+        stop_event.set()
+        return
+
+    scheduler = scheduler_from_env(WATCHER_MIN_INTERVAL, WATCHER_POLL_INTERVAL)
+    last = None
+    seq = 0
+    try:
+        while not stop_event.is_set():
+            positions = mt5.positions_get()
+            if positions is not None:
+                snapshot = snapshot_positions(positions)
+                if snapshot != last:
+                    message = SnapshotMessage(seq, time.time(), snapshot, login)
+                    for snapshots in outputs:
+                        snapshots.put(message)
+                    if last is not None:
+                        scheduler.mark_activity()
+                    last = snapshot
+                    seq += 1
+            if scheduler.report_due():
+                print(scheduler.summary())
+            scheduler.wait()
+    finally:
+        mt5.shutdown()
+
+
+# -----------------------------------------------------------------------------
+# Slave executor: stay logged into the slave, act on snapshots
+# -----------------------------------------------------------------------------
+def _latest(snapshots, timeout):
+    """Block for one snapshot, then drain the queue so only the newest is acted on."""
+    snapshot = snapshots.get(timeout=timeout)
+    while True:
+        try:
+            snapshot = snapshots.get_nowait()
+        except queue.Empty:
+            return snapshot
+
+
+# slave: optional account settings (fanout_copier.TerminalAccount) replacing the slave_* rows of credentials.csv.
+# reports: optional queue receiving (slave_login, seq, published_at, done_at, acted) per snapshot handled.
+# copier: the mt5_connect module whose globals hold this slave's state (a private copy when several
+#         executors share one process, see fanout_copier.py).
+def slave_executor(snapshots, stop_event, slave=None, reports=None, copier=None):
+    mt5_connect.exit_on_terminate()  # as a process: flush the order log on SIGTERM too
+    copier = copier or mt5_connect
+    if not copier.load_credentials():
+        print("❌ Failed to load credentials. Executor exiting.")
+        stop_event.set()
+        return
+    mapping_file = copier.CSV_FILE
+    if slave is not None:
+        copier.SLAVE_LOGIN, copier.SLAVE_PASSWORD, copier.SLAVE_SERVER = slave.login, slave.password, slave.server
+        copier.SLAVE_TERMINAL_PATH = slave.terminal_path
+        mapping_file = slave.symbol_mapping
+    # Reloaded in the background when the file changes (symbol_mapper.py)
+    mapping_watcher = MappingWatcher(mapping_file, slave.lot_multiplier if slave is not None else 1.0)
+    symbol_mapping = mapping_watcher.mapping
+    if not symbol_mapping:
+        print(f"❌ No symbol mapping found in {mapping_file}. Executor exiting.")
+        stop_event.set()
+        return
+    if not connect_terminal(copier.SLAVE_TERMINAL_PATH, copier.SLAVE_LOGIN,
+                            copier.SLAVE_PASSWORD, copier.SLAVE_SERVER):
+        stop_event.set()
+        return
+    copier.warm_slave_symbols(symbol_mapping)
+    mapping_watcher.start()
+    # Order workers attach to this process's slave terminal
+    copier.order_dispatcher = dispatcher_from_env(copier.SLAVE_TERMINAL_PATH)
+
+    try:
+        # The first snapshot is what was open when the copier started: ignore it.
+        initial = None
+        while initial is None and not stop_event.is_set():
+            try:
+                initial = _latest(snapshots, EXECUTOR_WAIT)
+            except queue.Empty:
+                continue
+        if initial is None:
+            return
+        copier.existing_trades = {t.ticket for t in initial.positions}
+        engine = PositionDiffEngine(initial.positions)
+        print(f"ℹ️ Ignoring {len(copier.existing_trades)} existing trades.")
+        slave_positions = copier.get_slave_positions()
+        to_close = copier.restore_state(initial.positions, slave_positions)
+        if to_close:
+            print("🔍 Master closed copied trades while the copier was down! Closing on Slave...")
+            copier._do_sync_closures(to_close, slave_positions=slave_positions)
+        print(f"📡 Slave executor {copier.SLAVE_LOGIN} ready (dual-terminal mode, no login switching).")
+
+        master_trades = initial.positions
+        while not stop_event.is_set():
+            try:
+                message = _latest(snapshots, EXECUTOR_WAIT)
+                master_trades = message.positions
+            except queue.Empty:
+                message = None  # diff the last snapshot again so failed orders are retried (when due)
+            symbol_mapping = mapping_watcher.mapping
+            # Failed orders whose backoff expired are reported again
+            events = copier._pass_events(engine, master_trades, symbol_mapping)[0]
+            if events:
+                copier._do_apply_events(events, symbol_mapping, engine)
+            if reports is not None and message is not None:
+                reports.put((copier.SLAVE_LOGIN, message.seq, message.published_at, time.time(), bool(events)))
+    finally:
+        mapping_watcher.stop()
+        if copier.order_dispatcher is not None:
+            copier.order_dispatcher.shutdown()
+        # multiprocessing children exit without running atexit: flush the order log here
+        order_log.close()
+        mt5.shutdown()
+
+
+# -----------------------------------------------------------------------------
+# Runner
+# -----------------------------------------------------------------------------
+def run_dual_copier(use_threads=False, stop_event=None):
+    """
+    Start the watcher and executor and wait for them.
+    `use_threads=True` runs both roles in this process (for the simulator in
+    mt5_sim.py, which models each terminal per thread); the live terminal needs
+    separate processes.
+    """
+    if use_threads:
+        snapshots = queue.Queue()
+        stop_event = stop_event or threading.Event()
+        workers = [
+            threading.Thread(target=master_watcher, args=([snapshots], stop_event), name="master-watcher"),
+            threading.Thread(target=slave_executor, args=(snapshots, stop_event), name="slave-executor"),
+        ]
+    else:
+        snapshots = multiprocessing.Queue()
+        stop_event = stop_event or multiprocessing.Event()
+        workers = [
+            multiprocessing.Process(target=master_watcher, args=([snapshots], stop_event), name="master-watcher"),
+            multiprocessing.Process(target=slave_executor, args=(snapshots, stop_event), name="slave-executor"),
+        ]
+
+    for worker in workers:
+        worker.start()
+    print("📡 Dual-terminal copier running: master watcher + slave executor. (Stop with Ctrl+C)")
+    try:
+        while any(w.is_alive() for w in workers):
+            if stop_event.is_set():
+                break
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        print("\nStopping...")
+    finally:
+        stop_event.set()
+        for worker in workers:
+            worker.join(timeout=5)
+        order_log.close()
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    mt5_connect.exit_on_terminate()
+    run_dual_copier()
@@ -0,0 +1,218 @@
+"""
+One master copied to many slave accounts (fan-out).
+
+One master watcher (dual_copier.master_watcher) polls the master terminal and
+broadcasts every changed snapshot to N slave executors. Each executor is bound
+to its own terminal, logged into its own slave account, and keeps its own
+symbol mapping, lot multiplier, filling cache and ticket mapping. Adding a
+slave adds no master polling: the master is read once per poll, whatever the
+number of slaves.
+
+Slaves are listed in slaves.csv:
+    login,password,server,terminal_path,symbol_mapping,lot_multiplier
+    7001,secret,Broker-Live,C:\\MT5 Client A\\terminal64.exe,symbol_mapping.csv,1.0
+    7002,secret,Broker-Live,C:\\MT5 Client B\\terminal64.exe,mapping_b.csv,0.5
+`symbol_mapping` defaults to symbol_mapping.csv and `lot_multiplier` (applied on
+top of the mapping's slave_lot) to 1.0. The master comes from credentials.csv
+(master_* rows and master_terminal_path).
+
+Fan-out latency is reported per master change: from the watcher publishing the
+snapshot to the last slave finishing its orders for it.
+
+Run:
+    python mt5_connect.py --fanout
+    (or python fanout_copier.py)
+"""
+
+import importlib.util
+import multiprocessing
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+
+import dual_copier
+import mt5_connect
+import order_log
+from csv_config import ConfigError, blank, read_rows
+
+SLAVES_FILE = "slaves.csv"
+# How often the runner prints the fan-out summary (seconds)
+REPORT_INTERVAL = 300.0
+
+# One account on its own terminal (a row of slaves.csv / masters.csv)
+TerminalAccount = namedtuple("TerminalAccount", [
+    "login", "password", "server", "terminal_path", "symbol_mapping", "lot_multiplier", "magic",
+])
+
+# Fan-out stats of the running copier (see FanoutStats)
+fanout_stats = None
+
+
+def load_accounts(csv_file=SLAVES_FILE):
+    """Rows of `csv_file` as TerminalAccount; optional columns: symbol_mapping, lot_multiplier, magic."""
+    try:
+        rows = read_rows(csv_file, required=("login", "password", "server", "terminal_path"))
+    except ConfigError as e:
+        print(f"❌ {e}")
+        return []
+    except Exception as e:
+        print(f"❌ Error reading accounts from {csv_file}: {e}")
+        return []
+    accounts = []
+    try:
+        for row in rows:
+            mapping = row.get("symbol_mapping")
+            multiplier = row.get("lot_multiplier")
+            magic = row.get("magic")
+            accounts.append(TerminalAccount(
+                login=int(row["login"]),
+                password=row["password"],
+                server=row["server"],
+                terminal_path=row["terminal_path"],
+                symbol_mapping=mapping if not blank(mapping) else "symbol_mapping.csv",
+                lot_multiplier=float(multiplier) if not blank(multiplier) else 1.0,
+                magic=int(float(magic)) if not blank(magic) else None,
+            ))
+    except ValueError as e:
+        print(f"❌ Error reading accounts from {csv_file}: {e}")
+        return []
+    return accounts
+
+
+def _percentile(ordered, q):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(round((len(ordered) - 1) * q / 100.0)))]
+
+
+class FanoutStats:
+    """
+    Per master snapshot: time from publish until every slave has handled it.
+    A slave that skipped a snapshot (it drained a newer one) is done with it when
+    it finishes the newer one.
+    """
+
+    def __init__(self, slave_logins, window=1000):
+        self.slave_logins = set(slave_logins)
+        self.snapshots = 0
+        self._pending = {}  # seq -> [published_at, {login: done_at}, acted]
+        self._last = {}  # login -> (seq, done_at)
+        self._fanout = deque(maxlen=window)
+
+    def report(self, login, seq, published_at, done_at, acted):
+        self._last[login] = (seq, done_at)
+        if seq not in self._pending:
+            done = {l: t for l, (s, t) in self._last.items() if s >= seq}
+            self._pending[seq] = [published_at, done, acted]
+        for pending_seq, entry in list(self._pending.items()):
+            if pending_seq > seq:
+                continue
+            entry[1].setdefault(login, done_at)
+            if pending_seq == seq:
+                entry[2] = entry[2] or acted
+            if self.slave_logins <= set(entry[1]):
+                del self._pending[pending_seq]
+                if entry[2]:
+                    self.snapshots += 1
+                    self._fanout.append(max(entry[1].values()) - entry[0])
+
+    def snapshot(self):
+        ordered = sorted(self._fanout)
+
+        def ms(value):
+            return None if value is None else round(value * 1000.0, 1)
+
+        return {
+            "slaves": len(self.slave_logins),
+            "snapshots": self.snapshots,
+            "fanout_p50_ms": ms(_percentile(ordered, 50)),
+            "fanout_p95_ms": ms(_percentile(ordered, 95)),
+            "fanout_max_ms": ms(ordered[-1] if ordered else None),
+        }
+
+    def summary(self):
+        s = self.snapshot()
+        return (
+            f"📊 Fan-out to {s['slaves']} slave(s): {s['snapshots']} master changes, "
+            f"all slaves done p50 {s['fanout_p50_ms'] or 0:.0f} ms / p95 {s['fanout_p95_ms'] or 0:.0f} ms"
+        )
+
+
+def isolated_copier():
+    """
+    A private instance of mt5_connect with its own globals (mapping, caches, slave login),
+    for running several slave executors as threads of one process. Separate processes
+    get this for free.
+    """
+    spec = importlib.util.find_spec("mt5_connect")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_fanout_copier(slaves=None, use_threads=False, stop_event=None):
+    """
+    Start one master watcher and one executor per slave, and wait for them.
+    `use_threads=True` runs everything in this process (for the simulator in mt5_sim.py).
+    """
+    global fanout_stats
+
+    slaves = slaves if slaves is not None else load_accounts(SLAVES_FILE)
+    if not slaves:
+        print(f"❌ No slaves found in {SLAVES_FILE}. Exiting.")
+        return
+
+    if use_threads:
+        stop_event = stop_event or threading.Event()
+        reports = queue.Queue()
+        outputs = [queue.Queue() for _ in slaves]
+        workers = [threading.Thread(target=dual_copier.master_watcher, args=(outputs, stop_event),
+                                    name="master-watcher")]
+        workers += [
+            threading.Thread(target=dual_copier.slave_executor,
+                             args=(out, stop_event, slave, reports, isolated_copier()),
+                             name=f"slave-executor-{slave.login}")
+            for slave, out in zip(slaves, outputs)
+        ]
+    else:
+        stop_event = stop_event or multiprocessing.Event()
+        reports = multiprocessing.Queue()
+        outputs = [multiprocessing.Queue() for _ in slaves]
+        workers = [multiprocessing.Process(target=dual_copier.master_watcher, args=(outputs, stop_event),
+                                           name="master-watcher")]
+        workers += [
+            multiprocessing.Process(target=dual_copier.slave_executor,
+                                    args=(out, stop_event, slave, reports),
+                                    name=f"slave-executor-{slave.login}")
+            for slave, out in zip(slaves, outputs)
+        ]
+
+    fanout_stats = FanoutStats(s.login for s in slaves)
+    for worker in workers:
+        worker.start()
+    print(f"📡 Fan-out copier running: 1 master watcher → {len(slaves)} slave executor(s). (Stop with Ctrl+C)")
+    last_report = time.monotonic()
+    try:
+        while any(w.is_alive() for w in workers) and not stop_event.is_set():
+            try:
+                fanout_stats.report(*reports.get(timeout=0.5))
+            except queue.Empty:
+                pass
+            if time.monotonic() - last_report >= REPORT_INTERVAL:
+                last_report = time.monotonic()
+                print(fanout_stats.summary())
+    except KeyboardInterrupt:
+        print("\nStopping...")
+    finally:
+        stop_event.set()
+        for worker in workers:
+            worker.join(timeout=5)
+        order_log.close()
+        print(fanout_stats.summary())
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    mt5_connect.exit_on_terminate()
+    run_fanout_copier()
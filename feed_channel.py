@@ -0,0 +1,316 @@
+"""
+Torn-read-free publication of master_state.json (master_feed.py).
+
+write_atomic() writes the new content to a temp file next to the target and
+swaps it in with os.replace(): a reader opening the path gets either the old
+or the new file, never a truncated or half-written one. (On Windows the swap
+fails while a reader holds the file open without delete sharing; it is
+retried for up to REPLACE_RETRIES ms.)
+
+MappedChannel is an optional second channel: a memory-mapped file
+(master_state.mmap) with a seqlock header and two payload slots.
+
+    offset  size
+    0       8     magic b"MT5FEED1"
+    8       8     counter   uint64: odd while the writer is switching slots
+    16      4     capacity  uint32: bytes per slot
+    20      4     active    uint32: slot holding the current payload (0 / 1)
+    24      8     length    uint32 x 2: payload length per slot
+    32      8     seq       uint64: feed seq of the current payload
+    64      ...   slot 0, then slot 1 (capacity bytes each)
+
+The writer fills the inactive slot, then makes the counter odd, flips
+`active`, updates length / seq (the counter is not touched meanwhile) and
+stores the even counter last. A reader:
+- checks in O(1) whether anything changed: read the counter (8 bytes) and
+  compare with the last value it saw;
+- reads the payload consistently: counter (retry while odd), active slot and
+  length, copy of the slot, counter again; equal counters mean the copy is
+  whole (the writer only ever fills the slot that is not active, so this
+  fails only if two publications overlap the copy). After a failed attempt
+  it backs off (yield, then short sleeps); if it still gets no consistent
+  copy after READ_RETRIES attempts it returns the last payload it read.
+The file is also readable with plain file reads (FileSeek / FileReadLong in
+MQL5) since it shares the page cache with the mapping.
+
+There is one writer per channel (the feed loop); publish() is serialized
+with a lock for safety. Run `python feed_channel.py --stress` for the
+concurrent writer / reader stress test.
+
+Environment:
+    MT5_COPIER_FEED_MMAP            1 = also publish to master_state.mmap (default 0)
+    MT5_COPIER_FEED_MMAP_CAPACITY   bytes per slot (default 1048576); larger payloads only go to the JSON file
+"""
+
+import mmap
+import os
+import struct
+import threading
+import time
+
+MAGIC = b"MT5FEED1"
+HEADER_SIZE = 64
+_HEADER = struct.Struct("<8sQIIIIQ")  # magic, counter, capacity, active, length 0, length 1, seq
+_COUNTER = struct.Struct("<Q")
+_COUNTER_OFFSET = 8
+_FIELDS = struct.Struct("<IIIQ")  # active, length 0, length 1, seq: what a publication changes besides the counter
+_FIELDS_OFFSET = 20
+CAPACITY = 1 << 20
+# How many times a failed os.replace is retried, 1 ms apart (Windows readers holding the file open)
+REPLACE_RETRIES = 50
+# Consistent-read attempts before MappedChannelReader.read() falls back to the last payload it read
+READ_RETRIES = 1000
+# Failed attempts that only yield the CPU before the reader sleeps READ_BACKOFF seconds between attempts
+READ_SPINS = 100
+READ_BACKOFF = 0.0001
+
+
+def write_atomic(path, data):
+    """Replace `path` with `data` (bytes) so readers never see a partial file."""
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        for attempt in range(REPLACE_RETRIES):
+            try:
+                os.replace(tmp, path)
+                return
+            except PermissionError:
+                if attempt == REPLACE_RETRIES - 1:
+                    raise
+                time.sleep(0.001)
+    except BaseException:
+        # Any failure (disk full, a reader's lock, KeyboardInterrupt): leave no temp file behind
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class MappedChannel:
+    """Writer side of the memory-mapped double buffer (see module docstring)."""
+
+    def __init__(self, path, capacity=CAPACITY):
+        self.path = path
+        self.capacity = capacity
+        self.publications = 0
+        self.oversized = 0
+        self._lock = threading.Lock()
+        size = HEADER_SIZE + 2 * capacity
+        with open(path, "a+b") as f:
+            f.truncate(size)
+            self._mm = mmap.mmap(f.fileno(), size)
+        self._counter = 0
+        self._active = 1  # the first publication goes to slot 0
+        self._lengths = [0, 0]
+        self._write_header(0)
+
+    def _write_header(self, seq):
+        _HEADER.pack_into(self._mm, 0, MAGIC, self._counter, self.capacity, self._active,
+                          self._lengths[0], self._lengths[1], seq)
+
+    def publish(self, data, seq=0):
+        """Make `data` (bytes) the current payload. Returns False if it does not fit in a slot."""
+        if len(data) > self.capacity:
+            self.oversized += 1
+            return False
+        with self._lock:
+            slot = 1 - self._active
+            start = HEADER_SIZE + slot * self.capacity
+            self._mm[start:start + len(data)] = data
+            self._counter += 1  # odd: switching
+            _COUNTER.pack_into(self._mm, _COUNTER_OFFSET, self._counter)
+            self._active = slot
+            self._lengths[slot] = len(data)
+            _FIELDS.pack_into(self._mm, _FIELDS_OFFSET, slot, self._lengths[0], self._lengths[1], seq)
+            self._counter += 1  # even: consistent, stored last
+            _COUNTER.pack_into(self._mm, _COUNTER_OFFSET, self._counter)
+            self.publications += 1
+        return True
+
+    def close(self):
+        self._mm.close()
+
+
+class MappedChannelReader:
+    """Reader side: changed() in O(1), read() never returns a partial payload."""
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:8] != MAGIC:
+            raise ValueError(f"{path} is not a feed channel")
+        self.last_counter = None
+        self.retries = 0
+        self.stale = 0  # reads answered with the last payload after READ_RETRIES failed attempts
+        self._last = None
+
+    def counter(self):
+        return _COUNTER.unpack_from(self._mm, _COUNTER_OFFSET)[0]
+
+    def changed(self):
+        return self.counter() != self.last_counter
+
+    def read(self):
+        """(seq, payload bytes) of the current publication.
+
+        Falls back to the last payload read (changed() stays True) if the writer keeps
+        every attempt from succeeding; raises RuntimeError only if there is none yet."""
+        for attempt in range(READ_RETRIES):
+            if attempt:
+                self.retries += 1
+                time.sleep(0 if attempt < READ_SPINS else READ_BACKOFF)
+            before = self.counter()
+            if before & 1:
+                continue
+            _, _, capacity, active, len0, len1, seq = _HEADER.unpack_from(self._mm, 0)
+            start = HEADER_SIZE + active * capacity
+            data = self._mm[start:start + (len1 if active else len0)]
+            if self.counter() == before:
+                self.last_counter = before
+                self._last = (seq, data)
+                return self._last
+        if self._last is None:
+            raise RuntimeError("feed channel: no consistent read (writer publishing continuously?)")
+        self.stale += 1
+        return self._last
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+
+def channel_from_env(output_dir, filename="master_state.mmap"):
+    """MappedChannel in `output_dir` if MT5_COPIER_FEED_MMAP is set, else None."""
+    if os.environ.get("MT5_COPIER_FEED_MMAP", "0").strip().lower() in ("", "0", "false", "no"):
+        return None
+    capacity = int(os.environ.get("MT5_COPIER_FEED_MMAP_CAPACITY", str(CAPACITY)))
+    return MappedChannel(os.path.join(output_dir, filename), capacity)
+
+
+# -----------------------------------------------------------------------------
+# Stress test: python feed_channel.py --stress [--writers 4 --readers 4 --seconds 5]
+# -----------------------------------------------------------------------------
+def _payload(writer, n, rng):
+    import json
+    import zlib
+
+    pad = "x" * rng.randrange(0, 20000)
+    return json.dumps({"writer": writer, "n": n, "pad": pad, "crc": zlib.crc32(f"{writer}:{n}:{pad}".encode())})
+
+
+def _valid(text):
+    import json
+    import zlib
+
+    try:
+        doc = json.loads(text)
+    except ValueError:
+        return False
+    return doc["crc"] == zlib.crc32(f"{doc['writer']}:{doc['n']}:{doc['pad']}".encode())
+
+
+def _file_reader(path, deadline, results):
+    reads = bad = 0
+    while time.time() < deadline:
+        try:
+            with open(path, "rb") as f:
+                text = f.read()
+        except (FileNotFoundError, PermissionError):
+            bad += 1
+            continue
+        reads += 1
+        if not _valid(text):
+            bad += 1
+    results.put(("file", reads, bad, 0))
+
+
+def _channel_reader(path, deadline, results):
+    reader = MappedChannelReader(path)
+    reads = bad = 0
+    while time.time() < deadline:
+        if not reader.changed():
+            continue
+        _, data = reader.read()
+        reads += 1
+        if not _valid(data):
+            bad += 1
+    results.put(("mmap", reads, bad, reader.retries))
+    reader.close()
+
+
+def _stress(writers=4, readers=4, seconds=5.0, naive=False):
+    import multiprocessing
+    import random
+    import tempfile
+
+    with tempfile.TemporaryDirectory(prefix="mt5_feed_channel_") as workdir:
+        state_path = os.path.join(workdir, "master_state.json")
+        channel = MappedChannel(os.path.join(workdir, "master_state.mmap"), capacity=32768)
+        first = _payload(0, 0, random.Random(0)).encode()
+        write_atomic(state_path, first)
+        channel.publish(first)
+
+        deadline = time.time() + seconds
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=target, args=(path, deadline, results))
+                 for target, path in ((_file_reader, state_path), (_channel_reader, channel.path))
+                 for _ in range(readers)]
+        for p in procs:
+            p.start()
+
+        written = [0] * writers
+
+        def write(w):
+            rng = random.Random(w)
+            n = 0
+            while time.time() < deadline:
+                n += 1
+                data = _payload(w, n, rng).encode()
+                if naive:
+                    with open(state_path, "wb") as f:  # the old in-place write, for comparison
+                        f.write(data)
+                else:
+                    write_atomic(state_path, data)
+                channel.publish(data, seq=n)
+            written[w] = n
+
+        threads = [threading.Thread(target=write, args=(w,)) for w in range(writers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        totals = {}
+        for _ in procs:
+            kind, reads, bad, retries = results.get()
+            r = totals.setdefault(kind, [0, 0, 0])
+            r[0] += reads
+            r[1] += bad
+            r[2] += retries
+        for p in procs:
+            p.join()
+        channel.close()
+
+    print(f"{writers} writer thread(s), {sum(written)} publications in {seconds:.0f}s "
+          f"({'in-place file writes' if naive else 'temp file + os.replace'})")
+    print(f"  {'channel':<8} {'readers':>7} {'reads':>9} {'torn/failed':>12} {'seqlock retries':>16}")
+    for kind, (reads, bad, retries) in sorted(totals.items()):
+        print(f"  {kind:<8} {readers:>7} {reads:>9} {bad:>12} {retries if kind == 'mmap' else '-':>16}")
+    return totals
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="master_state publication stress test")
+    parser.add_argument("--stress", action="store_true")
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4, help="reader processes per channel")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--naive", action="store_true", help="write the JSON file in place (old behaviour)")
+    args = parser.parse_args()
+    if args.stress:
+        _stress(args.writers, args.readers, args.seconds, args.naive)
+    else:
+        parser.print_help()
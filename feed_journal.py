@@ -0,0 +1,119 @@
+"""
+Sequenced position journal for master_feed.py (delta protocol).
+
+Every change of the master's positions gets the next sequence number; the
+journal keeps the current book and the last `history` changes, so a
+consumer that has seen sequence N can ask for what changed since N:
+
+    since(N) → {"seq": M, "epoch": E, "full": false,
+                "upserts": [position, ...],   # added or modified since N
+                "removed": [ticket, ...]}     # closed since N
+
+A consumer that is too far behind (N older than the retained changes, or a
+merged delta that would be larger than the book), that comes from another
+feed run (`epoch` differs) or that has no sequence yet gets a full snapshot
+instead:
+
+    since(None) → {"seq": M, "epoch": E, "full": true, "positions": [...]}
+
+`seq` only grows within one run; `epoch` identifies the run, so a restarted
+feed (seq starting again at 1) is never mistaken for the old one.
+
+The symbol mapping is not part of the position payloads: it is published on
+its own (master_feed.py: /mapping and master_mapping.json) under a version
+hash, which every payload carries as `mapping_version`.
+
+wait() blocks until the journal moves past a sequence number (or the mapping
+version changes); master_feed.py's long-poll and Server-Sent Events endpoints
+answer from it, so a consumer learns about a change as soon as it is
+published instead of on its next poll.
+"""
+
+import threading
+import time
+from collections import deque
+
+# Changes kept for delta requests; older consumers get a full snapshot
+HISTORY = 1024
+
+
+class FeedJournal:
+    def __init__(self, history=HISTORY, epoch=None):
+        self.epoch = epoch or f"{int(time.time() * 1000):x}"
+        self.seq = 0
+        self.mapping_version = ""
+        self.changes = 0
+        self._book = {}  # ticket -> position dict
+        self._log = deque(maxlen=history)  # (seq, upserted tickets, removed tickets)
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    def publish(self, positions):
+        """Record `positions` (dicts with a "ticket") as the current book. Returns True if anything changed."""
+        book = {p["ticket"]: p for p in positions}
+        old = self._book
+        upserts = [t for t, p in book.items() if old.get(t) != p]
+        removed = [t for t in old if t not in book]
+        if not upserts and not removed:
+            return False
+        with self._lock:
+            self.seq += 1
+            self.changes += len(upserts) + len(removed)
+            self._book = book
+            self._log.append((self.seq, upserts, removed))
+            self._changed.notify_all()
+        return True
+
+    def set_mapping_version(self, version):
+        with self._lock:
+            self.mapping_version = version
+            self._changed.notify_all()
+
+    def wait(self, seq, timeout, mapping_version=None):
+        """Block until seq > `seq` or the mapping version differs from `mapping_version`; False on timeout."""
+        def moved():
+            return self.seq > seq or (mapping_version is not None and self.mapping_version != mapping_version)
+
+        with self._changed:
+            return self._changed.wait_for(moved, timeout)
+
+    def snapshot(self):
+        with self._lock:
+            return self._full()
+
+    def _full(self):
+        return {
+            "seq": self.seq,
+            "epoch": self.epoch,
+            "mapping_version": self.mapping_version,
+            "full": True,
+            "positions": list(self._book.values()),
+        }
+
+    def since(self, seq, epoch=None):
+        """Changes after `seq` (see module docstring); a full snapshot when a delta cannot be built."""
+        with self._lock:
+            return self._since(seq, epoch)
+
+    def _since(self, seq, epoch):
+        if seq is None or (epoch is not None and epoch != self.epoch) or seq > self.seq:
+            return self._full()
+        if seq < self.seq and (not self._log or self._log[0][0] > seq + 1):
+            return self._full()  # the changes right after `seq` are no longer kept
+        touched, removed = set(), set()
+        for entry_seq, upserts, gone in reversed(self._log):
+            if entry_seq <= seq:
+                break
+            touched.update(upserts)
+            removed.update(gone)
+        if len(touched) + len(removed) > len(self._book):
+            return self._full()  # cheaper to resend the book
+        book = self._book
+        return {
+            "seq": self.seq,
+            "epoch": self.epoch,
+            "mapping_version": self.mapping_version,
+            "full": False,
+            "upserts": [book[t] for t in touched if t in book],
+            "removed": sorted(t for t in touched | removed if t not in book),
+        }
@@ -0,0 +1,165 @@
+"""
+Per-symbol filling-mode cache for slave orders.
+
+Replaces the per-run trial-and-error (IOC, then FOK, then RETURN) on the first
+order of every symbol:
+- seeded from the symbol_info().filling_mode bitmask (SYMBOL_FILLING_FOK=1,
+  SYMBOL_FILLING_IOC=2) when the slave contracts are warmed, so the first
+  order already uses a mode the broker advertises;
+- keeps per symbol and mode: fills, INVALID_FILL rejections, other errors and
+  a moving average of the order_send latency. candidates() puts the fastest
+  mode that has filled first, then the advertised modes, then the rest;
+- persisted in copier_state.db (table filling_modes, per slave login) so a
+  restart starts from what the last run learned.
+
+`saved` counts the order_send round trips avoided against the old discovery
+order: for the first order of each symbol in a run, the attempts the fixed
+IOC/FOK/RETURN sequence would have needed minus the attempts actually made.
+"""
+
+import threading
+
+import MetaTrader5 as mt5
+
+ORDER_FILLING_FOK = getattr(mt5, "ORDER_FILLING_FOK", 0)
+ORDER_FILLING_IOC = getattr(mt5, "ORDER_FILLING_IOC", 1)
+ORDER_FILLING_RETURN = getattr(mt5, "ORDER_FILLING_RETURN", 2)
+SYMBOL_FILLING_FOK = getattr(mt5, "SYMBOL_FILLING_FOK", 1)
+SYMBOL_FILLING_IOC = getattr(mt5, "SYMBOL_FILLING_IOC", 2)
+
+FILLING_NAMES = {ORDER_FILLING_FOK: "FOK", ORDER_FILLING_IOC: "IOC", ORDER_FILLING_RETURN: "RETURN"}
+# The order the copier used to try modes in when nothing was cached
+DISCOVERY_ORDER = (ORDER_FILLING_IOC, ORDER_FILLING_FOK, ORDER_FILLING_RETURN)
+# Weight of the newest sample in the latency moving average
+LATENCY_ALPHA = 0.2
+
+
+def filling_name(mode):
+    return FILLING_NAMES.get(mode, str(mode))
+
+
+def advertised_modes(bitmask):
+    """ORDER_FILLING_* modes a symbol_info().filling_mode bitmask allows (IOC first)."""
+    modes = []
+    if bitmask & SYMBOL_FILLING_IOC:
+        modes.append(ORDER_FILLING_IOC)
+    if bitmask & SYMBOL_FILLING_FOK:
+        modes.append(ORDER_FILLING_FOK)
+    if not modes:
+        # Neither flag: exchange / request execution, where RETURN is the accepted mode
+        modes.append(ORDER_FILLING_RETURN)
+    return modes
+
+
+class ModeStats:
+    __slots__ = ("fills", "invalid", "errors", "latency_ms")
+
+    def __init__(self, fills=0, invalid=0, errors=0, latency_ms=None):
+        self.fills = fills
+        self.invalid = invalid
+        self.errors = errors
+        self.latency_ms = latency_ms
+
+
+class FillingModeCache:
+    def __init__(self):
+        self._advertised = {}  # symbol -> [ORDER_FILLING_*]
+        self._stats = {}  # symbol -> {mode: ModeStats}
+        self._dirty = set()  # (symbol, mode) changed since the last flush()
+        self._first_done = set()  # symbols whose first order of this run completed
+        self._lock = threading.Lock()
+        self._store = None
+        self._slave_login = None
+        self.orders = 0
+        self.round_trips = 0
+        self.rejected = 0  # INVALID_FILL round trips
+        self.saved = 0
+
+    def attach(self, store, slave_login):
+        """Load what earlier runs learned for `slave_login` and persist to `store` from now on."""
+        if self._store is store and self._slave_login == slave_login:
+            return
+        self._store, self._slave_login = store, slave_login
+        rows = store.load_filling(slave_login)
+        with self._lock:
+            for symbol, mode, fills, invalid, errors, latency_ms in rows:
+                self._stats.setdefault(symbol, {})[mode] = ModeStats(fills, invalid, errors, latency_ms)
+        if rows:
+            print(f"ℹ️ Loaded filling-mode stats for {len({r[0] for r in rows})} symbol(s).")
+
+    def seed(self, symbol, bitmask):
+        self._advertised[symbol] = advertised_modes(bitmask)
+
+    def candidates(self, symbol):
+        """Modes to try for `symbol`, best first."""
+        with self._lock:
+            stats = dict(self._stats.get(symbol, {}))
+        working = sorted(
+            (m for m, s in stats.items() if s.fills and s.invalid <= s.fills),
+            key=lambda m: (stats[m].latency_ms if stats[m].latency_ms is not None else float("inf")),
+        )
+        rest = [m for m in list(self._advertised.get(symbol, ())) + list(DISCOVERY_ORDER) if m not in working]
+        untried = [m for m in rest if m not in stats or not stats[m].invalid]
+        rejected = [m for m in rest if m not in untried]
+        return list(dict.fromkeys(working + untried + rejected))
+
+    def record(self, symbol, mode, filled, latency_ms, invalid_fill):
+        with self._lock:
+            self.round_trips += 1
+            s = self._stats.setdefault(symbol, {}).setdefault(mode, ModeStats())
+            if filled:
+                s.fills += 1
+                s.latency_ms = latency_ms if s.latency_ms is None else (
+                    LATENCY_ALPHA * latency_ms + (1.0 - LATENCY_ALPHA) * s.latency_ms
+                )
+            elif invalid_fill:
+                s.invalid += 1
+                self.rejected += 1
+            else:
+                s.errors += 1
+            self._dirty.add((symbol, mode))
+
+    def finish(self, symbol, mode, attempts, filled):
+        """Count one order that needed `attempts` round trips and ended in `mode`."""
+        with self._lock:
+            self.orders += 1
+            if filled and symbol not in self._first_done:
+                self._first_done.add(symbol)
+                baseline = DISCOVERY_ORDER.index(mode) + 1 if mode in DISCOVERY_ORDER else attempts
+                self.saved += max(0, baseline - attempts)
+
+    def flush(self):
+        """Write changed stats to the store (one transaction)."""
+        if self._store is None or not self._dirty:
+            return
+        with self._lock:
+            rows = [
+                (symbol, mode, s.fills, s.invalid, s.errors, s.latency_ms)
+                for symbol, mode in self._dirty
+                for s in (self._stats[symbol][mode],)
+            ]
+            self._dirty.clear()
+        self._store.save_filling(self._slave_login, rows)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "orders": self.orders,
+                "round_trips": self.round_trips,
+                "invalid_fill": self.rejected,
+                "saved_round_trips": self.saved,
+                "symbols": {
+                    symbol: {
+                        filling_name(m): {"fills": s.fills, "invalid": s.invalid, "errors": s.errors,
+                                          "latency_ms": None if s.latency_ms is None else round(s.latency_ms, 1)}
+                        for m, s in modes.items()
+                    }
+                    for symbol, modes in self._stats.items()
+                },
+            }
+
+    def summary(self):
+        return (
+            f"📊 Filling modes: {self.orders} orders in {self.round_trips} round trips, "
+            f"{self.rejected} INVALID_FILL, {self.saved} discovery round trips saved"
+        )
@@ -0,0 +1,118 @@
+"""
+Copy-latency analytics over orderlog.txt (dashboard /api/latency and Latency tab).
+
+latency_report() aggregates LATENCY_MS of the live records in a date range
+straight from OrderLogStore's columns: overall, and per symbol (slave side),
+filling mode, kind (OPEN / CLOSE / PARTIAL_CLOSE), hour of day and calendar
+day, each with count, p50 / p95 / p99 (linear interpolation, as
+numpy.percentile), min, max and mean. Grouping is one lexsort per breakdown;
+there is no Python work per record. It also reports slave lot minus master
+lot of OPEN records, overall and per symbol, so lot-scaling mistakes show up
+next to the latency.
+
+Reports are cached per (store version, date range): the version changes only
+when rows are appended, deleted or reparsed, so a repeated view costs one
+refresh() (a stat of the log) and a dict lookup.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+import numpy as np
+
+from orderlog_store import KIND_OPEN, KINDS, NO_TS, _EPOCH
+
+PERCENTILES = (50, 95, 99)
+# Reports kept (one per store version and date range)
+CACHE_SIZE = 32
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def group_stats(keys, values, decimals=3):
+    """{key: {count, p50, p95, p99, min, max, mean}} per distinct small-integer key.
+
+    `values` must be sorted ascending (keys aligned with them): a stable sort on the keys
+    then leaves every group sorted, so the whole breakdown is one radix sort, no loop per row."""
+    if not len(values):
+        return {}
+    low_key = int(keys.min())
+    order = np.argsort((keys - low_key).astype(np.int16), kind="stable")
+    keys, values = keys[order], values[order].astype(np.float64)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    counts = np.diff(np.r_[starts, len(keys)])
+    stats = {"count": counts, "min": values[starts], "max": values[starts + counts - 1],
+             "mean": np.add.reduceat(values, starts) / counts}
+    for q in PERCENTILES:
+        position = q / 100.0 * (counts - 1)
+        low = np.floor(position).astype(np.int64)
+        high = np.minimum(low + 1, counts - 1)
+        stats[f"p{q}"] = values[starts + low] + (position - low) * (values[starts + high] - values[starts + low])
+    columns = {name: (column if name == "count" else column.round(decimals)).tolist() for name, column in stats.items()}
+    return {key: {name: columns[name][i] for name in columns} for i, key in enumerate(keys[starts].tolist())}
+
+
+def _rows(stats, names=None, order="p99"):
+    """Report rows ({"key": name, ...stats}) sorted by `order` descending, or by key if order is None."""
+    out = []
+    for key, s in stats.items():
+        name = (names[key] if 0 <= key < len(names) else "-") if names is not None else key
+        out.append({"key": name, **s})
+    if order is None:
+        return out
+    return sorted(out, key=lambda r: r[order], reverse=True)
+
+
+def latency_report(store, start=None, end=None):
+    """Latency breakdowns of the live records with a timestamp in [start, end) (naive seconds, None = open)."""
+    store.refresh()
+    key = (store.version(), start, end)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    version, report = _build(store, start, end)
+    with _cache_lock:
+        _cache[(version, start, end)] = report
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return report
+
+
+def _build(store, start, end):
+    # Rows selected and copied in one step (a compaction renumbers rows); names are only ever appended
+    version, (ts, latency, kind, symbol, filling, master_lot, slave_lot) = store.take(
+        start, end, "ts", "latency", "kind", "symbol", "filling", "master_lot", "slave_lot")
+    symbols, fillings = list(store.symbols), list(store.fillings)
+
+    # One sort by latency; every breakdown below is a stable sort of small-integer keys on top of it
+    order = np.argsort(latency, kind="stable")
+    order = order[~np.isnan(latency[order])]
+    latency, ts, kind_t, symbol_t, filling_t = (c[order] for c in (latency, ts, kind, symbol, filling))
+    known_ts = ts != NO_TS
+    day = ts[known_ts] // 86400
+    hour = (ts[known_ts] % 86400) // 3600
+
+    is_open = (kind == KIND_OPEN) & ~np.isnan(master_lot) & ~np.isnan(slave_lot)
+    diff = (slave_lot[is_open].astype(np.float64) - master_lot[is_open]).round(8)
+    diff_order = np.argsort(diff, kind="stable")
+    diff, diff_symbol = diff[diff_order], symbol[is_open][diff_order]
+
+    return version, {
+        "records": int(len(kind)),
+        "timed": int(len(latency)),
+        "overall": group_stats(np.zeros(len(latency), np.int8), latency).get(0),
+        "by_symbol": _rows(group_stats(symbol_t, latency), symbols),
+        "by_filling": _rows(group_stats(filling_t, latency), fillings),
+        "by_kind": _rows(group_stats(kind_t, latency), KINDS),
+        "by_hour": _rows(group_stats(hour, latency[known_ts]), order=None),
+        "by_day": [dict(r, key=(_EPOCH + timedelta(days=r["key"])).isoformat())
+                   for r in _rows(group_stats(day, latency[known_ts]), order=None)],
+        "lot_diff": {
+            "overall": group_stats(np.zeros(len(diff), np.int8), diff, 8).get(0),
+            "mismatched": int(np.count_nonzero(diff)),
+            "by_symbol": _rows(group_stats(diff_symbol, diff, 8), symbols, order="max"),
+        },
+    }
@@ -0,0 +1,206 @@
+"""
+In-memory symbol mapping of the dashboard's Watchlist tab.
+
+MappingRepository keeps the rows of symbol_mapping.csv in a dict keyed by
+master_symbol (file order preserved, which decides between overlapping
+wildcard rules): add, edit and delete touch one entry instead of rewriting a
+DataFrame, and a master symbol can only be mapped once. The copier's
+SymbolMapping silently keeps the last of duplicate rows; the repository
+refuses to create them and reports the ones it finds in a loaded or
+imported file (keeping the last row, as the copier does). While the file
+cannot be parsed, edits are refused rather than overwriting it; an import
+replaces it.
+
+Edits are written behind: each one bumps a revision and wakes a flusher
+thread, which waits WRITE_DELAY seconds (a burst of edits is written once),
+serializes the table, hands the bytes to `on_flush` (the dashboard pushes
+them to the running copier, symbol_mapper.serve_mapping_control) and then
+replaces the file atomically. The file is loaded again when it changes on
+disk while nothing is waiting to be written.
+"""
+
+import csv
+import io
+import os
+import threading
+import time
+
+from symbol_mapper import COLUMNS, MappingError, parse_rows
+
+# Seconds between an edit and the write / push that includes it
+WRITE_DELAY = 0.2
+
+
+class DuplicateSymbol(MappingError):
+    pass
+
+
+def _file_key(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _unique(rows):
+    """({master_symbol: (slave_symbol, slave_lot)} keeping the last of duplicates, [duplicated master symbols])."""
+    table, duplicates = {}, []
+    for master, slave, lot in rows:
+        if master in table:
+            duplicates.append(master)
+            del table[master]  # the last row wins and takes its place in the order
+        table[master] = (slave, lot)
+    return table, list(dict.fromkeys(duplicates))
+
+
+class MappingRepository:
+    def __init__(self, path, on_flush=None, write_delay=WRITE_DELAY):
+        self.path = path
+        self.on_flush = on_flush
+        self.write_delay = write_delay
+        self.duplicates = []  # master symbols listed more than once in the file last loaded
+        self.error = None  # why the file last failed to load (the previous rows are kept)
+        self._rows = {}
+        self._revision = 0
+        self._written = 0
+        self._key = None
+        self._lock = threading.Lock()
+        self._dirty = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._flusher = None
+
+    # ------------------------------------------------------------------ reads
+
+    def refresh(self):
+        """Load the file again if it changed on disk and no edit is waiting to be written."""
+        key = _file_key(self.path)
+        with self._lock:
+            if key == self._key or self._written != self._revision:
+                return
+            if key is None:
+                rows, error = [], None
+            else:
+                try:
+                    with open(self.path, "rb") as f:
+                        rows, error = parse_rows(f.read().decode("utf-8-sig")), None
+                except (OSError, UnicodeDecodeError, MappingError) as e:
+                    rows, error = None, f"Failed to read {os.path.basename(self.path)}: {e}"
+            self._key = key
+            self.error = error
+            if rows is not None:
+                self._rows, self.duplicates = _unique(rows)
+
+    def rows(self):
+        """[{"master_symbol", "slave_symbol", "slave_lot"}] in file order."""
+        self.refresh()
+        with self._lock:
+            return [{"master_symbol": master, "slave_symbol": slave, "slave_lot": lot}
+                    for master, (slave, lot) in self._rows.items()]
+
+    def __contains__(self, master_symbol):
+        with self._lock:
+            return master_symbol in self._rows
+
+    def __len__(self):
+        with self._lock:
+            return len(self._rows)
+
+    # ------------------------------------------------------------------ edits
+
+    def add(self, master_symbol, slave_symbol, slave_lot):
+        self.refresh()
+        with self._lock:
+            self._check_loaded()
+            if master_symbol in self._rows:
+                raise DuplicateSymbol(f"{master_symbol} is already mapped to {self._rows[master_symbol][0]}.")
+            self._rows[master_symbol] = (slave_symbol, slave_lot)
+            self._changed()
+
+    def update(self, key, master_symbol, slave_symbol, slave_lot):
+        """Replace the row of master symbol `key` (renaming it keeps its place). Raises KeyError / DuplicateSymbol."""
+        self.refresh()
+        with self._lock:
+            self._check_loaded()
+            if key not in self._rows:
+                raise KeyError(key)
+            if master_symbol != key:
+                if master_symbol in self._rows:
+                    raise DuplicateSymbol(f"{master_symbol} is already mapped to {self._rows[master_symbol][0]}.")
+                self._rows = {(master_symbol if master == key else master): row for master, row in self._rows.items()}
+            self._rows[master_symbol] = (slave_symbol, slave_lot)
+            self._changed()
+
+    def delete(self, master_symbol):
+        """Raises KeyError if `master_symbol` is not mapped."""
+        self.refresh()
+        with self._lock:
+            self._check_loaded()
+            del self._rows[master_symbol]
+            self._changed()
+
+    def replace(self, rows):
+        """Replace every row with [(master_symbol, slave_symbol, slave_lot)]. Returns the duplicated master symbols."""
+        table, duplicates = _unique(rows)
+        with self._lock:
+            self._rows = table
+            self.error = None
+            self._changed()
+        return duplicates
+
+    def _check_loaded(self):
+        if self.error:  # editing now would overwrite the rows that could not be read
+            raise MappingError(f"{self.error.rstrip('.')}. Fix or import the file first.")
+
+    def _changed(self):
+        self.duplicates = []  # the next write has one row per master symbol
+        self._revision += 1
+        self._dirty.notify_all()
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name="mapping-writer", daemon=True)
+            self._flusher.start()
+
+    # ----------------------------------------------------------------- writes
+
+    def to_csv(self):
+        with self._lock:
+            return self._serialize()
+
+    def _serialize(self):
+        out = io.StringIO()
+        writer = csv.writer(out, lineterminator="\n")
+        writer.writerow(COLUMNS)
+        writer.writerows((master, slave, lot) for master, (slave, lot) in self._rows.items())
+        return out.getvalue().encode("utf-8")
+
+    def _flush_loop(self):
+        while True:
+            with self._dirty:
+                self._dirty.wait_for(lambda: self._written != self._revision)
+            time.sleep(self.write_delay)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ Failed to save {self.path}: {e}")
+                time.sleep(1.0)
+
+    def flush(self):
+        """Push and write pending edits now. Returns True if anything was written."""
+        with self._flush_lock:
+            with self._lock:
+                if self._written == self._revision:
+                    return False
+                revision, data = self._revision, self._serialize()
+            if self.on_flush is not None:
+                try:
+                    self.on_flush(data)
+                except Exception as e:
+                    print(f"⚠️ Mapping push failed ({e}); the copier picks the change up from the file.")
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+            with self._lock:
+                self._written = revision
+                self._key = _file_key(self.path)
+            return True
@@ -9,16 +9,56 @@ Master account feed for MQL5 EA (backup / low-latency path).
 
 Output format: JSON that MQL5 can parse (or use the HTTP endpoint with WebRequest).
 File path is configurable so the EA can read from MT5 Common\\Files if needed.
+
+Every change of the master's positions gets the next sequence number `seq`
+(feed_journal.py). Over HTTP, /state?since=<seq>&epoch=<epoch> returns only
+the positions added, modified or removed since <seq> (or a full snapshot when
+the consumer is too far behind). The symbol mapping is published separately
+(master_mapping.json and /mapping) under `mapping_version`, which every state
+carries; consumers reload it only when the version changes.
+
+Push delivery (the HTTP server is threaded, one thread per connection):
+- long-poll: /state?since=<seq>&epoch=<epoch>&wait=<seconds> holds the request
+  until the feed is past <seq> (at most LONG_POLL_MAX_WAIT s), then answers
+  like /state?since=;
+- Server-Sent Events: /events?since=<seq>&epoch=<epoch> (or the Last-Event-ID
+  header on reconnect) streams one `delta` event per change, with a comment
+  line every SSE_KEEPALIVE s while idle.
+Run bench_feed_push.py for change-to-consumer latency of each mode.
+
+master_state.json and master_mapping.json are replaced atomically (temp file +
+os.replace, feed_channel.py), so the EA never reads a truncated file. With
+MT5_COPIER_FEED_MMAP=1 the state is also published to master_state.mmap, a
+seqlock double buffer whose 8-byte counter tells a reader in O(1) whether
+anything changed.
+
+Each poll only compares a fingerprint of the position tuples with the last
+one; the state is built, serialized and written (and `seq` advances) only
+when it differs, so `last_updated` is the time of the last change. Liveness
+is published separately: master_heartbeat.json (and /heartbeat), a few bytes
+rewritten every HEARTBEAT_INTERVAL s.
+
+HTTP responses are serialized once per state version (the bytes written to
+master_state.json are reused) and served with an ETag: a request with a
+matching If-None-Match gets 304 Not Modified, without a body. Bodies of at
+least GZIP_MIN_BYTES are gzip-encoded for clients that send
+Accept-Encoding: gzip, and connections are kept alive (HTTP/1.1).
 """
 
 import json
 import os
 import time
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from operator import attrgetter
 from threading import Thread
 
 import MetaTrader5 as mt5
-import pandas as pd
+
+from csv_config import ConfigError, read_titles
+from feed_channel import channel_from_env, write_atomic
+from feed_journal import FeedJournal
+from poll_scheduler import scheduler_from_env
+from stage_metrics import StageMetrics, metrics_response
+from symbol_mapper import MappingWatcher
 
 # -----------------------------------------------------------------------------
 # Config (same files as main copier; only master credentials used here)
@@ -33,9 +73,31 @@ SYMBOL_MAPPING_FILE = "symbol_mapping.csv"
 #   C:\\Users\\YourName\\AppData\\Roaming\\MetaQuotes\\Terminal\\Common\\Files
 OUTPUT_DIR = os.environ.get("MT5_COPIER_OUTPUT_DIR", os.path.dirname(os.path.abspath(__file__)))
 STATE_FILENAME = "master_state.json"
+MAPPING_FILENAME = "master_mapping.json"
+HEARTBEAT_FILENAME = "master_heartbeat.json"
 
 # How often to poll master positions (seconds). Lower = faster updates, more CPU.
+# POLL_INTERVAL is the idle interval; right after a change the feed polls every
+# POLL_MIN_INTERVAL for a couple of seconds (see poll_scheduler.py).
 POLL_INTERVAL = 0.2
+POLL_MIN_INTERVAL = 0.005
+# How often master_heartbeat.json is refreshed while nothing changes (seconds)
+HEARTBEAT_INTERVAL = 1.0
+
+# Bodies at least this large are gzip-encoded for clients that accept it (bytes)
+GZIP_MIN_BYTES = 8192
+# Push delivery: longest a long-poll request is held, idle interval between SSE keep-alive comments (seconds)
+LONG_POLL_MAX_WAIT = 25.0
+SSE_KEEPALIVE = 15.0
+
+# Scheduler of the running loop (exposes poll rate and detection-delay stats)
+poll_scheduler = None
+# Per-stage timers of the feed loop (poll, fingerprint, build, serialize, write); served on /metrics and /metrics.json
+stage_metrics = StageMetrics("feed")
+# Sequenced book of master positions (seq, deltas for /state?since=)
+journal = FeedJournal()
+# Memory-mapped copy of the state (MT5_COPIER_FEED_MMAP=1), opened by main()
+state_channel = None
 
 # Optional HTTP server so EA can use WebRequest instead of file (add URL in MT5 Tools -> Options -> Expert Advisors -> "Allow WebRequest for listed URL").
 HTTP_PORT = int(os.environ.get("MT5_COPIER_HTTP_PORT", "0"))  # 0 = disabled. Set e.g. 8765 to enable.
@@ -45,14 +107,14 @@ HTTP_PORT = int(os.environ.get("MT5_COPIER_HTTP_PORT", "0"))  # 0 = disabled. Se
 # -----------------------------------------------------------------------------
 def load_master_credentials():
     try:
-        df = pd.read_csv(CREDENTIALS_FILE)
-        if "Title" not in df.columns or "Value" not in df.columns:
+        try:
+            cred = read_titles(CREDENTIALS_FILE)
+        except ConfigError:
             print(f"❌ {CREDENTIALS_FILE} must have 'Title' and 'Value' columns.")
             return None
-        cred = df.set_index("Title")["Value"].to_dict()
-        login = int(cred.get("master_login", 0))
-        password = str(cred.get("master_password", "")).strip()
-        server = str(cred.get("master_server", "")).strip()
+        login = int(cred.get("master_login") or 0)
+        password = cred.get("master_password", "")
+        server = cred.get("master_server", "")
         if not all([login, password, server]):
             print("❌ Missing master_login, master_password, or master_server in credentials.")
             return None
@@ -62,25 +124,6 @@ def load_master_credentials():
         return None
 
 
-def load_symbol_mapping():
-    try:
-        df = pd.read_csv(SYMBOL_MAPPING_FILE)
-        if not all(c in df.columns for c in ["master_symbol", "slave_symbol", "slave_lot"]):
-            print(f"❌ {SYMBOL_MAPPING_FILE} must have master_symbol, slave_symbol, slave_lot.")
-            return []
-        return [
-            {
-                "master_symbol": row["master_symbol"],
-                "slave_symbol": row["slave_symbol"],
-                "slave_lot": float(row["slave_lot"]),
-            }
-            for _, row in df.iterrows()
-        ]
-    except Exception as e:
-        print(f"❌ Error reading {SYMBOL_MAPPING_FILE}: {e}")
-        return []
-
-
 # -----------------------------------------------------------------------------
 # Build state dict from current master positions (for JSON / HTTP)
 # -----------------------------------------------------------------------------
@@ -101,42 +144,136 @@ def positions_to_state(positions):
     return out
 
 
-def build_state(positions, symbol_mapping):
+# The fields published per position: a poll whose tuples are unchanged is not a change (profit, price_current are ignored)
+_fingerprint_fields = attrgetter("ticket", "symbol", "type", "volume", "price_open", "sl", "tp", "time", "comment")
+
+
+def positions_fingerprint(positions):
+    return tuple(map(_fingerprint_fields, positions or ()))
+
+
+def build_state(positions):
     return {
         "last_updated": time.time(),
-        "symbol_mapping": symbol_mapping,
         "positions": positions_to_state(positions),
     }
 
 
 # -----------------------------------------------------------------------------
-# File writer (fast: only write when state changed)
+# Symbol mapping, published on its own under a version hash
 # -----------------------------------------------------------------------------
-_last_state_json = None
+_mapping_payload = {"version": "", "symbol_mapping": []}
 
 
-def write_state_if_changed(state):
-    global _last_state_json
+def publish_mapping(mapping):
+    """Write master_mapping.json and serve it on /mapping; states carry its version from now on."""
+    global _mapping_payload
+    payload = {
+        "version": mapping.version,
+        "symbol_mapping": [
+            {"master_symbol": m, "slave_symbol": s, "slave_lot": lot} for m, s, lot in mapping.rows()
+        ],
+    }
+    path = os.path.join(OUTPUT_DIR, MAPPING_FILENAME)
+    try:
+        write_atomic(path, json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+    except Exception as e:
+        print(f"⚠️ Failed to write {path}: {e}")
+    _mapping_payload = payload
+    set_mapping_for_http(payload)
+    journal.set_mapping_version(mapping.version)
+
+
+def get_mapping_for_http():
+    return _mapping_payload
+
+
+# -----------------------------------------------------------------------------
+# File writers (state: only called on a change; heartbeat: every HEARTBEAT_INTERVAL)
+# -----------------------------------------------------------------------------
+def write_state(state):
+    """Write master_state.json (and the mmap channel); returns the serialized bytes for set_state_for_http()."""
+    started = time.perf_counter_ns()
     js = json.dumps(state, separators=(",", ":"))
-    if js == _last_state_json:
-        return
-    _last_state_json = js
+    started = stage_metrics.since("serialize", started)
     path = os.path.join(OUTPUT_DIR, STATE_FILENAME)
+    data = js.encode("utf-8")
+    try:
+        write_atomic(path, data)
+    except Exception as e:
+        print(f"⚠️ Failed to write {path}: {e}")
+    if state_channel is not None and not state_channel.publish(data, state.get("seq", 0)):
+        if state_channel.oversized == 1:
+            print(f"⚠️ State ({len(data)} bytes) exceeds the mmap slot ({state_channel.capacity}); "
+                  f"raise MT5_COPIER_FEED_MMAP_CAPACITY. Only {STATE_FILENAME} is up to date.")
+    stage_metrics.since("write", started)
+    return data
+
+
+_heartbeat = {}
+
+
+def write_heartbeat(now, last_updated):
+    """Refresh master_heartbeat.json / /heartbeat: the feed is alive and at `seq`."""
+    global _heartbeat, _heartbeat_response
+    _heartbeat = {"alive": now, "seq": journal.seq, "epoch": journal.epoch, "last_updated": last_updated}
+    data = json.dumps(_heartbeat, separators=(",", ":")).encode("utf-8")
+    _heartbeat_response = CachedResponse(data, f'"hb-{now:.3f}"')
+    path = os.path.join(OUTPUT_DIR, HEARTBEAT_FILENAME)
     try:
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(js)
+        write_atomic(path, data)
     except Exception as e:
         print(f"⚠️ Failed to write {path}: {e}")
 
 
+def get_heartbeat_for_http():
+    return _heartbeat
+
+
 # -----------------------------------------------------------------------------
 # Optional HTTP server (serves same JSON for EA WebRequest)
 # -----------------------------------------------------------------------------
-_state_for_http = None
+class CachedResponse:
+    """Serialized JSON body of one version, with its ETag; the gzip encoding is built on first use."""
+
+    __slots__ = ("body", "etag", "cursor", "_gzipped")
+
+    def __init__(self, body, etag, cursor=None):
+        self.body = body
+        self.etag = etag
+        self.cursor = cursor  # deltas: (seq, epoch, mapping_version) the payload brings the consumer to
+        self._gzipped = None
+
+    def gzipped(self):
+        if self._gzipped is None:
+            import gzip  # only needed once a client asks for it
 
+            self._gzipped = gzip.compress(self.body, compresslevel=5)  # a race only compresses twice
+        return self._gzipped
 
-def set_state_for_http(state):
-    global _state_for_http
+
+def _json_response(payload, etag, cursor=None):
+    return CachedResponse(json.dumps(payload, separators=(",", ":")).encode("utf-8"), etag, cursor)
+
+
+_EMPTY = CachedResponse(b"{}", '"empty"')
+_state_for_http = None
+_state_response = _EMPTY
+_mapping_response = _EMPTY
+_heartbeat_response = _EMPTY
+# Delta payloads of the current state, per (since, epoch, seq, mapping_version): every EA at the same seq shares one
+_delta_responses = {}
+_DELTA_CACHE_SIZE = 256
+
+
+def set_state_for_http(state, body=None):
+    """Serve `state` from now on; `body` is its serialized JSON if the caller already has it."""
+    global _state_for_http, _state_response, _delta_responses
+    if body is None:
+        body = json.dumps(state, separators=(",", ":")).encode("utf-8")
+    etag = f'"{state.get("epoch", "")}-{state.get("seq", 0)}-{state.get("mapping_version", "")}"'
+    _delta_responses = {}
+    _state_response = CachedResponse(body, etag)
     _state_for_http = state
 
 
@@ -144,26 +281,141 @@ def get_state_for_http():
     return _state_for_http
 
 
-class StateHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        if self.path.strip("/") in ("", "state", "master_state.json"):
-            state = get_state_for_http()
-            body = json.dumps(state, separators=(",", ":")).encode("utf-8") if state else b"{}"
+def set_mapping_for_http(payload):
+    global _mapping_response
+    _mapping_response = _json_response(payload, f'"map-{payload["version"]}"')
+
+
+def state_since(since, epoch=None):
+    """Payload of /state?since=<seq>[&epoch=<epoch>]: the changes since <seq> (or a full snapshot)."""
+    state = get_state_for_http()
+    payload = journal.since(since, epoch)
+    payload["last_updated"] = state["last_updated"] if state else time.time()
+    return payload
+
+
+def state_since_response(since, epoch=None):
+    """CachedResponse of state_since(): serialized once per (since, epoch) and state version."""
+    key = (since, epoch, journal.seq, journal.mapping_version)
+    cache = _delta_responses
+    response = cache.get(key)
+    if response is None:
+        payload = state_since(since, epoch)
+        cursor = (payload["seq"], payload["epoch"], payload["mapping_version"])
+        etag = f'"{cursor[1]}-{cursor[0]}-{cursor[2]}-{"f" if payload["full"] else since}"'
+        response = _json_response(payload, etag, cursor)
+        if (cursor[0], cursor[2]) == key[2:]:
+            if len(cache) >= _DELTA_CACHE_SIZE:
+                cache.clear()
+            cache[key] = response
+    return response
+
+
+def since_params(query, last_event_id=None):
+    """(since, epoch) from ?since=&epoch= or an SSE Last-Event-ID "<epoch>:<seq>"; since is None if absent."""
+    if last_event_id and ":" in last_event_id:
+        epoch, since = last_event_id.rsplit(":", 1)
+        return int(since), epoch
+    since = query.get("since", [None])[0]
+    return (None if since is None else int(since)), query.get("epoch", [None])[0]
+
+
+def run_http_server(port):
+    # http.server is slow to import: only load it when the HTTP endpoint is enabled
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlsplit
+
+    class StateHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive: an EA polling every 100 ms reuses its connection
+        disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+        def do_GET(self):
+            metrics = metrics_response(self.path, (stage_metrics,))
+            if metrics is not None:
+                content_type, body = metrics
+                self._send(200, body, content_type)
+                return
+            url = urlsplit(self.path)
+            route = url.path.strip("/")
+            query = parse_qs(url.query)
+            try:
+                since, epoch = since_params(query, self.headers.get("Last-Event-ID"))
+                wait = min(float(query.get("wait", ["0"])[0]), LONG_POLL_MAX_WAIT)
+            except ValueError:
+                self._send(400, b'{"error":"since must be an integer and wait a number"}')
+                return
+            if route in ("", "state", "master_state.json"):
+                if since is None:
+                    self._send_cached(_state_response)
+                else:
+                    if wait > 0 and epoch in (None, journal.epoch):
+                        journal.wait(since, wait, journal.mapping_version)
+                    self._send_cached(state_since_response(since, epoch))
+            elif route in ("heartbeat", HEARTBEAT_FILENAME):
+                self._send_cached(_heartbeat_response)
+            elif route == "events":
+                self._stream_events(since, epoch)
+            elif route in ("mapping", MAPPING_FILENAME):
+                self._send_cached(_mapping_response)
+            else:
+                self._send(404, b"")
+
+        def _stream_events(self, since, epoch):
+            """Server-Sent Events: a `delta` event (payload of /state?since=) for every change, until disconnect."""
+            self.close_connection = True  # the stream has no length: it ends with the connection
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            try:
+                while True:
+                    response = state_since_response(since, epoch)
+                    since, epoch, version = response.cursor
+                    self.wfile.write(f"id: {epoch}:{since}\nevent: delta\ndata: ".encode("utf-8"))
+                    self.wfile.write(response.body + b"\n\n")
+                    self.wfile.flush()
+                    while not journal.wait(since, SSE_KEEPALIVE, version):
+                        self.wfile.write(b": keep-alive\n\n")
+                        self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # consumer went away
+
+        def _send_cached(self, response):
+            """200 with the pre-serialized body (gzip if accepted and large), or 304 if the client has this ETag."""
+            if self.headers.get("If-None-Match") == response.etag:
+                self.send_response(304)
+                self.send_header("ETag", response.etag)
+                self.end_headers()
+                return
+            body = response.body
+            gzipped = len(body) >= GZIP_MIN_BYTES and "gzip" in self.headers.get("Accept-Encoding", "")
+            if gzipped:
+                body = response.gzipped()
             self.send_response(200)
             self.send_header("Content-Type", "application/json")
             self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", response.etag)
+            if gzipped:
+                self.send_header("Content-Encoding", "gzip")
             self.end_headers()
             self.wfile.write(body)
-        else:
-            self.send_response(404)
+
+        def _send(self, status, body, content_type="application/json"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
             self.end_headers()
+            self.wfile.write(body)
 
-    def log_message(self, format, *args):
-        pass  # quiet
+        def log_message(self, format, *args):
+            pass  # quiet
 
+    class FeedHTTPServer(ThreadingHTTPServer):
+        daemon_threads = True  # held long-poll / SSE connections must not block shutdown
+        request_queue_size = 64  # consumers reconnect together after each change; 5 overflows into SYN retries
 
-def run_http_server(port):
-    server = HTTPServer(("127.0.0.1", port), StateHandler)
+    server = FeedHTTPServer(("127.0.0.1", port), StateHandler)
     server.serve_forever()
 
 
@@ -171,12 +423,18 @@ def run_http_server(port):
 # Main loop: connect to master, poll positions, write state
 # -----------------------------------------------------------------------------
 def main():
+    global poll_scheduler, state_channel
+
     cred = load_master_credentials()
     if not cred:
         return
-    symbol_mapping = load_symbol_mapping()
+    # Reloaded in the background on edits; a new version is published to master_mapping.json and /mapping
+    mapping_watcher = MappingWatcher(SYMBOL_MAPPING_FILE)
+    symbol_mapping = mapping_watcher.mapping
     if not symbol_mapping:
         print("⚠️ No symbol mapping; EA will need its own mapping.")
+    publish_mapping(symbol_mapping)
+    mapping_watcher.start()
 
     if not mt5.initialize():
         print(f"❌ MT5 initialize failed: {mt5.last_error()}")
@@ -186,24 +444,62 @@ def main():
         mt5.shutdown()
         return
 
-    print(f"✅ Connected to master {cred['login']}. Writing state every {POLL_INTERVAL}s to:")
+    print(f"✅ Connected to master {cred['login']}. Polling every {POLL_INTERVAL}s; state written on changes to:")
     print(f"   {os.path.join(OUTPUT_DIR, STATE_FILENAME)}")
+    print(f"   {os.path.join(OUTPUT_DIR, HEARTBEAT_FILENAME)} (heartbeat every {HEARTBEAT_INTERVAL}s)")
+    state_channel = channel_from_env(OUTPUT_DIR)
+    if state_channel is not None:
+        print(f"   {state_channel.path} (memory-mapped, {state_channel.capacity} bytes per slot)")
     if HTTP_PORT > 0:
         t = Thread(target=run_http_server, args=(HTTP_PORT,), daemon=True)
         t.start()
         print(f"   HTTP: http://127.0.0.1:{HTTP_PORT}/state (add this URL in MT5 WebRequest allow list)")
+        print("         /state?since=<seq>&epoch=<epoch> for changes only, /mapping for the symbol mapping")
+        print("         push: /state?since=<seq>&wait=<s> (long-poll) and /events (Server-Sent Events)")
+        print("         liveness: /heartbeat")
+        print(f"   Metrics: http://127.0.0.1:{HTTP_PORT}/metrics (Prometheus) and /metrics.json")
     print("   (Stop with Ctrl+C)")
 
+    poll_scheduler = scheduler_from_env(POLL_MIN_INTERVAL, POLL_INTERVAL)
+    last_fingerprint = None
+    last_updated = time.time()
+    next_heartbeat = 0.0
     try:
         while True:
+            loop_started = started = time.perf_counter_ns()
             positions = mt5.positions_get()
-            state = build_state(positions, symbol_mapping)
-            write_state_if_changed(state)
-            set_state_for_http(state)
-            time.sleep(POLL_INTERVAL)
+            started = stage_metrics.since("poll", started)
+            fingerprint = positions_fingerprint(positions)
+            mapping_changed = mapping_watcher.mapping is not symbol_mapping
+            started = stage_metrics.since("fingerprint", started)
+            if fingerprint != last_fingerprint or mapping_changed:
+                if mapping_changed:
+                    symbol_mapping = mapping_watcher.mapping
+                    publish_mapping(symbol_mapping)
+                state = build_state(positions)
+                if journal.publish(state["positions"]):
+                    poll_scheduler.mark_activity()
+                state["seq"] = journal.seq
+                state["epoch"] = journal.epoch
+                state["mapping_version"] = journal.mapping_version
+                stage_metrics.since("build", started)
+                set_state_for_http(state, write_state(state))
+                last_fingerprint = fingerprint
+                last_updated = state["last_updated"]
+            now = time.time()
+            if now >= next_heartbeat:
+                with stage_metrics.timed("heartbeat"):
+                    write_heartbeat(now, last_updated)
+                next_heartbeat = now + HEARTBEAT_INTERVAL
+            stage_metrics.since("loop", loop_started)
+            if poll_scheduler.report_due():
+                print(poll_scheduler.summary())
+                print(stage_metrics.summary())
+            poll_scheduler.wait()
     except KeyboardInterrupt:
         print("\nStopped.")
     finally:
+        mapping_watcher.stop()
         mt5.shutdown()
 
 
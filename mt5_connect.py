@@ -1,6 +1,20 @@
 import MetaTrader5 as mt5
+import signal
+import threading
 import time
-import pandas as pd
+import functools
+from collections import namedtuple
+
+import order_log
+from csv_config import ConfigError, blank, read_titles
+from copier_state import COPIER_MAGIC, STATE_FILE, CopierStateStore, copy_comment, reconcile
+from filling_cache import FillingModeCache, filling_name
+from order_dispatch import OrderDispatcher, dispatcher_from_env
+from poll_scheduler import scheduler_from_env
+from position_diff import CLOSE, MODIFY, OPEN, PARTIAL_CLOSE, PositionDiffEngine, PositionEvent
+from stage_metrics import StageMetrics, metrics_port_from_env, serve_metrics
+from symbol_cache import SymbolContractCache, can_open, normalize_volume
+from symbol_mapper import MappingWatcher, control_port_from_env, load_mapping, serve_mapping_control
 
 # CSV File Paths
 CREDENTIALS_FILE = "credentials.csv"
@@ -13,6 +27,18 @@ MASTER_SERVER = None
 SLAVE_LOGIN = None
 SLAVE_PASSWORD = None
 SLAVE_SERVER = None
+# Optional terminal64.exe paths for dual-terminal mode (see dual_copier.py)
+MASTER_TERMINAL_PATH = None
+SLAVE_TERMINAL_PATH = None
+
+# Poll interval bounds for the copier loop (seconds): burst right after activity,
+# back off to the max when idle. See poll_scheduler.py for sessions / fixed mode.
+POLL_MIN_INTERVAL = 0.01
+POLL_MAX_INTERVAL = 0.3
+# Scheduler of the running loop (exposes poll rate and detection-delay stats)
+poll_scheduler = None
+# Sends the orders of one pass, sequentially or in parallel (MT5_COPIER_ORDER_WORKERS, see order_dispatch.py)
+order_dispatcher = None
 
 # Track whether MT5 terminal has been initialized.
 # We initialize once and then only use mt5.login() to switch accounts,
@@ -22,18 +48,36 @@ mt5_initialized = False
 _current_login = None
 
 
+def _stop_on_signal(signum, frame):
+    raise SystemExit(f"Stopped by signal {signum}")
+
+
+def exit_on_terminate():
+    """Turn SIGTERM (and SIGBREAK on Windows, sent by the dashboard's Stop) into SystemExit.
+
+    Killed by the default handler, the process would skip its finally blocks and atexit,
+    losing the order log records still queued. No-op outside the main thread."""
+    if threading.current_thread() is not threading.main_thread():
+        return
+    for name in ("SIGTERM", "SIGBREAK"):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), _stop_on_signal)
+
+
 def load_credentials(csv_file=CREDENTIALS_FILE):
     """Load Master and Slave credentials from CSV. Expected columns: Title, Value.
     Required titles: master_login, master_password, master_server, slave_login, slave_password, slave_server
+    Optional titles: master_terminal_path, slave_terminal_path (used by dual-terminal mode)
     """
     global MASTER_LOGIN, MASTER_PASSWORD, MASTER_SERVER
     global SLAVE_LOGIN, SLAVE_PASSWORD, SLAVE_SERVER
+    global MASTER_TERMINAL_PATH, SLAVE_TERMINAL_PATH
     try:
-        df = pd.read_csv(csv_file)
-        if "Title" not in df.columns or "Value" not in df.columns:
+        try:
+            cred = read_titles(csv_file)
+        except ConfigError:
             print(f"❌ {csv_file} must contain 'Title' and 'Value' columns.")
             return False
-        cred = df.set_index("Title")["Value"].to_dict()
         required = [
             "master_login", "master_password", "master_server",
             "slave_login", "slave_password", "slave_server"
@@ -43,36 +87,84 @@ def load_credentials(csv_file=CREDENTIALS_FILE):
             print(f"❌ {csv_file} missing titles: {', '.join(missing)}")
             return False
         MASTER_LOGIN = int(cred["master_login"])
-        MASTER_PASSWORD = str(cred["master_password"]).strip()
-        MASTER_SERVER = str(cred["master_server"]).strip()
+        MASTER_PASSWORD = cred["master_password"]
+        MASTER_SERVER = cred["master_server"]
         SLAVE_LOGIN = int(cred["slave_login"])
-        SLAVE_PASSWORD = str(cred["slave_password"]).strip()
-        SLAVE_SERVER = str(cred["slave_server"]).strip()
+        SLAVE_PASSWORD = cred["slave_password"]
+        SLAVE_SERVER = cred["slave_server"]
+        MASTER_TERMINAL_PATH = _optional_path(cred.get("master_terminal_path"))
+        SLAVE_TERMINAL_PATH = _optional_path(cred.get("slave_terminal_path"))
         return True
     except Exception as e:
         print(f"❌ Error reading credentials from {csv_file}: {e}")
         return False
 
+
+def _optional_path(value):
+    return None if blank(value) else value
+
+
 # Store existing trade IDs and mappings
 existing_trades = set()
 order_mapping = {}  # Master Ticket → Slave Ticket mapping
 
-# Cache for per-symbol successful filling modes to avoid repeated trial-and-error
-symbol_filling_cache = {}  # symbol -> mt5.ORDER_FILLING_*
-
-
-# Function to read CSV and create a symbol mapping dictionary
+# Durable copy of order_mapping (copier_state.db); opened by trade_copier / the dual executor
+state_store = None
+
+# Per-symbol filling modes: seeded from the symbol bitmask, learned from fills, kept in copier_state.db
+filling_modes = FillingModeCache()
+
+# Per-stage timers of the copy loop (stage_metrics.py); served on MT5_COPIER_METRICS_PORT
+stage_metrics = StageMetrics("copier")
+
+# Contract specs of the slave symbols (symbol_cache.py); warmed by warm_slave_symbols()
+slave_symbols = SymbolContractCache(metrics=stage_metrics)
+# Symbol mapping whose slave symbols were last warmed (a reload swaps in a new mapping object)
+_warmed_mapping = None
+
+# Order retcodes after which a symbol's cached contract is reloaded before the next order
+_CONTRACT_RETCODES = {
+    getattr(mt5, "TRADE_RETCODE_INVALID", 10013),
+    getattr(mt5, "TRADE_RETCODE_INVALID_VOLUME", 10014),
+    getattr(mt5, "TRADE_RETCODE_INVALID_STOPS", 10016),
+    getattr(mt5, "TRADE_RETCODE_TRADE_DISABLED", 10017),
+    getattr(mt5, "TRADE_RETCODE_MARKET_CLOSED", 10018),
+}
+
+
+# Failed orders (copies, SL/TP updates, partial and full closes) are retried with exponential backoff
+# (ORDER_RETRY_BASE seconds, doubling up to ORDER_RETRY_MAX). Copies, updates and partial closes are given up
+# after ORDER_RETRY_LIMIT attempts, or at once when the failure cannot succeed on retry (retcodes below,
+# unmapped symbol, trading disabled, invalid lot). A close is retried until it succeeds: only a copy that is
+# no longer on the Slave is dropped, after ORDER_RETRY_LIMIT attempts.
+ORDER_RETRY_LIMIT = 5
+ORDER_RETRY_BASE = 0.5
+ORDER_RETRY_MAX = 30.0
+_TERMINAL_RETCODES = {
+    getattr(mt5, "TRADE_RETCODE_INVALID", 10013),
+    getattr(mt5, "TRADE_RETCODE_INVALID_VOLUME", 10014),
+    getattr(mt5, "TRADE_RETCODE_TRADE_DISABLED", 10017),
+    getattr(mt5, "TRADE_RETCODE_MARKET_CLOSED", 10018),
+    getattr(mt5, "TRADE_RETCODE_NO_MONEY", 10019),
+    getattr(mt5, "TRADE_RETCODE_CLIENT_DISABLES_AT", 10027),
+    getattr(mt5, "TRADE_RETCODE_INVALID_FILL", 10030),
+    getattr(mt5, "TRADE_RETCODE_LIMIT_VOLUME", 10034),
+    getattr(mt5, "TRADE_RETCODE_LIMIT_POSITIONS", 10040),
+    getattr(mt5, "TRADE_RETCODE_LONG_ONLY", 10042),
+    getattr(mt5, "TRADE_RETCODE_SHORT_ONLY", 10043),
+    getattr(mt5, "TRADE_RETCODE_CLOSE_ONLY", 10044),
+}
+_SLAVE_GONE = "Slave position not found"
+# (event kind, master ticket) → (terminal, reason) of its failed order in the current pass
+_order_failures = {}
+# (event kind, master ticket) → (failed attempts, time.monotonic() of the next attempt (inf = in progress),
+# master position before the first failed change: what the engine is reset to for the retry)
+_order_retries = {}
+
+
+# Function to read CSV and create the compiled symbol mapping (exact rows and wildcard rules, see symbol_mapper.py)
 def load_symbol_mapping(csv_file):
-    try:
-        df = pd.read_csv(csv_file)
-        if not all(col in df.columns for col in ["master_symbol", "slave_symbol", "slave_lot"]):
-            print("❌ CSV file must contain 'master_symbol', 'slave_symbol', and 'slave_lot' columns.")
-            return {}
-        return {row["master_symbol"]: {"slave_symbol": row["slave_symbol"], "slave_lot": float(row["slave_lot"])}
-                for _, row in df.iterrows()}
-    except Exception as e:
-        print(f"❌ Error reading CSV file: {e}")
-        return {}
+    return load_mapping(csv_file)
 
 
 # Function to connect to an MT5 account
@@ -104,28 +196,66 @@ def connect_mt5(login, password, server):
     return True
 
 
-def get_supported_filling_mode(symbol: str):
-    """
-    Return an order filling mode supported by the broker for this symbol.
-    This avoids 'Unsupported filling mode' errors.
-    """
-    info = mt5.symbol_info(symbol)
-    if info is None:
-        # Fallback to RETURN if symbol info is not available
-        return mt5.ORDER_FILLING_RETURN
+# Select every mapped slave symbol once and cache its contract (caller must be on Slave account).
+# Symbols already cached are skipped, so calling it again after a mapping reload only loads the new ones.
+# Slave symbols produced by wildcard rules are loaded on their first order.
+def warm_slave_symbols(symbol_mapping):
+    global _warmed_mapping
+    _warmed_mapping = symbol_mapping
+    pending = [m["slave_symbol"] for m in symbol_mapping.values() if m["slave_symbol"] not in slave_symbols]
+    if pending:
+        slave_symbols.warm(pending)
+        seed_filling_modes()
 
-    # In the MT5 Python API, symbol.filling_mode is an int that should be
-    # compared against ORDER_FILLING_* constants, not SYMBOL_FILLING_*.
-    mode = info.filling_mode
-    if mode == mt5.ORDER_FILLING_FOK:
-        return mt5.ORDER_FILLING_FOK
-    if mode == mt5.ORDER_FILLING_IOC:
-        return mt5.ORDER_FILLING_IOC
-    if mode == mt5.ORDER_FILLING_RETURN:
-        return mt5.ORDER_FILLING_RETURN
 
-    # Default fallback
-    return mt5.ORDER_FILLING_RETURN
+# Seed the filling-mode cache from the warmed contracts' filling_mode bitmasks.
+def seed_filling_modes():
+    for contract in slave_symbols.contracts():
+        filling_modes.seed(contract.symbol, contract.filling_mode)
+
+
+def _on_order_error(symbol, retcode):
+    if retcode in _CONTRACT_RETCODES:
+        slave_symbols.invalidate(symbol)
+
+
+# Send `request` with the best known filling mode for `symbol`; other modes are tried only
+# after INVALID_FILL. Returns (result, mode, latency_ms) of the last attempt (result None if
+# the terminal returned nothing).
+def _send_order(request, symbol):
+    result, mode, latency_ms, attempts = None, None, 0.0, 0
+    for mode in filling_modes.candidates(symbol):
+        request["type_filling"] = mode
+        started = time.perf_counter_ns()
+        result = mt5.order_send(request)
+        elapsed = time.perf_counter_ns() - started
+        stage_metrics.record("order_send", elapsed)
+        latency_ms = elapsed / 1e6
+        attempts += 1
+        filled = result is not None and result.retcode == mt5.TRADE_RETCODE_DONE
+        invalid_fill = result is not None and result.retcode == getattr(mt5, "TRADE_RETCODE_INVALID_FILL", 10030)
+        filling_modes.record(symbol, mode, filled, latency_ms, invalid_fill)
+        if not invalid_fill:
+            break
+        print(f"❌ Filling mode {filling_name(mode)} unsupported for {symbol}. Retcode: {result.retcode}")
+    filling_modes.finish(symbol, mode, attempts,
+                         result is not None and result.retcode == mt5.TRADE_RETCODE_DONE)
+    return result, mode, latency_ms
+
+
+# Current price to send with an order on the Slave (one tick per order).
+def _slave_price(symbol, use_bid):
+    with stage_metrics.timed("tick"):
+        tick = mt5.symbol_info_tick(symbol)
+    if tick is None:
+        # Dropped from Market Watch: select it again and retry once
+        slave_symbols.invalidate(symbol)
+        if slave_symbols.get(symbol) is None:
+            return None
+        tick = mt5.symbol_info_tick(symbol)
+        if tick is None:
+            return None
+    return tick.bid if use_bid else tick.ask
 
 
 # Function to get open trades from Master account
@@ -134,17 +264,58 @@ def get_master_trades():
     return positions if positions else []
 
 
+# Compact view of one Slave position: what the modify / close phases and startup reconciliation need.
+SlavePosition = namedtuple("SlavePosition", ["ticket", "symbol", "type", "volume", "sl", "tp", "magic", "comment"])
+
+
+# Take one snapshot of all Slave positions, indexed by ticket (caller must be on Slave account).
+# One positions_get() per Slave session instead of one per mapped ticket.
+def get_slave_positions():
+    with stage_metrics.timed("slave_positions"):
+        positions = mt5.positions_get()
+    return {
+        p.ticket: SlavePosition(p.ticket, p.symbol, p.type, p.volume, p.sl, p.tp, p.magic, p.comment)
+        for p in positions or ()
+    }
+
+
+# Restore order_mapping from the state store, reconciled with one Master and one Slave snapshot.
+# Returns Master tickets whose Slave copies must be closed (Master closed them while we were down).
+def restore_state(master_positions, slave_positions):
+    global state_store
+
+    started = time.perf_counter()
+    if state_store is None:
+        state_store = CopierStateStore(STATE_FILE)
+    filling_modes.attach(state_store, SLAVE_LOGIN)
+    stored = state_store.load(MASTER_LOGIN, SLAVE_LOGIN)
+    mapping, to_close, unmatched = reconcile(stored, master_positions, slave_positions, magic=COPIER_MAGIC)
+    order_mapping.clear()
+    order_mapping.update(mapping)
+    if mapping != stored:
+        state_store.replace(MASTER_LOGIN, SLAVE_LOGIN, mapping,
+                            {st: slave_positions[st].symbol for st in mapping.values()})
+    print(
+        f"ℹ️ Restored {len(mapping)} copied trade(s) from {STATE_FILE} "
+        f"({len(to_close)} to close) in {(time.perf_counter() - started) * 1000.0:.1f} ms."
+    )
+    for ticket in unmatched:
+        print(f"⚠️ Slave Ticket {ticket} has the copier magic but no known Master ticket. Leaving it open.")
+    return to_close
+
+
 # Function to store existing trades at startup
 def record_existing_trades():
     global existing_trades
     positions = get_master_trades()
     existing_trades = {pos.ticket for pos in positions}  # Store only trade IDs
     print(f"ℹ️ Ignoring {len(existing_trades)} existing trades.")
+    return positions
 
 
 # Run copy logic on Slave (caller must be on Slave account).
 def _do_copy_trades(new_trades, symbol_mapping):
-    global existing_trades, order_mapping, symbol_filling_cache
+    global existing_trades, order_mapping
 
     for trade in new_trades:
         master_symbol = trade.symbol
@@ -152,39 +323,41 @@ def _do_copy_trades(new_trades, symbol_mapping):
 
         if master_symbol not in symbol_mapping:
             print(f"🔹 Skipping {master_symbol} (not in CSV mapping).")
+            _order_failures[(OPEN, trade.ticket)] = (True, "not in CSV mapping")
             continue
 
         slave_symbol = symbol_mapping[master_symbol]["slave_symbol"]
         slave_multiplier = symbol_mapping[master_symbol]["slave_lot"]  # Get multiplier from CSV
 
-        # Calculate Slave Lot Size = Master Lot * Slave Multiplier
-        slave_lot = master_lot * slave_multiplier
+        contract = slave_symbols.get(slave_symbol)
+        if contract is None:
+            print(f"❌ ERROR: Failed to select {slave_symbol} in Slave account.")
+            _order_failures[(OPEN, trade.ticket)] = (False, f"{slave_symbol} not selectable")
+            continue
+        if not can_open(contract):
+            print(f"🔹 Skipping {master_symbol}: trading {slave_symbol} is disabled or close-only on Slave.")
+            _order_failures[(OPEN, trade.ticket)] = (True, f"trading {slave_symbol} disabled or close-only")
+            continue
 
-        if slave_lot<0.01:
-            slave_lot=0.01
+        # Calculate Slave Lot Size = Master Lot * Slave Multiplier, on the symbol's volume grid
+        slave_lot = normalize_volume(contract, master_lot * slave_multiplier)
 
         # Ensure lot size is valid
         if slave_lot <= 0:
             print(f"⚠️ Invalid slave lot size ({slave_lot}) for {slave_symbol}. Skipping trade.")
+            _order_failures[(OPEN, trade.ticket)] = (True, f"invalid slave lot {slave_lot}")
             continue
 
         trade_type = trade.type  # 0=BUY, 1=SELL
-        sl = trade.sl
-        tp = trade.tp
-
-        if not mt5.symbol_select(slave_symbol, True):
-            print(f"❌ ERROR: Failed to select {slave_symbol} in Slave account.")
-            continue
+        sl = round(trade.sl, contract.digits)
+        tp = round(trade.tp, contract.digits)
 
         order_type = mt5.ORDER_TYPE_BUY if trade_type == 0 else mt5.ORDER_TYPE_SELL
-        price = mt5.symbol_info_tick(slave_symbol).bid if trade_type == 0 else mt5.symbol_info_tick(slave_symbol).ask
-
-
-        if price == None or price>0:
-            price = mt5.symbol_info_tick(slave_symbol).bid if trade_type == 0 else mt5.symbol_info_tick(
-                slave_symbol).ask
-
-        # print("price: ",price)
+        price = _slave_price(slave_symbol, use_bid=(trade_type == 0))
+        if price is None:
+            print(f"❌ ERROR: No price for {slave_symbol} in Slave account.")
+            _order_failures[(OPEN, trade.ticket)] = (False, f"no price for {slave_symbol}")
+            continue
 
         request = {
             "action": mt5.TRADE_ACTION_DEAL,
@@ -195,157 +368,66 @@ def _do_copy_trades(new_trades, symbol_mapping):
             "sl": sl,
             "tp": tp,
             "deviation": 120,
-            "magic": 123456,
-            "comment": "Copied Trade",
+            "magic": COPIER_MAGIC,
+            "comment": copy_comment(trade.ticket),  # lets a restart tie this copy back to its master ticket
             "type_time": mt5.ORDER_TIME_GTC,
         }
 
-        # If we already discovered a working filling mode for this symbol,
-        # use it directly for speed.
-        global symbol_filling_cache
-        cached_mode = symbol_filling_cache.get(slave_symbol)
-
-        filling_names = {
-            mt5.ORDER_FILLING_FOK: "FOK",
-            mt5.ORDER_FILLING_IOC: "IOC",
-            mt5.ORDER_FILLING_RETURN: "RETURN",
-        }
-
         def log_success(mode_used, result_obj, latency_ms):
-            mode_name = filling_names.get(mode_used, str(mode_used))
+            mode_name = filling_name(mode_used)
             slave_ticket = result_obj.order
             order_mapping[trade.ticket] = slave_ticket  # Store ticket mapping
+            started = time.perf_counter_ns()
+            if state_store is not None:
+                state_store.record(MASTER_LOGIN, trade.ticket, SLAVE_LOGIN, slave_ticket, slave_symbol)
+                started = stage_metrics.since("state_write", started)
             print(
                 f"✅ Copied {master_symbol} → {slave_symbol} "
                 f"(Master Lot: {master_lot}, Slave Lot: {slave_lot}) "
                 f"using filling mode {mode_name} "
                 f"in {latency_ms:.1f} ms"
             )
-            try:
-                with open("orderlog.txt", "a", encoding="utf-8") as log_file:
-                    log_file.write(
-                        f"{time.strftime('%Y-%m-%d %H:%M:%S')} | "
-                        f"MASTER_TICKET={trade.ticket} | SLAVE_TICKET={slave_ticket} | "
-                        f"{master_symbol}->{slave_symbol} | "
-                        f"MASTER_LOT={master_lot} | SLAVE_LOT={slave_lot} | "
-                        f"TYPE={'BUY' if trade_type == 0 else 'SELL'} | "
-                        f"PRICE={price} | SL={sl} | TP={tp} | "
-                        f"FILLING={mode_name} | "
-                        f"LATENCY_MS={latency_ms:.1f}\n"
-                    )
-            except Exception as log_err:
-                print(f"⚠️ Failed to write to orderlog.txt: {log_err}")
-            existing_trades.add(trade.ticket)
-
-        # 1) Fast path: try cached mode once
-        if cached_mode is not None:
-            request["type_filling"] = cached_mode
-            start_time = time.time()
-            result = mt5.order_send(request)
-            latency_ms = (time.time() - start_time) * 1000.0
-            mode_name = filling_names.get(cached_mode, str(cached_mode))
-
-            if result.retcode == mt5.TRADE_RETCODE_DONE:
-                log_success(cached_mode, result, latency_ms)
-                # Cache already correct; nothing else to do
-                continue
-
-            # If cached mode became invalid, drop from cache and fall back to full strategy
-            if result.retcode == getattr(mt5, "TRADE_RETCODE_INVALID_FILL", 10030):
-                print(
-                    f"❌ Cached filling mode {mode_name} is now unsupported for {slave_symbol}. "
-                    f"Retcode: {result.retcode}, Comment: {getattr(result, 'comment', '')}"
-                )
-                symbol_filling_cache.pop(slave_symbol, None)
-            else:
-                print(
-                    f"❌ Failed to copy {master_symbol} → {slave_symbol} with cached filling {mode_name}. "
-                    f"(Master Lot: {master_lot}, Slave Lot: {slave_lot}). "
-                    f"Retcode: {result.retcode}, Comment: {getattr(result, 'comment', '')}"
-                )
-                continue  # don't try other modes for non-fill errors
-
-        # 2) Discovery path: try multiple filling modes so we learn which one works.
-        # Start with IOC to minimize latency on this server, then try others.
-        filling_candidates = []
-        for mode in (mt5.ORDER_FILLING_IOC, mt5.ORDER_FILLING_FOK, mt5.ORDER_FILLING_RETURN):
-            if mode not in filling_candidates:
-                filling_candidates.append(mode)
-
-        last_result = None
-        copied = False
-
-        for mode in filling_candidates:
-            request["type_filling"] = mode
-            start_time = time.time()
-            result = mt5.order_send(request)
-            latency_ms = (time.time() - start_time) * 1000.0
-            last_result = result
-            mode_name = filling_names.get(mode, str(mode))
-
-            if result.retcode == mt5.TRADE_RETCODE_DONE:
-                # Save working mode in cache for next orders of this symbol
-                symbol_filling_cache[slave_symbol] = mode
-                log_success(mode, result, latency_ms)
-                copied = True
-                break
-
-            # If filling mode is unsupported, try the next one
-            if result.retcode == getattr(mt5, "TRADE_RETCODE_INVALID_FILL", 10030):
-                print(
-                    f"❌ Filling mode {mode_name} unsupported for {slave_symbol}. "
-                    f"Retcode: {result.retcode}, Comment: {getattr(result, 'comment', '')}"
-                )
-                continue
-
-            # For any other error, stop trying further modes
-            print(
-                f"❌ Failed to copy {master_symbol} → {slave_symbol} with filling {mode_name}. "
-                f"(Master Lot: {master_lot}, Slave Lot: {slave_lot}). "
-                f"Retcode: {result.retcode}, Comment: {getattr(result, 'comment', '')}"
+            # Queued for the background writer; the line is formatted and appended off this thread
+            order_log.get_writer().submit(
+                order_log.format_open, time.time(), trade.ticket, slave_ticket, master_symbol, slave_symbol,
+                master_lot, slave_lot, trade_type, price, sl, tp, mode_name, latency_ms,
             )
-            break
-
-        if not copied and last_result is not None:
-            print(
-                f"❌ Failed to copy {master_symbol} → {slave_symbol} after trying all filling modes. "
-                f"(Master Lot: {master_lot}, Slave Lot: {slave_lot}). "
-                f"Last retcode: {last_result.retcode}, "
-                f"Comment: {getattr(last_result, 'comment', '')}"
-            )
-
-
-# Function to copy new trades to Slave account (switches to Slave, runs _do_copy_trades, switches back).
-def copy_trades(symbol_mapping):
-    global existing_trades, order_mapping
-
-    master_trades = get_master_trades()
-    new_trades = [trade for trade in master_trades if trade.ticket not in existing_trades]
-
-    if not new_trades:
-        return
+            stage_metrics.since("log", started)
+            existing_trades.add(trade.ticket)
 
-    print("🔍 New trades detected! Switching to Slave account to copy trades...")
-    if not connect_mt5(SLAVE_LOGIN, SLAVE_PASSWORD, SLAVE_SERVER):
-        print("❌ ERROR: Failed to switch to Slave account.")
-        return
-    _do_copy_trades(new_trades, symbol_mapping)
-    connect_mt5(MASTER_LOGIN, MASTER_PASSWORD, MASTER_SERVER)
+        # Best known filling mode first (filling_cache.py); other modes only after INVALID_FILL
+        result, mode, latency_ms = _send_order(request, slave_symbol)
+        if result is not None and result.retcode == mt5.TRADE_RETCODE_DONE:
+            log_success(mode, result, latency_ms)
+            continue
+        print(
+            f"❌ Failed to copy {master_symbol} → {slave_symbol} with filling {filling_name(mode)}. "
+            f"(Master Lot: {master_lot}, Slave Lot: {slave_lot}). "
+            f"Retcode: {getattr(result, 'retcode', None)}, Comment: {getattr(result, 'comment', mt5.last_error())}"
+        )
+        if result is not None:
+            _on_order_error(slave_symbol, result.retcode)
+        retcode = getattr(result, "retcode", None)
+        _order_failures[(OPEN, trade.ticket)] = (retcode in _TERMINAL_RETCODES, f"retcode {retcode}")
 
 
 # Run SL/TP sync on Slave (caller must be on Slave account).
-def _do_sync_modifications(master_trades):
+# slave_positions: snapshot from get_slave_positions(), taken here if not given.
+def _do_sync_modifications(master_trades, slave_positions=None):
     global order_mapping
 
+    if slave_positions is None:
+        slave_positions = get_slave_positions()
+
     for trade in master_trades:
         if trade.ticket not in order_mapping:
             continue
 
         slave_ticket = order_mapping[trade.ticket]
-        slave_trade = mt5.positions_get(ticket=slave_ticket)
-        if not slave_trade:
+        slave_trade = slave_positions.get(slave_ticket)
+        if slave_trade is None:
+            _order_failures[(MODIFY, trade.ticket)] = (False, _SLAVE_GONE)
             continue
-        slave_trade = slave_trade[0]
         if slave_trade.sl == trade.sl and slave_trade.tp == trade.tp:
             continue
 
@@ -355,59 +437,68 @@ def _do_sync_modifications(master_trades):
             "sl": trade.sl,
             "tp": trade.tp,
         }
-        result = mt5.order_send(request)
-        if result.retcode == mt5.TRADE_RETCODE_DONE:
+        with stage_metrics.timed("order_send"):
+            result = mt5.order_send(request)  # None if the terminal dropped the request
+        if result is not None and result.retcode == mt5.TRADE_RETCODE_DONE:
+            slave_positions[slave_ticket] = slave_trade._replace(sl=trade.sl, tp=trade.tp)
             print(f"✅ Updated SL/TP for Master Ticket {trade.ticket} → Slave Ticket {slave_ticket}")
-
-
-# Function to sync SL/TP modifications (switches to Slave, runs _do_sync_modifications, switches back).
-def sync_modifications():
-    global order_mapping
-
-    master_trades = get_master_trades()
-    changes = False
-    for trade in master_trades:
-        if trade.ticket not in order_mapping:
-            continue
-        slave_ticket = order_mapping[trade.ticket]
-        slave_trade = mt5.positions_get(ticket=slave_ticket)
-        if not slave_trade:
             continue
-        slave_trade = slave_trade[0]
-        if slave_trade.sl != trade.sl or slave_trade.tp != trade.tp:
-            changes = True
-            break
-
-    if not changes:
-        return
-
-    print("🔍 Trade modification detected! Switching to Slave account...")
-    if not connect_mt5(SLAVE_LOGIN, SLAVE_PASSWORD, SLAVE_SERVER):
-        print("❌ ERROR: Failed to switch to Slave account.")
-        return
-    _do_sync_modifications(master_trades)
-    connect_mt5(MASTER_LOGIN, MASTER_PASSWORD, MASTER_SERVER)
+        print(
+            f"❌ ERROR: Failed to update SL/TP of Slave Ticket {slave_ticket} (Master Ticket {trade.ticket}). "
+            f"Retcode: {getattr(result, 'retcode', None)}, Reason: {getattr(result, 'comment', mt5.last_error())}"
+        )
+        retcode = getattr(result, "retcode", None)
+        _order_failures[(MODIFY, trade.ticket)] = (retcode in _TERMINAL_RETCODES, f"retcode {retcode}")
 
 
 # Run close logic on Slave (caller must be on Slave account).
-def _do_sync_closures(to_close):
-    global order_mapping, symbol_filling_cache
+# partial_fractions: optional {master_ticket: fraction of the position to close} for partial closes.
+# slave_positions: snapshot from get_slave_positions(), taken here if not given.
+def _do_sync_closures(to_close, partial_fractions=None, slave_positions=None):
+    global order_mapping
+
+    if slave_positions is None:
+        slave_positions = get_slave_positions()
 
     for master_ticket in to_close:
         slave_ticket = order_mapping[master_ticket]
-        slave_trade = mt5.positions_get(ticket=slave_ticket)
+        slave_trade = slave_positions.get(slave_ticket)
+        key = (PARTIAL_CLOSE if partial_fractions and master_ticket in partial_fractions else CLOSE, master_ticket)
 
-        if not slave_trade:
+        if slave_trade is None:
             print(f"⚠️ Slave trade not found for Master Ticket {master_ticket}. Skipping closure.")
+            _order_failures[key] = (False, _SLAVE_GONE)
             continue
 
-        slave_trade = slave_trade[0]  # Get the first matching position
         symbol = slave_trade.symbol  # Get correct symbol
         volume = slave_trade.volume  # Get correct trade size
         trade_type = slave_trade.type  # Get trade type (BUY/SELL)
 
-        # Ensure the symbol is selected
-        mt5.symbol_select(symbol, True)
+        # Selects the symbol on first use; no per-close symbol_select afterwards
+        contract = slave_symbols.get(symbol)
+        if contract is None:
+            print(f"❌ ERROR: Failed to select {symbol} in Slave account. Skipping closure.")
+            _order_failures[key] = (False, f"{symbol} not selectable")
+            continue
+
+        partial = False
+        if partial_fractions and master_ticket in partial_fractions:
+            # Close the same share of the slave position as the master closed (symbol's volume steps)
+            step = contract.volume_step or 0.01
+            part = round(int(volume * partial_fractions[master_ticket] / step + 1e-9) * step, 8)
+            if part < contract.volume_min:
+                print(f"🔹 Partial close of Master Ticket {master_ticket} is below the minimum lot on Slave. Skipping.")
+                _order_failures[key] = (True, "below the minimum lot on Slave")
+                continue
+            if round(volume - part, 8) >= contract.volume_min:
+                volume = part
+                partial = True
+
+        price = _slave_price(symbol, use_bid=(trade_type == mt5.ORDER_TYPE_BUY))
+        if price is None:
+            print(f"❌ ERROR: No price for {symbol} in Slave account. Skipping closure.")
+            _order_failures[key] = (False, f"no price for {symbol}")
+            continue
 
         request = {
             "action": mt5.TRADE_ACTION_DEAL,
@@ -415,176 +506,315 @@ def _do_sync_closures(to_close):
             "symbol": symbol,
             "volume": volume,  # Ensure correct volume
             "type": mt5.ORDER_TYPE_SELL if trade_type == mt5.ORDER_TYPE_BUY else mt5.ORDER_TYPE_BUY,  # Close opposite order
-            "price": mt5.symbol_info_tick(symbol).bid if trade_type == mt5.ORDER_TYPE_BUY else mt5.symbol_info_tick(symbol).ask,
+            "price": price,
             "deviation": 35,
-            "magic": 123456,
+            "magic": COPIER_MAGIC,
             "comment": "Closed by Copier",
             "type_time": mt5.ORDER_TIME_GTC,
         }
 
-        # Reuse the same per-symbol filling cache as for opening trades
-        global symbol_filling_cache
-        cached_mode = symbol_filling_cache.get(symbol)
-
-        filling_names = {
-            mt5.ORDER_FILLING_FOK: "FOK",
-            mt5.ORDER_FILLING_IOC: "IOC",
-            mt5.ORDER_FILLING_RETURN: "RETURN",
-        }
-
         def log_close_success(mode_used, result_obj, latency_ms):
-            mode_name = filling_names.get(mode_used, str(mode_used))
+            mode_name = filling_name(mode_used)
             print(
-                f"✅ Closed Slave Ticket {slave_ticket} (Master Ticket {master_ticket}) "
+                f"✅ {'Partially closed' if partial else 'Closed'} Slave Ticket {slave_ticket} "
+                f"(Master Ticket {master_ticket}) "
                 f"using filling mode {mode_name} "
                 f"in {latency_ms:.1f} ms"
             )
-            try:
-                with open("orderlog.txt", "a", encoding="utf-8") as log_file:
-                    log_file.write(
-                        f"{time.strftime('%Y-%m-%d %H:%M:%S')} | "
-                        f"CLOSE | MASTER_TICKET={master_ticket} | SLAVE_TICKET={slave_ticket} | "
-                        f"SYMBOL={symbol} | VOLUME={volume} | "
-                        f"TYPE={'BUY' if trade_type == mt5.ORDER_TYPE_BUY else 'SELL'} | "
-                        f"FILLING={mode_name} | "
-                        f"LATENCY_MS={latency_ms:.1f}\n"
-                    )
-            except Exception as log_err:
-                print(f"⚠️ Failed to write close to orderlog.txt: {log_err}")
-            del order_mapping[master_ticket]  # Remove from tracking
-
-        # 1) Fast path: try cached filling mode if we already know it works
-        if cached_mode is not None:
-            request["type_filling"] = cached_mode
-            start_time = time.time()
-            result = mt5.order_send(request)
-            latency_ms = (time.time() - start_time) * 1000.0
-            mode_name = filling_names.get(cached_mode, str(cached_mode))
-
-            if result.retcode == mt5.TRADE_RETCODE_DONE:
-                log_close_success(cached_mode, result, latency_ms)
-                continue
-
-            if result.retcode == getattr(mt5, "TRADE_RETCODE_INVALID_FILL", 10030):
-                print(
-                    f"❌ Cached filling mode {mode_name} is now unsupported for closing {symbol}. "
-                    f"Retcode: {result.retcode}, Comment: {getattr(result, 'comment', '')}"
-                )
-                symbol_filling_cache.pop(symbol, None)
+            started = time.perf_counter_ns()
+            order_log.get_writer().submit(
+                order_log.format_close, time.time(), partial, master_ticket, slave_ticket, symbol, volume,
+                trade_type, mode_name, latency_ms,
+            )
+            started = stage_metrics.since("log", started)
+            if partial:
+                slave_positions[slave_ticket] = slave_trade._replace(volume=round(slave_trade.volume - volume, 8))
             else:
-                print(
-                    f"❌ ERROR: Failed to close Slave Ticket {slave_ticket} with cached filling {mode_name}. "
-                    f"Reason: {result.comment}"
-                )
-                continue
-
-        # 2) Discovery path: try multiple filling modes to close the trade.
-        # Start with IOC to minimize latency on this server, then try others.
-        filling_candidates = []
-        for mode in (mt5.ORDER_FILLING_IOC, mt5.ORDER_FILLING_FOK, mt5.ORDER_FILLING_RETURN):
-            if mode not in filling_candidates:
-                filling_candidates.append(mode)
-
-        last_result = None
-        closed = False
-
-        for mode in filling_candidates:
-            request["type_filling"] = mode
-            start_time = time.time()
-            result = mt5.order_send(request)
-            latency_ms = (time.time() - start_time) * 1000.0
-            last_result = result
-            mode_name = filling_names.get(mode, str(mode))
-
-            if result.retcode == mt5.TRADE_RETCODE_DONE:
-                symbol_filling_cache[symbol] = mode
-                log_close_success(mode, result, latency_ms)
-                closed = True
-                break
-
-            if result.retcode == getattr(mt5, "TRADE_RETCODE_INVALID_FILL", 10030):
-                print(
-                    f"❌ Filling mode {mode_name} unsupported for closing {symbol}. "
-                    f"Retcode: {result.retcode}, Comment: {getattr(result, 'comment', '')}"
-                )
+                del order_mapping[master_ticket]  # Remove from tracking
+                if state_store is not None:
+                    state_store.remove(MASTER_LOGIN, master_ticket, SLAVE_LOGIN)
+                    stage_metrics.since("state_write", started)
+                slave_positions.pop(slave_ticket, None)
+
+        # Same per-symbol filling cache as for opening trades
+        result, mode, latency_ms = _send_order(request, symbol)
+        if result is not None and result.retcode == mt5.TRADE_RETCODE_DONE:
+            log_close_success(mode, result, latency_ms)
+            continue
+        print(
+            f"❌ ERROR: Failed to close Slave Ticket {slave_ticket} with filling {filling_name(mode)}. "
+            f"Retcode: {getattr(result, 'retcode', None)}, Reason: {getattr(result, 'comment', mt5.last_error())}"
+        )
+        if result is not None:
+            _on_order_error(symbol, result.retcode)
+        retcode = getattr(result, "retcode", None)
+        _order_failures[key] = (retcode in _TERMINAL_RETCODES, f"retcode {retcode}")
+
+
+# Keep only the diff events that need the Slave: opens of mapped symbols and changes to copied tickets.
+def _actionable_events(events, symbol_mapping):
+    actionable = []
+    for event in events:
+        if event.kind == OPEN:
+            if event.position.symbol in symbol_mapping:
+                actionable.append(event)
+            else:
+                print(f"🔹 Skipping {event.position.symbol} (not in CSV mapping).")
+        elif event.ticket in order_mapping:
+            actionable.append(event)
+    return actionable
+
+
+# Run one pass of diff events on Slave (caller must be on Slave account).
+def _do_apply_events(events, symbol_mapping, engine=None):
+    global order_dispatcher
+    if order_dispatcher is None:
+        order_dispatcher = OrderDispatcher()
+    if symbol_mapping is not _warmed_mapping:
+        warm_slave_symbols(symbol_mapping)  # reloaded mapping: load its new slave symbols
+    order_dispatcher.run(_event_jobs(events, symbol_mapping))
+    filling_modes.flush()
+    if engine is not None:
+        _retry_failed_orders(events, engine)
+
+
+# Order jobs [(master_ticket, callable)] for one pass of diff events (run them on Slave).
+# slave_positions: snapshot shared by the modify / partial / close orders; taken here if needed and not given.
+def _event_jobs(events, symbol_mapping, slave_positions=None):
+    opens = [e.position for e in events if e.kind == OPEN]
+    modified = [e.position for e in events if e.kind == MODIFY and e.ticket in order_mapping]
+    partials = {
+        e.ticket: (_partial_base(e) - e.position.volume) / _partial_base(e)
+        for e in events if e.kind == PARTIAL_CLOSE and e.ticket in order_mapping
+    }
+    closes = [e.ticket for e in events if e.kind == CLOSE and e.ticket in order_mapping]
+    # One Slave snapshot shared by the modify / partial / close phases of this session
+    if slave_positions is None and (modified or partials or closes):
+        slave_positions = get_slave_positions()
+
+    # One job per order; the dispatcher keeps the jobs of one master ticket in this order
+    jobs = []
+    if opens:
+        print("🔍 New trades detected! Copying on Slave...")
+        jobs += [(t.ticket, functools.partial(_do_copy_trades, [t], symbol_mapping)) for t in opens]
+    if modified:
+        print("🔍 SL/TP changes detected! Updating on Slave...")
+        jobs += [(t.ticket, functools.partial(_do_sync_modifications, [t], slave_positions)) for t in modified]
+    if partials:
+        print("🔍 Partial closes detected! Reducing on Slave...")
+        jobs += [(t, functools.partial(_do_sync_closures, [t], partial_fractions=partials, slave_positions=slave_positions))
+                 for t in partials]
+    if closes:
+        print("🔍 Closures detected! Closing on Slave...")
+        jobs += [(t, functools.partial(_do_sync_closures, [t], slave_positions=slave_positions)) for t in closes]
+    return jobs
+
+
+# Master volume a partial close reduces from: the one before an earlier partial close that failed and is
+# still waiting for its retry, so this order closes both shares at once.
+def _partial_base(event):
+    retry = _order_retries.get((PARTIAL_CLOSE, event.ticket))
+    return (retry[2] if retry is not None else event.previous).volume
+
+
+_RETRY_ACTIONS = {OPEN: "copying", MODIFY: "updating SL/TP of", PARTIAL_CLOSE: "partially closing",
+                  CLOSE: "closing the copy of"}
+
+
+# Schedule the retry of this pass's failed orders (backoff), or give up on them. A copy given up stays
+# in the engine's snapshot, so the diff does not report it again; neither does an SL/TP update or
+# partial close, whose new values the engine already keeps.
+def _retry_failed_orders(events, engine):
+    now = time.monotonic()
+    for e in events:
+        key = (e.kind, e.ticket)
+        failure = _order_failures.pop(key, None)
+        if e.kind == OPEN:
+            failed, failure = e.ticket not in existing_trades, failure or (False, "not copied")
+        elif e.kind == CLOSE:
+            failed, failure = e.ticket in order_mapping, failure or (False, "still open on Slave")
+        else:
+            failed = failure is not None
+        retry = _order_retries.pop(key, None)
+        if not failed:
+            continue
+        terminal, reason = failure
+        failures = (retry[0] if retry is not None else 0) + 1
+        if e.kind == CLOSE:
+            # An open copy is never left behind; one that is gone from the Slave stops being tracked
+            if reason == _SLAVE_GONE and failures >= ORDER_RETRY_LIMIT:
+                print(f"⚠️ Slave copy of master ticket {e.ticket} not found after {failures} attempt(s). "
+                      f"No longer tracking it.")
+                del order_mapping[e.ticket]
+                if state_store is not None:
+                    state_store.remove(MASTER_LOGIN, e.ticket, SLAVE_LOGIN)
                 continue
-
-            print(
-                f"❌ ERROR: Failed to close Slave Ticket {slave_ticket} with filling {mode_name}. "
-                f"Reason: {result.comment}"
-            )
-            break
-
-        if not closed and last_result is not None:
-            print(
-                f"❌ ERROR: Failed to close Slave Ticket {slave_ticket} after trying all filling modes. "
-                f"Last retcode: {last_result.retcode}, Comment: {getattr(last_result, 'comment', '')}"
-            )
-
-
-# Function to close trades in Slave when closed in Master (switches to Slave, runs _do_sync_closures, switches back).
-def sync_closures():
-    global order_mapping
-
-    master_tickets = {trade.ticket for trade in get_master_trades()}
-    to_close = [ticket for ticket in order_mapping if ticket not in master_tickets]
-
-    if not to_close:
-        return
-
-    print("🔍 Trade closure detected! Switching to Slave account...")
-    if not connect_mt5(SLAVE_LOGIN, SLAVE_PASSWORD, SLAVE_SERVER):
-        print("❌ ERROR: Failed to switch to Slave account.")
-        return
-    _do_sync_closures(to_close)
-    connect_mt5(MASTER_LOGIN, MASTER_PASSWORD, MASTER_SERVER)
+        elif terminal or failures >= ORDER_RETRY_LIMIT:
+            print(f"❌ Giving up {_RETRY_ACTIONS[e.kind]} master ticket {e.ticket} after {failures} attempt(s): {reason}.")
+            continue
+        delay = min(ORDER_RETRY_BASE * 2 ** (failures - 1), ORDER_RETRY_MAX)
+        _order_retries[key] = (failures, now + delay, retry[2] if retry is not None else e.previous)
+        print(f"🔄 Retrying {_RETRY_ACTIONS[e.kind]} master ticket {e.ticket} in {delay:g}s ({reason}).")
+
+
+# Release the failed orders whose backoff has expired: the engine forgets the copy (reported as opened
+# again) or gets the SL/TP / volume from before the change back (reported as changed again); closes are
+# reported by _due_closes. Returns their (kind, ticket) keys (retries, not new master activity).
+def _due_retries(engine):
+    if not _order_retries:
+        return set()
+    now = time.monotonic()
+    due = set()
+    for key, (failures, at, previous) in list(_order_retries.items()):
+        kind, ticket = key
+        if at <= now:
+            if kind == OPEN:
+                engine.forget(ticket)
+            elif kind == MODIFY:
+                engine.restore(ticket, sl=previous.sl, tp=previous.tp)
+            elif kind == PARTIAL_CLOSE:
+                engine.restore(ticket, volume=previous.volume)
+            _order_retries[key] = (failures, float("inf"), previous)
+            due.add(key)
+        elif at == float("inf"):
+            del _order_retries[key]  # released last pass but not reported (closed or changed back meanwhile)
+    return due
+
+
+# Copies still tracked whose master position is gone and that no close event of this pass covers: closes
+# that failed (or were never sent, e.g. at startup), reported again once their backoff has expired.
+def _due_closes(engine, events):
+    pending = [ticket for ticket in order_mapping if ticket not in engine]
+    if not pending:
+        return []
+    closing = {e.ticket for e in events if e.kind == CLOSE}
+    # No retry entry, or one released this pass (inf), means due
+    return [PositionEvent(CLOSE, ticket, None, None) for ticket in pending
+            if ticket not in closing and _order_retries.get((CLOSE, ticket), (0, float("inf")))[1] == float("inf")]
+
+
+# Events of one pass for `master_trades`: the engine's diff plus the failed orders whose backoff expired.
+# Returns (actionable events, (kind, ticket) keys of the retries among them).
+def _pass_events(engine, master_trades, symbol_mapping):
+    retries = _due_retries(engine)
+    events = _actionable_events(engine.diff(master_trades), symbol_mapping)
+    closes = _due_closes(engine, events)
+    retries.update((CLOSE, e.ticket) for e in closes)
+    return events + closes, retries
 
 
 # Main function to run the trade copier
 def trade_copier():
+    global poll_scheduler, order_dispatcher
+
     if not load_credentials():
         print("❌ Failed to load credentials. Exiting.")
         return
 
-    symbol_mapping = load_symbol_mapping(CSV_FILE)
+    # Compiled mapping of symbol_mapping.csv; edits (e.g. from the dashboard) are picked up without a restart
+    mapping_watcher = MappingWatcher(CSV_FILE)
+    symbol_mapping = mapping_watcher.mapping
     if not symbol_mapping:
         print("❌ No symbol mapping found. Exiting.")
         return
+    mapping_watcher.start()
+    control_port = control_port_from_env()
+    if control_port > 0:
+        serve_mapping_control(mapping_watcher, control_port)  # the dashboard pushes its edits here
 
     # Initialize MT5 and validate both accounts.
     # Login to Slave first, then Master so we end up on the Master account.
     if not connect_mt5(SLAVE_LOGIN, SLAVE_PASSWORD, SLAVE_SERVER):
         return
+    slave_positions = get_slave_positions()
+    warm_slave_symbols(symbol_mapping)
     if not connect_mt5(MASTER_LOGIN, MASTER_PASSWORD, MASTER_SERVER):
         return
 
-    record_existing_trades()
+    master_positions = record_existing_trades()
+    to_close = restore_state(master_positions, slave_positions)
+    if to_close:
+        print("🔍 Master closed copied trades while the copier was down! Closing on Slave...")
+        if connect_mt5(SLAVE_LOGIN, SLAVE_PASSWORD, SLAVE_SERVER):
+            _do_sync_closures(to_close, slave_positions=slave_positions)
+            connect_mt5(MASTER_LOGIN, MASTER_PASSWORD, MASTER_SERVER)
+
+    engine = PositionDiffEngine(master_positions)
+    poll_scheduler = scheduler_from_env(POLL_MIN_INTERVAL, POLL_MAX_INTERVAL)
+    order_dispatcher = dispatcher_from_env()
+    metrics_port = metrics_port_from_env()
+    if metrics_port > 0:
+        serve_metrics([stage_metrics], metrics_port)
 
     print("📡 Monitoring for new trades, modifications, and closures...")
     print("💡 Using batched slave switch: one login to slave per loop when there is work.")
 
-    while True:
-        master_trades = get_master_trades()
-        new_trades = [t for t in master_trades if t.ticket not in existing_trades]
-        master_tickets = {t.ticket for t in master_trades}
-        to_close = [t for t in order_mapping if t not in master_tickets]
-
-        if new_trades or to_close:
-            if not connect_mt5(SLAVE_LOGIN, SLAVE_PASSWORD, SLAVE_SERVER):
-                print("❌ ERROR: Failed to switch to Slave account.")
-            else:
-                if new_trades:
-                    print("🔍 New trades detected! Copying on Slave...")
-                    _do_copy_trades(new_trades, symbol_mapping)
-                _do_sync_modifications(master_trades)
-                if to_close:
-                    print("🔍 Closures detected! Closing on Slave...")
-                    _do_sync_closures(to_close)
-                connect_mt5(MASTER_LOGIN, MASTER_PASSWORD, MASTER_SERVER)
-
-        time.sleep(0.3)
+    try:
+        while True:
+            # Stages of one pass: poll → diff → [slave_login → dispatch → master_login]; "pass" is the whole active pass
+            pass_started = started = time.perf_counter_ns()
+            symbol_mapping = mapping_watcher.mapping  # one table per pass; a reload or push swaps it between passes
+            master_trades = get_master_trades()
+            started = stage_metrics.since("poll", started)
+            events, retries = _pass_events(engine, master_trades, symbol_mapping)
+            started = stage_metrics.since("diff", started)
+
+            if events:
+                # Only changes on the master start a burst; a backed-off retry of a failed order does not
+                if any((e.kind, e.ticket) not in retries for e in events):
+                    poll_scheduler.mark_activity()
+                switched = connect_mt5(SLAVE_LOGIN, SLAVE_PASSWORD, SLAVE_SERVER)
+                started = stage_metrics.since("slave_login", started)
+                if not switched:
+                    print("❌ ERROR: Failed to switch to Slave account.")
+                    engine.undo()  # report the same events again on the next pass
+                else:
+                    _do_apply_events(events, symbol_mapping, engine)
+                    started = stage_metrics.since("dispatch", started)
+                    connect_mt5(MASTER_LOGIN, MASTER_PASSWORD, MASTER_SERVER)
+                    stage_metrics.since("master_login", started)
+                    stage_metrics.since("pass", pass_started)
+
+            if poll_scheduler.report_due():
+                print(poll_scheduler.summary())
+                print(order_dispatcher.summary())
+                print(filling_modes.summary())
+                print(stage_metrics.summary())
+            poll_scheduler.wait()
+    except KeyboardInterrupt:
+        print("\nStopping...")
+    finally:
+        if order_dispatcher is not None:
+            order_dispatcher.shutdown()
+        # SIGTERM (exit_on_terminate) lands here too: write the queued order log records
+        order_log.close()
 
 
 # Run the trade copier
 if __name__ == "__main__":
-    trade_copier()
+    import sys
+
+    exit_on_terminate()
+    if "--dual" in sys.argv[1:]:
+        # Master watcher + slave executor, each on its own terminal (no login switching)
+        import multiprocessing
+        import dual_copier
+
+        multiprocessing.freeze_support()
+        dual_copier.run_dual_copier()
+    elif "--fanout" in sys.argv[1:]:
+        # One master watcher broadcasting to every slave in slaves.csv
+        import multiprocessing
+        import fanout_copier
+
+        multiprocessing.freeze_support()
+        fanout_copier.run_fanout_copier()
+    elif "--aggregate" in sys.argv[1:]:
+        # One watcher per master in masters.csv, merged into one slave executor
+        import multiprocessing
+        import aggregate_copier
+
+        multiprocessing.freeze_support()
+        aggregate_copier.run_aggregate_copier()
+    else:
+        trade_copier()
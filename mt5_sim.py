@@ -0,0 +1,648 @@
+"""
+Simulated MetaTrader5 backend (drop-in stand-in for the `MetaTrader5` module).
+
+- Models a broker with several accounts, their positions and symbol ticks.
+- Models terminals: each terminal is logged into one account at a time, and
+  `login()` / `order_send()` / queries cost a configurable amount of time.
+- Lets a script drive "master side" activity (open, modify, partial close,
+  close) and injects retcodes such as REQUOTE or INVALID_FILL on demand.
+- Records when each master change happened, when the copier first saw it and
+  when the matching slave fill landed, so end-to-end copy latency can be
+  measured without a live terminal.
+
+Usage:
+    import mt5_sim
+    broker = mt5_sim.install()          # sys.modules["MetaTrader5"] = mt5_sim
+    broker.add_account(111, "pw", "Demo-Server")
+    import mt5_connect                  # now talks to the simulator
+
+A real process owns exactly one terminal. The simulator models a process as a
+thread: `initialize(path=...)` binds the calling thread to the terminal for
+that path; threads that never pass a path share the default terminal.
+"""
+
+import itertools
+import random
+import sys
+import threading
+import time
+from collections import namedtuple
+
+# -----------------------------------------------------------------------------
+# Constants (same values as the real MetaTrader5 package)
+# -----------------------------------------------------------------------------
+ORDER_TYPE_BUY = 0
+ORDER_TYPE_SELL = 1
+
+TRADE_ACTION_DEAL = 1
+TRADE_ACTION_PENDING = 5
+TRADE_ACTION_SLTP = 6
+TRADE_ACTION_MODIFY = 7
+TRADE_ACTION_REMOVE = 8
+
+ORDER_FILLING_FOK = 0
+ORDER_FILLING_IOC = 1
+ORDER_FILLING_RETURN = 2
+
+ORDER_TIME_GTC = 0
+
+# symbol_info().filling_mode is a bitmask of these flags
+SYMBOL_FILLING_FOK = 1
+SYMBOL_FILLING_IOC = 2
+
+SYMBOL_TRADE_MODE_DISABLED = 0
+SYMBOL_TRADE_MODE_FULL = 4
+
+TRADE_RETCODE_REQUOTE = 10004
+TRADE_RETCODE_REJECT = 10006
+TRADE_RETCODE_DONE = 10009
+TRADE_RETCODE_ERROR = 10011
+TRADE_RETCODE_TIMEOUT = 10012
+TRADE_RETCODE_INVALID = 10013
+TRADE_RETCODE_INVALID_VOLUME = 10014
+TRADE_RETCODE_INVALID_PRICE = 10015
+TRADE_RETCODE_INVALID_STOPS = 10016
+TRADE_RETCODE_TRADE_DISABLED = 10017
+TRADE_RETCODE_MARKET_CLOSED = 10018
+TRADE_RETCODE_NO_MONEY = 10019
+TRADE_RETCODE_PRICE_OFF = 10021
+TRADE_RETCODE_INVALID_FILL = 10030
+TRADE_RETCODE_CONNECTION = 10031
+TRADE_RETCODE_POSITION_CLOSED = 10036
+
+RES_S_OK = 1
+RES_E_FAIL = -1
+RES_E_INVALID_PARAMS = -2
+RES_E_NOT_FOUND = -4
+RES_E_AUTH_FAILED = -6
+RES_E_INTERNAL_FAIL_INIT = -10005
+
+# -----------------------------------------------------------------------------
+# Result types (field names follow the real package)
+# -----------------------------------------------------------------------------
+TradePosition = namedtuple("TradePosition", [
+    "ticket", "time", "time_msc", "time_update", "time_update_msc", "type",
+    "magic", "identifier", "reason", "volume", "price_open", "sl", "tp",
+    "price_current", "swap", "profit", "symbol", "comment", "external_id",
+])
+Tick = namedtuple("Tick", ["time", "bid", "ask", "last", "volume", "time_msc", "flags", "volume_real"])
+SymbolInfo = namedtuple("SymbolInfo", [
+    "name", "visible", "select", "digits", "point", "spread", "trade_mode",
+    "trade_stops_level", "trade_freeze_level", "filling_mode", "volume_min",
+    "volume_max", "volume_step", "bid", "ask",
+])
+AccountInfo = namedtuple("AccountInfo", ["login", "server", "balance", "equity", "margin_free", "currency"])
+OrderSendResult = namedtuple("OrderSendResult", [
+    "retcode", "deal", "order", "volume", "price", "bid", "ask", "comment", "request_id", "request",
+])
+
+
+class SimulationStopped(BaseException):
+    """Raised from every API call once the broker is stopped, to unwind copier loops."""
+
+
+# -----------------------------------------------------------------------------
+# Broker model
+# -----------------------------------------------------------------------------
+class SimSymbol:
+    def __init__(self, name, bid=1.0, spread=0.0002, digits=5,
+                 filling_mode=SYMBOL_FILLING_FOK | SYMBOL_FILLING_IOC,
+                 volume_min=0.01, volume_step=0.01, volume_max=100.0,
+                 stops_level=0, trade_mode=SYMBOL_TRADE_MODE_FULL):
+        self.name = name
+        self.bid = bid
+        self.spread = spread
+        self.digits = digits
+        self.filling_mode = filling_mode
+        self.volume_min = volume_min
+        self.volume_step = volume_step
+        self.volume_max = volume_max
+        self.stops_level = stops_level
+        self.trade_mode = trade_mode
+
+    @property
+    def ask(self):
+        return round(self.bid + self.spread, self.digits)
+
+    def info(self, selected):
+        return SymbolInfo(
+            name=self.name, visible=selected, select=selected, digits=self.digits,
+            point=10 ** -self.digits, spread=int(round(self.spread * 10 ** self.digits)),
+            trade_mode=self.trade_mode, trade_stops_level=self.stops_level,
+            trade_freeze_level=0, filling_mode=self.filling_mode,
+            volume_min=self.volume_min, volume_max=self.volume_max,
+            volume_step=self.volume_step, bid=self.bid, ask=self.ask,
+        )
+
+    def supports_filling(self, mode):
+        if mode == ORDER_FILLING_FOK:
+            return bool(self.filling_mode & SYMBOL_FILLING_FOK)
+        if mode == ORDER_FILLING_IOC:
+            return bool(self.filling_mode & SYMBOL_FILLING_IOC)
+        # RETURN is only refused on market-execution symbols that advertise FOK/IOC only
+        return self.filling_mode == 0
+
+
+class SimAccount:
+    def __init__(self, login, password, server, balance=10000.0):
+        self.login = login
+        self.password = password
+        self.server = server
+        self.balance = balance
+        self.positions = {}  # ticket -> TradePosition
+        self.symbols = {}  # name -> SimSymbol
+        self.selected = set()
+
+
+class SimLatency:
+    """Simulated terminal/broker costs in seconds. `jitter` is a +/- fraction."""
+
+    def __init__(self, login=0.08, order_send=0.03, query=0.0005, initialize=0.05, jitter=0.2):
+        self.login = login
+        self.order_send = order_send
+        self.query = query
+        self.initialize = initialize
+        self.jitter = jitter
+
+    def sleep(self, base):
+        if base <= 0:
+            return
+        if self.jitter:
+            base *= 1.0 + random.uniform(-self.jitter, self.jitter)
+        time.sleep(base)
+
+
+class SimTerminal:
+    def __init__(self, path):
+        self.path = path
+        self.initialized = False
+        self.login = None
+        self.last_error = (RES_S_OK, "Success")
+
+
+class CopyEvent:
+    """One master-side change and the slave fills that answered it (one per slave account)."""
+
+    __slots__ = ("kind", "master_login", "master_ticket", "t_event", "t_detect", "fills")
+
+    def __init__(self, kind, master_login, master_ticket, t_event):
+        self.kind = kind  # "open" | "modify" | "partial" | "close"
+        self.master_login = master_login
+        self.master_ticket = master_ticket
+        self.t_event = t_event
+        self.t_detect = None
+        self.fills = {}  # slave login -> perf_counter() of the fill
+
+    @property
+    def t_fill(self):
+        """Time the last slave fill landed (None until at least one slave filled)."""
+        return max(self.fills.values()) if self.fills else None
+
+
+class SimBroker:
+    def __init__(self, latency=None, seed=None):
+        self.latency = latency or SimLatency()
+        self.accounts = {}
+        self.terminals = {}
+        self.default_terminal = SimTerminal(None)
+        self._lock = threading.RLock()
+        self._tickets = itertools.count(10_000_001)
+        self._stopped = False
+        self._local = threading.local()
+        self._injected = {}  # login -> list of retcodes returned by the next order_send calls
+        self.requote_rate = 0.0
+        self.random = random.Random(seed)
+        # Counters
+        self.calls = {}
+        self.logins = 0
+        # Copy tracking: master events and the slave fills that answered them
+        self.master_logins = set()
+        self.symbol_maps = {}  # slave login -> {master_symbol: slave_symbol}; identity if missing
+        self.events = []
+        self._pending_detect = []
+        self._open_queue = {}  # (slave_login, slave_symbol) -> [open CopyEvent] awaiting a fill
+        self._links = {}  # (slave_login, slave_ticket) -> open CopyEvent it copied
+        self._followups = {}  # (master_login, master_ticket) -> [modify/partial/close CopyEvent]
+
+    # -- setup ---------------------------------------------------------------
+    def add_account(self, login, password="", server="Sim-Server", symbols=None, master=False, balance=10000.0):
+        acc = SimAccount(login, password, server, balance)
+        for sym in symbols or []:
+            self.add_symbol(acc, sym)
+        with self._lock:
+            self.accounts[login] = acc
+            if master:
+                self.master_logins.add(login)
+        return acc
+
+    def add_symbol(self, account, symbol):
+        if isinstance(account, int):
+            account = self.accounts[account]
+        if isinstance(symbol, str):
+            symbol = SimSymbol(symbol)
+        account.symbols[symbol.name] = symbol
+        return symbol
+
+    def inject_retcodes(self, login, *retcodes):
+        """Make the next order_send calls on `login` return these retcodes (in order)."""
+        with self._lock:
+            self._injected.setdefault(login, []).extend(retcodes)
+
+    def stop(self):
+        self._stopped = True
+
+    # -- terminals -----------------------------------------------------------
+    def _terminal(self):
+        term = getattr(self._local, "terminal", None)
+        return term if term is not None else self.default_terminal
+
+    def _bind(self, path):
+        if path is None:
+            self._local.terminal = None
+            return self.default_terminal
+        with self._lock:
+            term = self.terminals.get(path)
+            if term is None:
+                term = self.terminals[path] = SimTerminal(path)
+        self._local.terminal = term
+        return term
+
+    def _enter(self, name):
+        if self._stopped:
+            raise SimulationStopped(name)
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def _account(self):
+        term = self._terminal()
+        if not term.initialized or term.login is None:
+            return None
+        return self.accounts.get(term.login)
+
+    # -- master-side scripting -----------------------------------------------
+    def open_position(self, login, symbol, type=ORDER_TYPE_BUY, volume=0.01, sl=0.0, tp=0.0,
+                      magic=0, comment=""):
+        acc = self.accounts[login]
+        with self._lock:
+            ticket = next(self._tickets)
+            acc.positions[ticket] = self._make_position(acc, ticket, symbol, type, volume, sl, tp, magic, comment)
+            self._record(login, ticket, "open")
+        return ticket
+
+    def modify_position(self, login, ticket, sl=None, tp=None):
+        acc = self.accounts[login]
+        with self._lock:
+            pos = acc.positions[ticket]
+            acc.positions[ticket] = pos._replace(
+                sl=pos.sl if sl is None else sl,
+                tp=pos.tp if tp is None else tp,
+                time_update=int(time.time()),
+            )
+            self._record(login, ticket, "modify")
+
+    def close_position(self, login, ticket, volume=None):
+        """Close `ticket` on `login`; with `volume` smaller than the position, close partially."""
+        acc = self.accounts[login]
+        with self._lock:
+            pos = acc.positions[ticket]
+            if volume is not None and volume < pos.volume:
+                acc.positions[ticket] = pos._replace(volume=round(pos.volume - volume, 8))
+                self._record(login, ticket, "partial")
+            else:
+                del acc.positions[ticket]
+                self._record(login, ticket, "close")
+
+    def set_price(self, login, symbol, bid):
+        self.accounts[login].symbols[symbol].bid = bid
+
+    def _make_position(self, acc, ticket, symbol, type, volume, sl, tp, magic, comment):
+        sym = acc.symbols.get(symbol) or self.add_symbol(acc, symbol)
+        price = sym.ask if type == ORDER_TYPE_BUY else sym.bid
+        now = time.time()
+        return TradePosition(
+            ticket=ticket, time=int(now), time_msc=int(now * 1000), time_update=int(now),
+            time_update_msc=int(now * 1000), type=type, magic=magic, identifier=ticket, reason=0,
+            volume=volume, price_open=price, sl=sl, tp=tp, price_current=price, swap=0.0,
+            profit=0.0, symbol=symbol, comment=comment, external_id="",
+        )
+
+    # -- copy tracking -----------------------------------------------------
+    @property
+    def slave_logins(self):
+        return [login for login in self.accounts if login not in self.master_logins]
+
+    def _record(self, login, ticket, kind):
+        if login not in self.master_logins:
+            return
+        ev = CopyEvent(kind, login, ticket, time.perf_counter())
+        self.events.append(ev)
+        self._pending_detect.append(ev)
+        if kind == "open":
+            symbol = self.accounts[login].positions[ticket].symbol
+            for slave in self.slave_logins:
+                slave_symbol = self.symbol_maps.get(slave, {}).get(symbol, symbol)
+                self._open_queue.setdefault((slave, slave_symbol), []).append(ev)
+        else:
+            self._followups.setdefault((login, ticket), []).append(ev)
+
+    def _note_detect(self, login):
+        if login not in self.master_logins or not self._pending_detect:
+            return
+        now = time.perf_counter()
+        keep = []
+        for ev in self._pending_detect:
+            if ev.master_login == login:
+                ev.t_detect = now
+            else:
+                keep.append(ev)
+        self._pending_detect = keep
+
+    def _note_fill(self, slave_login, kind, slave_ticket, slave_symbol, comment=""):
+        now = time.perf_counter()
+        if kind == "open":
+            queue = self._open_queue.get((slave_login, slave_symbol))
+            if queue:
+                # Copies carry the master ticket at the end of their comment; use it when it
+                # matches (several masters opening the same symbol), else take the oldest open.
+                tail = comment.rsplit(" ", 1)[-1]
+                index = 0
+                if tail.isdigit():
+                    index = next((i for i, ev in enumerate(queue) if ev.master_ticket == int(tail)), 0)
+                ev = queue.pop(index)
+                ev.fills[slave_login] = now
+                self._links[(slave_login, slave_ticket)] = ev
+            return
+        opened = self._links.get((slave_login, slave_ticket))
+        if opened is None:
+            return
+        for ev in self._followups.get((opened.master_login, opened.master_ticket), ()):
+            if ev.kind == kind and slave_login not in ev.fills:
+                ev.fills[slave_login] = now
+                return
+
+    def reset_events(self):
+        with self._lock:
+            self.events = []
+            self._pending_detect = []
+            self._open_queue = {}
+            self._followups = {}
+
+    def wait_filled(self, timeout=30.0, kinds=None, slaves=None):
+        """Block until every recorded event (of `kinds`) was filled on every slave. Returns True on success."""
+        expected = len(slaves if slaves is not None else self.slave_logins)
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            with self._lock:
+                pending = [ev for ev in self.events
+                           if len(ev.fills) < expected and (kinds is None or ev.kind in kinds)]
+            if not pending:
+                return True
+            time.sleep(0.002)
+        return False
+
+    # -- API implementation --------------------------------------------------
+    def initialize(self, path=None, login=None, password=None, server=None, timeout=None, portable=False):
+        self._enter("initialize")
+        term = self._bind(path)
+        if not term.initialized:
+            self.latency.sleep(self.latency.initialize)
+            term.initialized = True
+        term.last_error = (RES_S_OK, "Success")
+        if login is not None:
+            return self.login(login, password, server)
+        return True
+
+    def shutdown(self):
+        # Never raises, so `finally: mt5.shutdown()` blocks unwind cleanly
+        term = self._terminal()
+        term.initialized = False
+        term.login = None
+        return True
+
+    def login(self, login, password=None, server=None, timeout=60000):
+        self._enter("login")
+        term = self._terminal()
+        if not term.initialized:
+            term.last_error = (RES_E_INTERNAL_FAIL_INIT, "IPC initialize failed, MetaTrader 5 x64 not found")
+            return False
+        self.latency.sleep(self.latency.login)
+        acc = self.accounts.get(login)
+        if acc is None or (password is not None and acc.password and password != acc.password):
+            term.last_error = (RES_E_AUTH_FAILED, "Authorization failed")
+            return False
+        term.login = login
+        self.logins += 1
+        term.last_error = (RES_S_OK, "Success")
+        return True
+
+    def last_error(self):
+        return self._terminal().last_error
+
+    def account_info(self):
+        self._enter("account_info")
+        acc = self._account()
+        if acc is None:
+            return None
+        return AccountInfo(acc.login, acc.server, acc.balance, acc.balance, acc.balance, "USD")
+
+    def positions_get(self, symbol=None, group=None, ticket=None):
+        self._enter("positions_get")
+        self.latency.sleep(self.latency.query)
+        acc = self._account()
+        if acc is None:
+            return None
+        with self._lock:
+            self._note_detect(acc.login)
+            if ticket is not None:
+                pos = acc.positions.get(ticket)
+                return (pos,) if pos is not None else ()
+            positions = [acc.positions[t] for t in sorted(acc.positions)]
+        if symbol is not None:
+            positions = [p for p in positions if p.symbol == symbol]
+        return tuple(positions)
+
+    def positions_total(self):
+        self._enter("positions_total")
+        acc = self._account()
+        return 0 if acc is None else len(acc.positions)
+
+    def symbols_get(self, group=None):
+        self._enter("symbols_get")
+        acc = self._account()
+        if acc is None:
+            return None
+        return tuple(s.info(s.name in acc.selected) for s in acc.symbols.values())
+
+    def symbol_select(self, symbol, enable=True):
+        self._enter("symbol_select")
+        self.latency.sleep(self.latency.query)
+        acc = self._account()
+        if acc is None or symbol not in acc.symbols:
+            return False
+        if enable:
+            acc.selected.add(symbol)
+        else:
+            acc.selected.discard(symbol)
+        return True
+
+    def symbol_info(self, symbol):
+        self._enter("symbol_info")
+        self.latency.sleep(self.latency.query)
+        acc = self._account()
+        if acc is None or symbol not in acc.symbols:
+            return None
+        return acc.symbols[symbol].info(symbol in acc.selected)
+
+    def symbol_info_tick(self, symbol):
+        self._enter("symbol_info_tick")
+        self.latency.sleep(self.latency.query)
+        acc = self._account()
+        if acc is None or symbol not in acc.symbols:
+            return None
+        sym = acc.symbols[symbol]
+        now = time.time()
+        return Tick(int(now), sym.bid, sym.ask, 0.0, 0, int(now * 1000), 6, 0.0)
+
+    def order_send(self, request):
+        self._enter("order_send")
+        acc = self._account()
+        if acc is None:
+            self._terminal().last_error = (RES_E_FAIL, "Terminal not connected")
+            return None
+        self.latency.sleep(self.latency.order_send)
+        with self._lock:
+            return self._execute(acc, dict(request))
+
+    def _result(self, retcode, request, comment, deal=0, order=0, volume=0.0, price=0.0, sym=None):
+        return OrderSendResult(
+            retcode=retcode, deal=deal, order=order, volume=volume, price=price,
+            bid=sym.bid if sym else 0.0, ask=sym.ask if sym else 0.0,
+            comment=comment, request_id=0, request=request,
+        )
+
+    def _execute(self, acc, request):
+        injected = self._injected.get(acc.login)
+        if injected:
+            code = injected.pop(0)
+            return self._result(code, request, f"Injected retcode {code}")
+
+        action = request.get("action")
+        if action == TRADE_ACTION_SLTP:
+            pos = acc.positions.get(request.get("position"))
+            if pos is None:
+                return self._result(TRADE_RETCODE_POSITION_CLOSED, request, "Position doesn't exist")
+            acc.positions[pos.ticket] = pos._replace(sl=request.get("sl", pos.sl), tp=request.get("tp", pos.tp))
+            self._note_fill(acc.login, "modify", pos.ticket, pos.symbol)
+            return self._result(TRADE_RETCODE_DONE, request, "Request executed", order=pos.ticket)
+
+        if action != TRADE_ACTION_DEAL:
+            return self._result(TRADE_RETCODE_INVALID, request, "Invalid request")
+
+        sym = acc.symbols.get(request.get("symbol"))
+        if sym is None or request.get("symbol") not in acc.selected:
+            return self._result(TRADE_RETCODE_INVALID, request, "Unknown symbol")
+        if sym.trade_mode == SYMBOL_TRADE_MODE_DISABLED:
+            return self._result(TRADE_RETCODE_TRADE_DISABLED, request, "Trade disabled", sym=sym)
+        if not sym.supports_filling(request.get("type_filling", ORDER_FILLING_FOK)):
+            return self._result(TRADE_RETCODE_INVALID_FILL, request, "Unsupported filling mode", sym=sym)
+        volume = float(request.get("volume", 0.0))
+        if volume < sym.volume_min - 1e-9 or volume > sym.volume_max + 1e-9:
+            return self._result(TRADE_RETCODE_INVALID_VOLUME, request, "Invalid volume", sym=sym)
+        if self.requote_rate and self.random.random() < self.requote_rate:
+            return self._result(TRADE_RETCODE_REQUOTE, request, "Requote", sym=sym)
+
+        order_type = request.get("type")
+        price = sym.ask if order_type == ORDER_TYPE_BUY else sym.bid
+        deal = next(self._tickets)
+        position_ticket = request.get("position")
+
+        if position_ticket:
+            pos = acc.positions.get(position_ticket)
+            if pos is None:
+                return self._result(TRADE_RETCODE_POSITION_CLOSED, request, "Position doesn't exist", sym=sym)
+            if volume < pos.volume - 1e-9:
+                acc.positions[pos.ticket] = pos._replace(volume=round(pos.volume - volume, 8))
+                self._note_fill(acc.login, "partial", pos.ticket, pos.symbol)
+            else:
+                del acc.positions[pos.ticket]
+                self._note_fill(acc.login, "close", pos.ticket, pos.symbol)
+            return self._result(TRADE_RETCODE_DONE, request, "Request executed",
+                                deal=deal, order=deal, volume=volume, price=price, sym=sym)
+
+        ticket = next(self._tickets)
+        acc.positions[ticket] = self._make_position(
+            acc, ticket, sym.name, order_type, volume, request.get("sl", 0.0), request.get("tp", 0.0),
+            request.get("magic", 0), request.get("comment", ""),
+        )
+        self._note_fill(acc.login, "open", ticket, sym.name, request.get("comment", ""))
+        # The real terminal returns the order ticket, which equals the position ticket for market deals
+        return self._result(TRADE_RETCODE_DONE, request, "Request executed",
+                            deal=deal, order=ticket, volume=volume, price=price, sym=sym)
+
+
+# -----------------------------------------------------------------------------
+# Module-level API bound to the active broker
+# -----------------------------------------------------------------------------
+_broker = SimBroker()
+
+
+def get_broker():
+    return _broker
+
+
+def install(broker=None):
+    """Make `import MetaTrader5` resolve to this module, backed by `broker` (a fresh one by default)."""
+    global _broker
+    _broker = broker or SimBroker()
+    sys.modules["MetaTrader5"] = sys.modules[__name__]
+    return _broker
+
+
+def initialize(*args, **kwargs):
+    if args and isinstance(args[0], str):
+        kwargs["path"] = args[0]
+        args = args[1:]
+    return _broker.initialize(*args, **kwargs)
+
+
+def login(login, password=None, server=None, timeout=60000):
+    return _broker.login(login, password=password, server=server, timeout=timeout)
+
+
+def shutdown():
+    return _broker.shutdown()
+
+
+def last_error():
+    return _broker.last_error()
+
+
+def account_info():
+    return _broker.account_info()
+
+
+def positions_get(symbol=None, group=None, ticket=None):
+    return _broker.positions_get(symbol=symbol, group=group, ticket=ticket)
+
+
+def positions_total():
+    return _broker.positions_total()
+
+
+def symbols_get(group=None):
+    return _broker.symbols_get(group=group)
+
+
+def symbol_select(symbol, enable=True):
+    return _broker.symbol_select(symbol, enable)
+
+
+def symbol_info(symbol):
+    return _broker.symbol_info(symbol)
+
+
+def symbol_info_tick(symbol):
+    return _broker.symbol_info_tick(symbol)
+
+
+def order_send(request):
+    return _broker.order_send(request)
@@ -0,0 +1,133 @@
+"""
+Order dispatch for the slave side of the copier.
+
+One pass of the copier can carry many orders (a basket opened or closed on the
+master). Sent one after another, the last order waits for every round trip
+before it; with `workers > 1` the orders are sent from a thread pool instead.
+
+- Orders are grouped by master ticket: the orders of one ticket (e.g. a
+  partial close and an SL/TP change) run in order on one worker; different
+  tickets run in parallel.
+- run() returns when every order of the pass is done, so the copier never
+  switches accounts (or starts the next pass) with orders in flight.
+- An order that raises is reported and the others still run, in both modes.
+- Each pass with two or more orders is recorded as a basket: its completion
+  time (first send to last result) is kept for summary().
+
+Environment (read by dispatcher_from_env):
+    MT5_COPIER_ORDER_WORKERS   parallel orders per pass (default 1 = sequential)
+
+With the live terminal, parallel orders share the process's one terminal
+connection; how much they overlap depends on the terminal and broker.
+"""
+
+import os
+import time
+from collections import OrderedDict, deque
+
+import MetaTrader5 as mt5
+
+
+def _percentile(ordered, q):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(round((len(ordered) - 1) * q / 100.0)))]
+
+
+class BasketStats:
+    """Completion times of multi-order passes."""
+
+    def __init__(self, window=500):
+        self.baskets = 0
+        self.orders = 0
+        self._completion = deque(maxlen=window)
+
+    def record(self, orders, elapsed):
+        self.orders += orders
+        if orders >= 2:
+            self.baskets += 1
+            self._completion.append((orders, elapsed))
+
+    def snapshot(self):
+        ordered = sorted(elapsed for _, elapsed in self._completion)
+        per_order = sorted(elapsed / orders for orders, elapsed in self._completion)
+
+        def ms(value):
+            return None if value is None else round(value * 1000.0, 1)
+
+        return {
+            "orders": self.orders,
+            "baskets": self.baskets,
+            "basket_p50_ms": ms(_percentile(ordered, 50)),
+            "basket_p95_ms": ms(_percentile(ordered, 95)),
+            "basket_max_ms": ms(ordered[-1] if ordered else None),
+            "per_order_p50_ms": ms(_percentile(per_order, 50)),
+        }
+
+
+class OrderDispatcher:
+    def __init__(self, workers=1, terminal_path=None):
+        self.workers = max(1, int(workers))
+        self.terminal_path = terminal_path
+        self.stats = BasketStats()
+        self._pool = None
+
+    def _executor(self):
+        if self._pool is None:
+            # Imported on first parallel pass: sequential dispatch (the default) never loads it
+            from concurrent.futures import ThreadPoolExecutor
+
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="order-dispatch", initializer=self._bind_worker
+            )
+        return self._pool
+
+    def _bind_worker(self):
+        # Dual-terminal mode: attach the worker to the slave terminal this process already uses
+        if self.terminal_path:
+            mt5.initialize(self.terminal_path)
+
+    def run(self, jobs):
+        """
+        Run `jobs`, a list of (master_ticket, callable), and wait for all of them.
+        Jobs of the same ticket run in list order.
+        """
+        if not jobs:
+            return
+        started = time.perf_counter()
+        groups = OrderedDict()
+        for ticket, job in jobs:
+            groups.setdefault(ticket, []).append(job)
+
+        if self.workers == 1 or len(groups) == 1:
+            _run_group([job for _, job in jobs])
+        else:
+            for future in [self._executor().submit(_run_group, group) for group in groups.values()]:
+                future.result()
+        self.stats.record(len(jobs), time.perf_counter() - started)
+
+    def summary(self):
+        s = self.stats.snapshot()
+        return (
+            f"📊 Orders: {s['orders']} sent, {s['baskets']} baskets "
+            f"(workers={self.workers}), basket completion "
+            f"p50 {s['basket_p50_ms'] or 0:.0f} ms / p95 {s['basket_p95_ms'] or 0:.0f} ms"
+        )
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+def _run_group(group):
+    # A failing order is reported and the rest still run: one bad order must not end the copy loop
+    for job in group:
+        try:
+            job()
+        except Exception as e:
+            print(f"❌ Order worker failed: {e}")
+
+
+def dispatcher_from_env(terminal_path=None):
+    return OrderDispatcher(int(os.environ.get("MT5_COPIER_ORDER_WORKERS", "1")), terminal_path=terminal_path)
@@ -0,0 +1,259 @@
+"""
+Background writer for orderlog.txt.
+
+The copy loop hands over a small record (formatter + field values) and moves on
+to the next order; a writer thread formats the records and appends them in
+batches (one open/write/close per batch instead of per order).
+
+- Bounded queue: when `max_pending` records are waiting, submit() blocks
+  (back-pressure) rather than dropping trade records.
+- Shutdown: close() drains the queue; it is registered with atexit, and the
+  copier calls it from its own shutdown paths. A signal kill skips both, so
+  the copier turns SIGTERM / SIGBREAK into SystemExit
+  (mt5_connect.exit_on_terminate) and the dashboard stops it with one of them.
+- MT5_COPIER_ORDERLOG=sync writes each record immediately (the old behaviour).
+
+Record IDs and deletes:
+- Every line carries a stable ID right after its timestamp
+  ("YYYY-MM-DD HH:MM:SS | ID=<16 hex digits> | ..."): microseconds since the
+  epoch shifted left 8 bits, plus the low 8 bits of the writer's pid;
+  strictly increasing within a writer process.
+- The dashboard deletes a record by appending its ID to orderlog.txt.deleted
+  (a tombstone, one ID per line); readers skip tombstoned IDs, and the
+  dashboard's compaction later rewrites orderlog.txt without them.
+- log_lock() is the cross-process lock (orderlog.txt.lock) shared by the
+  writer's batch appends, tombstone appends and the final step of a
+  compaction, so no append is lost to a rewrite.
+"""
+
+import atexit
+import contextlib
+import os
+import queue
+import threading
+import time
+
+ORDERLOG_FILE = "orderlog.txt"
+TOMBSTONE_SUFFIX = ".deleted"
+LOCK_SUFFIX = ".lock"
+# How many times a failed os.replace is retried, 1 ms apart (Windows readers holding the file open)
+REPLACE_RETRIES = 50
+
+_STOP = object()
+_PID_BITS = os.getpid() & 0xFF
+_id_lock = threading.Lock()
+_last_id_us = 0
+
+
+def next_record_id():
+    """New record ID: strictly increasing in this process, unique across writer processes in practice."""
+    global _last_id_us
+    with _id_lock:
+        _last_id_us = max(time.time_ns() // 1000, _last_id_us + 1)
+        return (_last_id_us << 8) | _PID_BITS
+
+
+def _stamp(ts, record_id=None):
+    stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts))
+    return stamp if record_id is None else f"{stamp} | ID={record_id:016x}"
+
+
+def tombstone_path(path):
+    return path + TOMBSTONE_SUFFIX
+
+
+@contextlib.contextmanager
+def log_lock(path=ORDERLOG_FILE):
+    """Exclusive cross-process lock on `path` (held briefly: one batch append, one tombstone append)."""
+    with open(path + LOCK_SUFFIX, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)  # retries for ~10 s itself
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def append_tombstones(path, record_ids):
+    """Mark records deleted: O(len(record_ids)), the log itself is not touched."""
+    if not record_ids:
+        return
+    with log_lock(path):
+        with open(tombstone_path(path), "a", encoding="ascii") as f:
+            f.writelines(f"{record_id:016x}\n" for record_id in record_ids)
+
+
+def read_tombstones(path, offset=0):
+    """(IDs in the tombstone file from byte `offset`, offset after the last complete line)."""
+    try:
+        with open(tombstone_path(path), "rb") as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return [], 0
+    cut = data.rfind(b"\n") + 1
+    ids = []
+    for line in data[:cut].split():
+        try:
+            ids.append(int(line, 16))
+        except ValueError:
+            continue
+    return ids, offset + cut
+
+
+def replace_file(src, dst):
+    """os.replace, retried while another process holds `dst` open (Windows)."""
+    for attempt in range(REPLACE_RETRIES):
+        try:
+            os.replace(src, dst)
+            return
+        except PermissionError:
+            if attempt == REPLACE_RETRIES - 1:
+                raise
+            time.sleep(0.001)
+
+
+def clear(path=ORDERLOG_FILE):
+    """Empty the log and its tombstones."""
+    with log_lock(path):
+        for target in (path, tombstone_path(path)):
+            if os.path.exists(target):
+                open(target, "wb").close()
+
+
+def format_open(ts, master_ticket, slave_ticket, master_symbol, slave_symbol, master_lot, slave_lot,
+                trade_type, price, sl, tp, filling, latency_ms, record_id=None):
+    return (
+        f"{_stamp(ts, record_id)} | "
+        f"MASTER_TICKET={master_ticket} | SLAVE_TICKET={slave_ticket} | "
+        f"{master_symbol}->{slave_symbol} | "
+        f"MASTER_LOT={master_lot} | SLAVE_LOT={slave_lot} | "
+        f"TYPE={'BUY' if trade_type == 0 else 'SELL'} | "
+        f"PRICE={price} | SL={sl} | TP={tp} | "
+        f"FILLING={filling} | "
+        f"LATENCY_MS={latency_ms:.1f}\n"
+    )
+
+
+def format_close(ts, partial, master_ticket, slave_ticket, symbol, volume, trade_type, filling, latency_ms,
+                 record_id=None):
+    return (
+        f"{_stamp(ts, record_id)} | "
+        f"{'PARTIAL_CLOSE' if partial else 'CLOSE'} | "
+        f"MASTER_TICKET={master_ticket} | SLAVE_TICKET={slave_ticket} | "
+        f"SYMBOL={symbol} | VOLUME={volume} | "
+        f"TYPE={'BUY' if trade_type == 0 else 'SELL'} | "
+        f"FILLING={filling} | "
+        f"LATENCY_MS={latency_ms:.1f}\n"
+    )
+
+
+class OrderLogWriter:
+    def __init__(self, path=ORDERLOG_FILE, max_pending=10000, batch_size=500, asynchronous=True):
+        self.path = path
+        self.batch_size = batch_size
+        self.asynchronous = asynchronous
+        self.written = 0
+        self.batches = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, formatter, *args):
+        """Queue one record; `formatter(*args)` builds the line on the writer thread."""
+        if not self.asynchronous:
+            self._write([(formatter, args)])
+            return
+        if self._thread is None:
+            self._start()
+        self._queue.put((formatter, args))
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="orderlog-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = []
+            stop = item is _STOP
+            if not stop:
+                batch.append(item)
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+            if batch:
+                self._write(batch)
+            for _ in range(len(batch) + (1 if stop else 0)):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batch):
+        try:
+            lines = [formatter(*args, record_id=next_record_id()) for formatter, args in batch]
+            with log_lock(self.path), open(self.path, "a", encoding="utf-8") as log_file:
+                log_file.writelines(lines)
+            self.written += len(lines)
+            self.batches += 1
+        except Exception as log_err:
+            print(f"⚠️ Failed to write {len(batch)} record(s) to {self.path}: {log_err}")
+
+    def flush(self, timeout=5.0):
+        """Wait until every queued record has been written (or `timeout` seconds passed)."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.001)
+        return not self._queue.unfinished_tasks
+
+    def close(self, timeout=5.0):
+        """Write what is queued and stop the writer thread."""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        self._thread = None
+
+
+_writer = None
+
+
+def get_writer():
+    """Process-wide writer for ORDERLOG_FILE (MT5_COPIER_ORDERLOG=sync disables the thread)."""
+    global _writer
+    if _writer is None:
+        mode = os.environ.get("MT5_COPIER_ORDERLOG", "async").strip().lower()
+        _writer = OrderLogWriter(ORDERLOG_FILE, asynchronous=(mode != "sync"))
+    return _writer
+
+
+def close():
+    if _writer is not None:
+        _writer.close()
@@ -0,0 +1,704 @@
+"""
+Incremental, offset-indexed reader of orderlog.txt for the dashboard.
+
+OrderLogStore keeps the parsed log in memory as NumPy columns, one entry per
+non-blank line:
+
+    ids        int64    record ID (the "ID=" field, order_log.py); lines written
+                        before IDs existed get LEGACY_ID | byte offset
+    offsets    int64    byte offset of the line
+    lengths    int32    line length in bytes (without the newline)
+    ts         int64    timestamp as naive seconds since 1970-01-01, NO_TS if unparseable
+    latency    float32  LATENCY_MS, NaN if absent
+    kind       int8     KIND_OPEN / KIND_CLOSE / KIND_PARTIAL_CLOSE, -1 for other lines
+    symbol     int16    slave-side symbol, index into .symbols (-1 if absent)
+    filling    int16    FILLING mode, index into .fillings (-1 if absent)
+    master_lot float32  MASTER_LOT (OPEN), NaN otherwise
+    slave_lot  float32  SLAVE_LOT (OPEN) or VOLUME (CLOSE), NaN if absent
+    live       bool     False once the record's ID is in orderlog.txt.deleted
+
+refresh() parses only the bytes appended since the last call (whole lines;
+a line still being written is left for the next call). The file is parsed
+again from the start when it was replaced or rotated (different inode),
+truncated (smaller than what was parsed) or rewritten (its first bytes
+changed). Lines are parsed in bulk with NumPy: newline search, the fixed
+"YYYY-MM-DD HH:MM:SS" prefix, then the " | " fields located through the
+"|" positions (see parse_block for the two record layouts), without a
+Python call per line.
+
+A sparse timestamp index (min / max timestamp per block of INDEX_STRIDE rows)
+lets select() jump to the blocks that can hold a date range and scan only
+those; the raw text of a row is read from the file by offset only when it is
+displayed (rows()).
+
+delete() only appends the IDs to the tombstone file (order_log.append_tombstones)
+and clears their live flags. compact() rewrites the log without tombstoned
+records: the bulk copy runs without any lock (the copier only ever appends),
+then, under order_log.log_lock() and the store's own lock, it copies what
+was appended meanwhile, swaps the file in, drops the tombstones it applied
+and adopts the new layout directly instead of parsing the rewritten file
+again, so readers never see the new file with the old offsets. Legacy lines
+get an ID field stamped on the way (the LEGACY_ID value they already had),
+so IDs shown before a compaction stay valid after it.
+
+follow() tails the log for the dashboard's live events: each call refreshes
+and returns the live rows appended since the caller's cursor, reading only
+their bytes; a cursor taken before the last compaction is renumbered.
+
+Run `python bench_orderlog.py` for timings at 1M and 10M lines.
+"""
+
+import os
+import threading
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+import order_log
+
+NO_TS = np.iinfo(np.int64).min
+# Rows per block of the sparse timestamp index
+INDEX_STRIDE = 4096
+# Bytes parsed per step of a refresh (bounds the temporary arrays on a cold start)
+READ_CHUNK = 64 << 20
+# Bytes compared to tell an append from a rewrite of the same file
+HEAD_BYTES = 64
+
+_TS_LEN = 19  # "YYYY-MM-DD HH:MM:SS"
+_TS_DIGITS = np.array([0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18])
+_TS_SEPARATORS = {4: ord("-"), 7: ord("-"), 10: ord(" "), 13: ord(":"), 16: ord(":")}
+_ID_FIELD = np.frombuffer(b" | ID=", np.uint8)
+_ID_DIGITS = 16
+_ID_END = _TS_LEN + len(_ID_FIELD) + _ID_DIGITS
+_HEX = np.full(256, -1, np.int64)
+_HEX[np.frombuffer(b"0123456789", np.uint8)] = np.arange(10)
+_HEX[np.frombuffer(b"abcdef", np.uint8)] = np.arange(10, 16)
+_HEX[np.frombuffer(b"ABCDEF", np.uint8)] = np.arange(10, 16)
+_HEX_SHIFTS = np.arange(4 * (_ID_DIGITS - 1), -1, -4, dtype=np.int64)
+# IDs of lines without an ID field: this bit | byte offset (never collides with writer IDs)
+LEGACY_ID = 1 << 62
+_NUMBER_WIDTH = 16
+_NAME_WIDTH = 32  # bytes kept of a symbol / filling name
+_LOT_WIDTH = 8
+_EPOCH = date(1970, 1, 1)
+
+# kind column
+KIND_OPEN, KIND_CLOSE, KIND_PARTIAL_CLOSE = 0, 1, 2
+KINDS = ("OPEN", "CLOSE", "PARTIAL_CLOSE")
+_ROW_COLUMNS = ("ids", "offsets", "lengths", "ts", "latency", "kind", "symbol", "filling", "master_lot", "slave_lot")
+
+
+def day_seconds(day):
+    """Naive seconds since 1970-01-01 of midnight on `day` (same scale as the ts column)."""
+    return (day - _EPOCH).days * 86400
+
+
+class _Column:
+    """Growable NumPy array (amortized O(1) appends)."""
+
+    __slots__ = ("data", "size")
+
+    def __init__(self, dtype):
+        self.data = np.empty(1024, dtype)
+        self.size = 0
+
+    def extend(self, values):
+        end = self.size + len(values)
+        if end > len(self.data):
+            grown = np.empty(max(end, 2 * len(self.data)), self.data.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:end] = values
+        self.size = end
+
+    def view(self):
+        return self.data[:self.size]
+
+    def clear(self):
+        self.size = 0
+
+
+class LogRow:
+    """One displayed log line (what the Order Logs table renders)."""
+
+    __slots__ = ("id", "timestamp_str", "raw", "latency_ms")
+
+    def __init__(self, id, raw, latency_ms):
+        self.id = id
+        self.raw = raw
+        self.timestamp_str = raw.split("|", 1)[0].strip()
+        self.latency_ms = latency_ms
+
+    @property
+    def timestamp(self):
+        try:
+            return datetime.strptime(self.timestamp_str, "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            return None
+
+
+def _civil_days(year, month, day):
+    """Days since 1970-01-01 of the given dates (vectorized days-from-civil)."""
+    y = year - (month <= 2)
+    era = y // 400
+    yoe = y - era * 400
+    doy = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+
+_PAD = 64  # zero bytes after the data, so fixed-width windows never run past the end
+
+
+def _gather(windows, starts, width):
+    """(n, width) matrix of the bytes at starts[i] + 0..width-1 (`windows`: sliding windows of the padded data)."""
+    return windows[np.minimum(starts, len(windows) - 1), :width]
+
+
+def _as_float(text):
+    try:
+        return float(text)
+    except ValueError:
+        return np.nan
+
+
+def _numbers(text):
+    """Values of the zero-padded numbers in the rows of `text` (NaN where empty or not a number)."""
+    values = np.full(len(text), np.nan)
+    text = text.view(f"S{text.shape[1]}").ravel()
+    present = np.flatnonzero(text != b"")
+    try:
+        values[present] = text[present].astype(np.float64)
+    except ValueError:  # a malformed number somewhere in the block: convert one by one
+        values[present] = [_as_float(t) for t in text[present].tolist()]
+    return values
+
+
+def _codes(text):
+    """(codes, names): index into names of each zero-padded row of `text`; -1 for empty rows."""
+    codes = np.full(len(text), -1, np.int16)
+    present = np.flatnonzero(text[:, 0])
+    if not len(present):
+        return codes, []
+    text = text[present]
+    # Group on a 64-bit hash of the bytes, then confirm every row equals its group's first row
+    words = text.view(np.uint64)
+    key = words[:, 0].copy()
+    for i in range(1, words.shape[1]):
+        key = key * np.uint64(0x100000001B3) ^ words[:, i]
+    _, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+    if not (text == text[first[inverse]]).all():
+        _, first, inverse = np.unique(text.view(np.dtype((np.void, text.shape[1]))).ravel(), return_index=True,
+                                      return_inverse=True)
+    codes[present] = inverse
+    return codes, [bytes(row).rstrip(b"\0").decode("utf-8", "replace") for row in text[first]]
+
+
+class _Fields:
+    """The " | "-separated fields of every line of a block, located through the "|" positions."""
+
+    def __init__(self, buf, windows, starts, ends, skip):
+        self.windows = windows
+        self.ends = ends
+        self.seps = np.flatnonzero(buf == ord("|"))
+        self.first = np.searchsorted(self.seps, starts) + skip  # separator before field 0 (after ts [| ID])
+        self.count = np.searchsorted(self.seps, ends) - self.first  # fields after the skipped ones
+        self._spans = {}
+
+    def span(self, j):
+        """(start, length) of field j (an int or one per line); garbage where a line has fewer fields."""
+        if isinstance(j, int):
+            if j not in self._spans:
+                self._spans[j] = self._span(j)
+            return self._spans[j]
+        return self._span(j)
+
+    def _span(self, j):
+        last = max(len(self.seps) - 1, 0)
+        seps = self.seps if len(self.seps) else np.zeros(1, np.int64)
+        idx = np.minimum(self.first + j, last)
+        begin = np.minimum(seps[idx] + 2, self.ends)
+        end = np.where(j + 1 < self.count, seps[np.minimum(idx + 1, last)] - 1, self.ends)
+        return begin, end - begin
+
+    def value(self, j, prefix, width, at=None):
+        """(rows whose field j starts with `prefix`, (n, width) zero-padded bytes after the prefix)."""
+        begin, size = self.span(j) if at is None else at
+        size = size - len(prefix)
+        text = _gather(self.windows, begin, len(prefix) + width)
+        matched = size > 0
+        if j is not None:
+            matched &= (j >= 0) & (j < self.count)
+        if prefix:
+            matched &= text[:, :len(prefix)].copy().view(f"S{len(prefix)}").ravel() == prefix
+        value = text[:, len(prefix):]
+        value *= np.arange(width) < np.where(matched, size, 0)[:, None]
+        return matched, value
+
+
+def parse_block(data, base_offset=0):
+    """Columns of the complete lines in `data` (bytes ending with a newline), keyed like OrderLogStore's.
+
+    "symbol" and "filling" are codes into the block's own name lists ("symbols", "fillings").
+
+    OPEN:  ts [| ID] | MASTER_TICKET | SLAVE_TICKET | master->slave | MASTER_LOT | SLAVE_LOT | TYPE | PRICE
+           | SL | TP | FILLING | LATENCY_MS
+    CLOSE: ts [| ID] | CLOSE (or PARTIAL_CLOSE) | MASTER_TICKET | SLAVE_TICKET | SYMBOL | VOLUME | TYPE
+           | FILLING | LATENCY_MS
+    """
+    buf = np.frombuffer(data + bytes(_PAD), np.uint8)
+    windows = np.lib.stride_tricks.sliding_window_view(buf, _PAD)
+    ends = np.flatnonzero(buf == 10)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    ends = ends - (buf[np.maximum(ends - 1, 0)] == 13) * (ends > starts)  # strip \r
+    keep = ends > starts
+    starts, ends = starts[keep], ends[keep]
+    lengths = ends - starts
+    n = len(starts)
+
+    ts = np.full(n, NO_TS, np.int64)
+    head = _gather(windows, starts, _ID_END)
+    ok = lengths >= _TS_LEN
+    for col, char in _TS_SEPARATORS.items():
+        ok &= head[:, col] == char
+    digits = head[:, _TS_DIGITS]
+    ok &= ((digits >= 48) & (digits <= 57)).all(axis=1)
+    if ok.any():
+        d = digits[ok].astype(np.int64) - 48
+        year = d[:, 0] * 1000 + d[:, 1] * 100 + d[:, 2] * 10 + d[:, 3]
+        month = d[:, 4] * 10 + d[:, 5]
+        day = d[:, 6] * 10 + d[:, 7]
+        seconds = (d[:, 8] * 10 + d[:, 9]) * 3600 + (d[:, 10] * 10 + d[:, 11]) * 60 + d[:, 12] * 10 + d[:, 13]
+        ts[ok] = _civil_days(year, month, day) * 86400 + seconds
+
+    offsets = starts.astype(np.int64) + base_offset
+    ids = offsets | LEGACY_ID
+    hex_digits = _HEX[head[:, _ID_END - _ID_DIGITS:]]
+    id_field = head[:, _TS_LEN:_ID_END - _ID_DIGITS].copy().view(f"S{len(_ID_FIELD)}").ravel()
+    has_id = ok & (lengths >= _ID_END) & (id_field == _ID_FIELD.tobytes()) & (hex_digits >= 0).all(axis=1)
+    ids[has_id] = (hex_digits[has_id] << _HEX_SHIFTS).sum(axis=1)
+
+    fields = _Fields(buf[:len(data)], windows, starts, ends, has_id)
+    # LATENCY_MS is the last field
+    _, text = fields.value(fields.count - 1, b"LATENCY_MS=", _NUMBER_WIDTH)
+    latency = _numbers(text).astype(np.float32)
+
+    # Trade fields: kind, symbol (the slave side), filling, lots
+    kind = np.full(n, -1, np.int8)
+    _, text = fields.value(0, b"", 16)
+    first_field = text.view("S16").ravel()
+    is_open = ok & (fields.count == 11) & (text[:, :14].copy().view("S14").ravel() == b"MASTER_TICKET=")
+    is_close = ok & (fields.count == 8) & (first_field == b"CLOSE")
+    is_partial = ok & (fields.count == 8) & (first_field == b"PARTIAL_CLOSE")
+    kind[is_open], kind[is_close], kind[is_partial] = KIND_OPEN, KIND_CLOSE, KIND_PARTIAL_CLOSE
+    is_close |= is_partial
+
+    symbol_text = np.zeros((n, _NAME_WIDTH), np.uint8)
+    pair_at, pair_size = fields.span(2)
+    _, pair = fields.value(2, b"", _PAD)
+    arrow = (pair[:, :-1] == ord("-")) & (pair[:, 1:] == ord(">"))
+    has_arrow = is_open & arrow.any(axis=1)
+    skip = arrow.argmax(axis=1) + 2
+    _, text = fields.value(None, b"", _NAME_WIDTH, at=(pair_at + skip, pair_size - skip))
+    symbol_text[has_arrow] = text[has_arrow]
+    named, text = fields.value(3, b"SYMBOL=", _NAME_WIDTH)
+    symbol_text[is_close & named] = text[is_close & named]
+    symbol, symbols = _codes(symbol_text)
+
+    filled, text = fields.value(fields.count - 2, b"FILLING=", _NAME_WIDTH)
+    filling, fillings = _codes(text * (filled & (is_open | is_close))[:, None])
+
+    master_lot = np.full(n, np.nan, np.float32)
+    slave_lot = np.full(n, np.nan, np.float32)
+    for j, prefix, column, rows in ((3, b"MASTER_LOT=", master_lot, is_open), (4, b"SLAVE_LOT=", slave_lot, is_open),
+                                    (4, b"VOLUME=", slave_lot, is_close)):
+        matched, text = fields.value(j, prefix, _LOT_WIDTH)
+        rows = np.flatnonzero(rows & matched)
+        column[rows] = _numbers(text[rows])
+
+    return {"ids": ids, "offsets": offsets, "lengths": lengths.astype(np.int32), "ts": ts, "latency": latency,
+            "kind": kind, "symbol": symbol, "filling": filling, "master_lot": master_lot, "slave_lot": slave_lot,
+            "symbols": symbols, "fillings": fillings}
+
+
+class OrderLogStore:
+    def __init__(self, path):
+        self.path = path
+        self.ids = _Column(np.int64)
+        self.offsets = _Column(np.int64)
+        self.lengths = _Column(np.int32)
+        self.ts = _Column(np.int64)
+        self.latency = _Column(np.float32)
+        self.kind = _Column(np.int8)
+        self.symbol = _Column(np.int16)  # index into self.symbols, -1 if absent
+        self.filling = _Column(np.int16)  # index into self.fillings, -1 if absent
+        self.master_lot = _Column(np.float32)
+        self.slave_lot = _Column(np.float32)
+        self.live = _Column(np.bool_)
+        self.symbols = []
+        self.fillings = []
+        self._names = {"symbol": ({}, self.symbols), "filling": ({}, self.fillings)}
+        # Sparse indexes: min / max timestamp and ID per block of INDEX_STRIDE rows
+        self._block_min = _Column(np.int64)
+        self._block_max = _Column(np.int64)
+        self._id_min = _Column(np.int64)
+        self._id_max = _Column(np.int64)
+        self.parsed_bytes = 0  # file offset up to which lines have been parsed
+        self.reloads = 0
+        self.compactions = 0
+        self._file_id = None
+        self._head = b""
+        self._mtime_ns = None
+        self._tombstones = set()
+        self._tombstone_bytes = 0
+        self._renumbered = None  # (compactions, row numbers dropped by that compaction) for follow()
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+
+    def __len__(self):
+        return self.offsets.size
+
+    def _row_columns(self):
+        """Per-row columns filled from parse_block(), by name."""
+        return {name: getattr(self, name) for name in _ROW_COLUMNS}
+
+    def _columns(self):
+        return (*self._row_columns().values(), self.live, self._block_min, self._block_max, self._id_min, self._id_max)
+
+    def _global_codes(self, column, local_codes, local_names):
+        """Codes of a parsed block mapped to this store's name list (names are only ever appended)."""
+        index, names = self._names[column]
+        lookup = np.empty(len(local_names) + 1, np.int16)
+        lookup[-1] = -1
+        for i, name in enumerate(local_names):
+            if name not in index:
+                index[name] = len(names)
+                names.append(name)
+            lookup[i] = index[name]
+        return lookup[local_codes]
+
+    def _reset(self):
+        for column in self._columns():
+            column.clear()
+        self.parsed_bytes = 0
+        self._head = b""
+        self.reloads += 1
+
+    def refresh(self):
+        """Parse what was appended since the last refresh. Returns the number of new rows."""
+        with self._lock:
+            self._refresh_tombstones()
+            try:
+                st = os.stat(self.path)
+            except OSError:
+                if self.parsed_bytes or len(self):
+                    self._reset()
+                self._file_id = None
+                return 0
+            file_id = (st.st_dev, st.st_ino)
+            if file_id != self._file_id or st.st_size < self.parsed_bytes:
+                self._reset()
+            elif st.st_size == self.parsed_bytes and st.st_mtime_ns == self._mtime_ns:
+                return 0
+            self._file_id = file_id
+            self._mtime_ns = st.st_mtime_ns
+            before = len(self)
+            with open(self.path, "rb") as f:
+                head = f.read(HEAD_BYTES)
+                if self.parsed_bytes and head[:len(self._head)] != self._head:
+                    self._reset()  # rewritten in place
+                self._head = head
+                f.seek(self.parsed_bytes)
+                pending = b""
+                while True:
+                    chunk = f.read(READ_CHUNK)
+                    if not chunk:
+                        break
+                    data = pending + chunk
+                    cut = data.rfind(b"\n") + 1
+                    if cut:
+                        self._append(parse_block(data[:cut], self.parsed_bytes))
+                        self.parsed_bytes += cut
+                    pending = data[cut:]
+            return len(self) - before
+
+    def _refresh_tombstones(self):
+        try:
+            size = os.path.getsize(order_log.tombstone_path(self.path))
+        except OSError:
+            size = 0
+        if size == self._tombstone_bytes:
+            return
+        if size < self._tombstone_bytes:  # rewritten (compaction elsewhere, cleared): start over
+            self._tombstones = set()
+            self._tombstone_bytes = 0
+            self.live.view()[:] = True
+        new, self._tombstone_bytes = order_log.read_tombstones(self.path, self._tombstone_bytes)
+        new = [record_id for record_id in new if record_id not in self._tombstones]
+        if new:
+            self._tombstones.update(new)
+            self._mark_deleted(np.unique(np.asarray(new, np.int64)))
+
+    def _mark_deleted(self, record_ids):
+        """Clear the live flag of rows with these (sorted) IDs, scanning only blocks whose ID range holds one."""
+        lo = np.searchsorted(record_ids, self._id_min.view(), "left")
+        hi = np.searchsorted(record_ids, self._id_max.view(), "right")
+        ids, live = self.ids.view(), self.live.view()
+        for block in np.flatnonzero(hi > lo):
+            rows = slice(block * INDEX_STRIDE, (block + 1) * INDEX_STRIDE)
+            live[rows] &= ~np.isin(ids[rows], record_ids[lo[block]:hi[block]])
+
+    def _append(self, columns):
+        first = len(self)
+        columns["symbol"] = self._global_codes("symbol", columns["symbol"], columns["symbols"])
+        columns["filling"] = self._global_codes("filling", columns["filling"], columns["fillings"])
+        for name, column in self._row_columns().items():
+            column.extend(columns[name])
+        ids = columns["ids"]
+        if self._tombstones:
+            self.live.extend(~np.isin(ids, np.fromiter(self._tombstones, np.int64, len(self._tombstones))))
+        else:
+            self.live.extend(np.ones(len(ids), np.bool_))
+        self._index_from(first)
+
+    def _index_from(self, first):
+        """Rebuild the index blocks from row `first` on (the block holding it may have been partial)."""
+        block = first // INDEX_STRIDE
+        starts = np.arange(0, len(self) - block * INDEX_STRIDE, INDEX_STRIDE)
+        for column, low, high in ((self.ts, self._block_min, self._block_max), (self.ids, self._id_min, self._id_max)):
+            low.size = high.size = block
+            if not len(starts):
+                continue
+            values = column.view()[block * INDEX_STRIDE:]
+            if column is self.ts:
+                known = np.where(values != NO_TS, values, np.iinfo(np.int64).max)
+                low.extend(np.minimum.reduceat(known, starts))
+            else:
+                low.extend(np.minimum.reduceat(values, starts))
+            high.extend(np.maximum.reduceat(values, starts))
+
+    def select(self, start=None, end=None):
+        """Live row numbers (file order) with a timestamp in [start, end) naive seconds; all if both are None."""
+        with self._lock:
+            live = self.live.view()
+            if start is None and end is None:
+                return np.flatnonzero(live)
+            lo = NO_TS + 1 if start is None else start
+            hi = np.iinfo(np.int64).max if end is None else end
+            blocks = np.flatnonzero((self._block_max.view() >= lo) & (self._block_min.view() < hi))
+            if not len(blocks):
+                return np.empty(0, np.int64)
+            ts = self.ts.view()
+            # Contiguous runs of candidate blocks → one slice each
+            breaks = np.flatnonzero(np.diff(blocks) != 1) + 1
+            found = []
+            for run in np.split(blocks, breaks):
+                first, last = run[0] * INDEX_STRIDE, min((run[-1] + 1) * INDEX_STRIDE, len(ts))
+                window = ts[first:last]
+                found.append(np.flatnonzero((window >= lo) & (window < hi) & live[first:last]) + first)
+            return np.concatenate(found)
+
+    def newest(self, start=None, end=None, limit=None):
+        """(LogRows of the newest `limit` live rows in [start, end), number of rows matching).
+
+        Selected and read under one hold of the lock: row numbers from select()
+        are only valid until the next compact().
+        """
+        with self._lock:
+            selected = self.select(start, end)
+            return self.rows(selected if limit is None else selected[-limit:]), len(selected)
+
+    def version(self):
+        """Changes whenever the parsed rows or their live flags do (appends, deletes, reloads, compactions)."""
+        with self._lock:
+            return self.reloads, self.compactions, self.parsed_bytes, self._tombstone_bytes
+
+    def take(self, start=None, end=None, *names):
+        """(version(), copies of the named columns at the live rows in [start, end)), all from one state."""
+        with self._lock:
+            rows = self.select(start, end)
+            return self.version(), tuple(getattr(self, name).view()[rows] for name in names)
+
+    def follow(self, cursor=None, limit=None):
+        """Tail the log: (cursor, LogRows of the live rows appended since `cursor`, reset).
+
+        Pass back the returned cursor on the next call. Only the appended bytes are
+        parsed and read, and the cursor survives one compaction in between. reset is
+        True when the log was reloaded (replaced, cleared) since `cursor`; the rows are
+        then empty. `limit` keeps the newest rows.
+        """
+        with self._lock:
+            self.refresh()
+            count = len(self)
+            now = (self.reloads, self.compactions, count)
+            if cursor is None:
+                return now, [], False
+            reloads, compactions, first = cursor
+            if compactions != self.compactions:
+                renumbered = self._renumbered
+                if renumbered is None or renumbered[0] != self.compactions or compactions != self.compactions - 1:
+                    reloads = -1
+                else:  # rows before the cursor moved up by the records dropped before it
+                    first -= int(np.searchsorted(renumbered[1], first))
+            if reloads != self.reloads:
+                return now, [], True
+            appended = np.flatnonzero(self.live.view()[first:count]) + first
+            if limit is not None:
+                appended = appended[-limit:]
+            return now, self.rows(appended), False
+
+    def deleted_count(self):
+        with self._lock:
+            return len(self) - int(np.count_nonzero(self.live.view()))
+
+    def rows(self, numbers):
+        """LogRow of each row number, with the raw text read from the file by offset."""
+        with self._lock:  # held while reading: compact() must not swap the file under these offsets
+            numbers = np.asarray(numbers, np.int64)
+            if not len(numbers):
+                return []
+            ids = self.ids.view()[numbers]
+            offsets = self.offsets.view()[numbers]
+            lengths = self.lengths.view()[numbers]
+            latency = self.latency.view()[numbers]
+            with open(self.path, "rb") as f:
+                span_start, span_end = int(offsets.min()), int((offsets + lengths).max())
+                if span_end - span_start <= READ_CHUNK:
+                    f.seek(span_start)
+                    span = f.read(span_end - span_start)
+                    texts = [span[o - span_start:o - span_start + n]
+                             for o, n in zip(offsets.tolist(), lengths.tolist())]
+                else:
+                    texts = []
+                    for o, n in zip(offsets.tolist(), lengths.tolist()):
+                        f.seek(o)
+                        texts.append(f.read(n))
+        return [LogRow(record_id, text.decode("utf-8", "replace").strip(), None if ms != ms else ms)
+                for record_id, text, ms in zip(ids.tolist(), texts, latency.tolist())]
+
+    def delete(self, record_ids):
+        """Tombstone these record IDs: O(len(record_ids)) file I/O, the log is rewritten later by compact()."""
+        record_ids = [int(record_id) for record_id in record_ids]
+        order_log.append_tombstones(self.path, record_ids)  # takes the writer's lock: not under self._lock
+        with self._lock:
+            self._refresh_tombstones()
+        return len(record_ids)
+
+    def compact(self):
+        """Rewrite the log without tombstoned records. Returns the number of records dropped."""
+        with self._compact_lock:
+            with self._lock:
+                self.refresh()
+                live = self.live.view().copy()
+                if live.all():
+                    return 0
+                count = len(live)
+                ids, offsets, lengths, ts = (c.view().copy() for c in (self.ids, self.offsets, self.lengths, self.ts))
+                parsed, tombstone_bytes, file_id = self.parsed_bytes, self._tombstone_bytes, self._file_id
+
+            keep = np.flatnonzero(live)
+            kept_ids, kept_offsets, kept_lengths = ids[keep], offsets[keep], lengths[keep].astype(np.int64)
+            stamp = ((kept_ids & LEGACY_ID) != 0) & (ts[keep] != NO_TS)
+            new_lengths = kept_lengths + stamp * (_ID_END - _TS_LEN)
+            new_offsets = np.zeros(len(keep), np.int64)
+            np.cumsum(new_lengths[:-1] + 1, out=new_offsets[1:])
+            bulk_bytes = int(new_offsets[-1] + new_lengths[-1] + 1) if len(keep) else 0
+            # Runs of kept, unstamped rows separated by exactly one "\n" are copied as one byte range
+            joined = np.zeros(len(keep), np.bool_)
+            joined[1:] = ((keep[1:] == keep[:-1] + 1) & ~stamp[1:] & ~stamp[:-1]
+                          & (kept_offsets[1:] == kept_offsets[:-1] + kept_lengths[:-1] + 1))
+            run_starts = np.flatnonzero(~joined).tolist()
+            run_ends = run_starts[1:] + [len(keep)]
+
+            tmp = f"{self.path}.{os.getpid()}.compact.tmp"
+            try:
+                with open(self.path, "rb") as src, open(tmp, "wb") as out:
+                    for a, b in zip(run_starts, run_ends):
+                        begin = int(kept_offsets[a])
+                        end = int(kept_offsets[b - 1] + kept_lengths[b - 1])
+                        src.seek(begin)
+                        if stamp[a]:
+                            line = src.read(end - begin)
+                            out.write(line[:_TS_LEN] + b" | ID=%016x" % int(kept_ids[a]) + line[_TS_LEN:] + b"\n")
+                            continue
+                        while begin < end:
+                            chunk = src.read(min(READ_CHUNK, end - begin))
+                            out.write(chunk)
+                            begin += len(chunk)
+                        out.write(b"\n")
+
+                    # Swap and adopt as one step under self._lock too: rows() / refresh() must never see
+                    # the new file with the old offsets (or parse it before _adopt renumbers the rows)
+                    with order_log.log_lock(self.path), self._lock:
+                        st = os.fstat(src.fileno())
+                        if ((st.st_dev, st.st_ino) != file_id or os.path.getsize(self.path) < parsed
+                                or self._file_id != file_id or len(self) < count):
+                            return 0  # replaced, cleared or reloaded meanwhile
+                        src.seek(parsed)  # lines appended since the snapshot, as they are
+                        while True:
+                            chunk = src.read(READ_CHUNK)
+                            if not chunk:
+                                break
+                            out.write(chunk)
+                        out.close()
+                        src.close()
+                        order_log.replace_file(tmp, self.path)
+                        # Tombstones written during the copy name records that are still in the file
+                        later, _ = order_log.read_tombstones(self.path, tombstone_bytes)
+                        tombstones = "".join(f"{record_id:016x}\n" for record_id in later).encode()
+                        tombstone_file = order_log.tombstone_path(self.path)
+                        with open(tombstone_file + ".tmp", "wb") as f:
+                            f.write(tombstones)
+                        order_log.replace_file(tombstone_file + ".tmp", tombstone_file)
+                        self._adopt(keep, stamp, count, new_offsets, new_lengths, bulk_bytes, later, len(tombstones))
+            finally:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+            return len(live) - len(keep)
+
+    def _adopt(self, keep, stamped, count, offsets, lengths, parsed_bytes, tombstones, tombstone_bytes):
+        """Switch the columns to the compacted file (rows parsed after the snapshot are parsed again from it)."""
+        kept = {name: column.view()[:count][keep] for name, column in self._row_columns().items()}
+        kept["live"] = self.live.view()[:count][keep]
+        dropped = np.ones(count, np.bool_)
+        dropped[keep] = False
+        kept["offsets"], kept["lengths"] = offsets, lengths
+        ids = kept["ids"]
+        unstamped = ((ids & LEGACY_ID) != 0) & ~stamped
+        ids[unstamped] = offsets[unstamped] | LEGACY_ID  # lines without a timestamp keep offset IDs
+        for column in self._columns():
+            column.clear()
+        for name, column in self._row_columns().items():
+            column.extend(kept[name])
+        self.live.extend(kept["live"])
+        self._index_from(0)
+        st = os.stat(self.path)
+        with open(self.path, "rb") as f:
+            self._head = f.read(HEAD_BYTES)
+        self._file_id = (st.st_dev, st.st_ino)
+        self._mtime_ns = None
+        self.parsed_bytes = parsed_bytes
+        self._tombstones = set(tombstones)
+        self._tombstone_bytes = tombstone_bytes
+        self.compactions += 1
+        self._renumbered = (self.compactions, np.flatnonzero(dropped))
+
+
+def date_bounds(filter_type, start_date_str=None, end_date_str=None, today=None):
+    """(start, end) naive-seconds bounds of a dashboard date filter; (None, None) = all rows."""
+    if filter_type == "today":
+        today = today or date.today()
+        return day_seconds(today), day_seconds(today + timedelta(days=1))
+    if filter_type == "custom":
+        try:
+            start = datetime.strptime(start_date_str, "%Y-%m-%d").date() if start_date_str else None
+            end = datetime.strptime(end_date_str, "%Y-%m-%d").date() if end_date_str else None
+        except ValueError:
+            return None, None
+        return (
+            day_seconds(start) if start else None,
+            day_seconds(end + timedelta(days=1)) if end else None,
+        )
+    return None, None
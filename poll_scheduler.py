@@ -0,0 +1,178 @@
+"""
+Poll schedulers for the copier and master feed loops.
+
+A loop calls `scheduler.wait()` at the end of every pass and
+`scheduler.mark_activity()` whenever the pass found something to do.
+
+- FixedPollScheduler: sleeps the same interval every pass (the old behaviour).
+- AdaptivePollScheduler: polls every `min_interval` for `burst_duration`
+  seconds after activity, then backs off geometrically to `max_interval` while
+  idle. Inside configured trading sessions the idle interval is capped at
+  `session_interval`.
+
+Both keep stats: effective poll rate and a detection-delay bound (a change is
+seen at most one poll gap after it happened).
+
+Environment (read by scheduler_from_env):
+    MT5_COPIER_POLL_MODE         adaptive (default) | fixed
+    MT5_COPIER_SESSIONS          e.g. "07:00-10:00,13:00-16:30" (local time)
+    MT5_COPIER_SESSION_INTERVAL  idle interval cap inside sessions, seconds (default 0.05)
+"""
+
+import os
+import time
+from collections import deque
+from datetime import datetime
+
+
+def parse_sessions(text):
+    """Parse "HH:MM-HH:MM,..." into [(start_minute, end_minute), ...]. Windows may wrap midnight."""
+    sessions = []
+    for part in (text or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, end = part.split("-")
+        sh, sm = (int(x) for x in start.strip().split(":"))
+        eh, em = (int(x) for x in end.strip().split(":"))
+        sessions.append((sh * 60 + sm, eh * 60 + em))
+    return sessions
+
+
+def in_session(sessions, now=None):
+    now = now or datetime.now()
+    minute = now.hour * 60 + now.minute
+    for start, end in sessions:
+        if start <= end:
+            if start <= minute < end:
+                return True
+        elif minute >= start or minute < end:
+            return True
+    return False
+
+
+def _percentile(ordered, q):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(round((len(ordered) - 1) * q / 100.0)))]
+
+
+class PollStats:
+    """Rolling poll-rate and detection-delay figures."""
+
+    def __init__(self, window=1000):
+        self.polls = 0
+        self.activity = 0
+        self.interval = 0.0
+        self._wakes = deque(maxlen=window)
+        self._detect = deque(maxlen=window)
+
+    def record_wake(self, now, interval):
+        self.polls += 1
+        self.interval = interval
+        self._wakes.append(now)
+
+    def record_activity(self):
+        self.activity += 1
+        if len(self._wakes) >= 2:
+            # The change happened between the previous poll and this one
+            self._detect.append(self._wakes[-1] - self._wakes[-2])
+
+    def rate_hz(self):
+        if len(self._wakes) < 2:
+            return 0.0
+        span = self._wakes[-1] - self._wakes[0]
+        return (len(self._wakes) - 1) / span if span > 0 else 0.0
+
+    def snapshot(self):
+        ordered = sorted(self._detect)
+
+        def ms(value):
+            return None if value is None else round(value * 1000.0, 2)
+
+        return {
+            "polls": self.polls,
+            "activity": self.activity,
+            "interval_ms": round(self.interval * 1000.0, 2),
+            "rate_hz": round(self.rate_hz(), 2),
+            "detect_bound_p50_ms": ms(_percentile(ordered, 50)),
+            "detect_bound_p95_ms": ms(_percentile(ordered, 95)),
+            "detect_bound_max_ms": ms(ordered[-1] if ordered else None),
+        }
+
+
+class FixedPollScheduler:
+    def __init__(self, interval, clock=time.monotonic, sleep=time.sleep):
+        self.interval = interval
+        self.stats = PollStats()
+        self._clock = clock
+        self._sleep = sleep
+        self._last_report = clock()
+
+    def next_interval(self):
+        return self.interval
+
+    def wait(self):
+        interval = self.next_interval()
+        if interval > 0:
+            self._sleep(interval)
+        self.stats.record_wake(self._clock(), interval)
+
+    def mark_activity(self):
+        self.stats.record_activity()
+
+    def summary(self):
+        s = self.stats.snapshot()
+        return (
+            f"📊 Poll {s['rate_hz']:.1f} Hz (interval {s['interval_ms']:.0f} ms), "
+            f"{s['activity']} active passes, detection delay ≤ "
+            f"p50 {s['detect_bound_p50_ms'] or 0:.0f} ms / p95 {s['detect_bound_p95_ms'] or 0:.0f} ms"
+        )
+
+    def report_due(self, every=300.0):
+        """True once every `every` seconds; loops use it to print summary() now and then."""
+        now = self._clock()
+        if now - self._last_report >= every:
+            self._last_report = now
+            return True
+        return False
+
+
+class AdaptivePollScheduler(FixedPollScheduler):
+    def __init__(self, min_interval=0.005, max_interval=0.3, burst_duration=2.0, backoff=1.5,
+                 sessions=(), session_interval=0.05, clock=time.monotonic, sleep=time.sleep):
+        super().__init__(max_interval, clock=clock, sleep=sleep)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.burst_duration = burst_duration
+        self.backoff = backoff
+        self.sessions = list(sessions)
+        self.session_interval = session_interval
+        self._idle_interval = max_interval
+        self._last_activity = None
+
+    def next_interval(self):
+        now = self._clock()
+        if self._last_activity is not None and now - self._last_activity < self.burst_duration:
+            self._idle_interval = self.min_interval
+            return self.min_interval
+        self._idle_interval = min(self._idle_interval * self.backoff, self.max_interval)
+        if self.sessions and in_session(self.sessions):
+            return min(self._idle_interval, self.session_interval)
+        return self._idle_interval
+
+    def mark_activity(self):
+        self._last_activity = self._clock()
+        super().mark_activity()
+
+
+def scheduler_from_env(min_interval, max_interval):
+    """Build the scheduler for a loop whose fastest/slowest poll intervals are given (seconds)."""
+    if os.environ.get("MT5_COPIER_POLL_MODE", "adaptive").strip().lower() == "fixed":
+        return FixedPollScheduler(max_interval)
+    return AdaptivePollScheduler(
+        min_interval=min_interval,
+        max_interval=max_interval,
+        sessions=parse_sessions(os.environ.get("MT5_COPIER_SESSIONS", "")),
+        session_interval=float(os.environ.get("MT5_COPIER_SESSION_INTERVAL", "0.05")),
+    )
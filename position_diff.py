@@ -0,0 +1,83 @@
+"""
+Incremental position-diff engine for master snapshots.
+
+Keeps the previous master snapshot keyed by ticket and turns each new
+positions_get() result into typed events in a single pass:
+
+    open           ticket appeared
+    modify         SL or TP changed
+    partial_close  volume went down (position still open)
+    close          ticket disappeared
+
+The copier loops act only on these events instead of rebuilding ticket sets
+and rescanning every master position on each pass.
+"""
+
+from collections import namedtuple
+
+OPEN = "open"
+MODIFY = "modify"
+PARTIAL_CLOSE = "partial_close"
+CLOSE = "close"
+
+# position: current master position (None for close)
+# previous: master position from the last snapshot (None for open)
+PositionEvent = namedtuple("PositionEvent", ["kind", "ticket", "position", "previous"])
+
+
+class PositionDiffEngine:
+    def __init__(self, positions=()):
+        self._snapshot = {}
+        self._previous = {}
+        self.seed(positions)
+
+    def seed(self, positions):
+        """Take `positions` as the baseline without emitting events (e.g. trades open at startup)."""
+        self._snapshot = {p.ticket: p for p in positions or ()}
+
+    def diff(self, positions):
+        """Compare `positions` against the last snapshot, store it, and return the events."""
+        previous = self._snapshot
+        current = {}
+        events = []
+        matched = 0
+        for pos in positions or ():
+            ticket = pos.ticket
+            current[ticket] = pos
+            old = previous.get(ticket)
+            if old is None:
+                events.append(PositionEvent(OPEN, ticket, pos, None))
+                continue
+            matched += 1
+            if pos.volume < old.volume:
+                events.append(PositionEvent(PARTIAL_CLOSE, ticket, pos, old))
+            if pos.sl != old.sl or pos.tp != old.tp:
+                events.append(PositionEvent(MODIFY, ticket, pos, old))
+        # Every previous ticket was seen again -> nothing closed, skip the scan.
+        if matched < len(previous):
+            for ticket, old in previous.items():
+                if ticket not in current:
+                    events.append(PositionEvent(CLOSE, ticket, None, old))
+        self._previous = previous
+        self._snapshot = current
+        return events
+
+    def undo(self):
+        """Restore the snapshot from before the last diff, so its events are reported again."""
+        self._snapshot = self._previous
+
+    def forget(self, ticket):
+        """Drop `ticket` from the snapshot so the next diff reports it as opened again (retry)."""
+        self._snapshot.pop(ticket, None)
+
+    def restore(self, ticket, **fields):
+        """Put `fields` of `ticket` back to earlier values so the next diff reports the change again (retry)."""
+        pos = self._snapshot.get(ticket)
+        if pos is not None:
+            self._snapshot[ticket] = pos._replace(**fields)
+
+    def __len__(self):
+        return len(self._snapshot)
+
+    def __contains__(self, ticket):
+        return ticket in self._snapshot
@@ -0,0 +1,238 @@
+"""
+Per-stage timers for the copier and master feed hot paths.
+
+A loop marks where each stage starts and ends with time.perf_counter_ns() and
+hands the duration to a StageMetrics; every stage keeps an HDR-style latency
+histogram (log-linear buckets, ~3% relative error, fixed memory), so p50 /
+p90 / p99 / max are available at any time without keeping the samples.
+
+    started = time.perf_counter_ns()
+    positions = mt5.positions_get()
+    started = stage_metrics.since("poll", started)   # records, returns "now"
+    ...
+    with stage_metrics.timed("order_send"):
+        result = mt5.order_send(request)
+
+Recording is a couple of integer operations under a lock (well under a
+microsecond); summaries are computed only when read.
+
+Exported as Prometheus text (summary per stage) or JSON by serve_metrics();
+dashboard.py reads the JSON. The copier serves its metrics when
+MT5_COPIER_METRICS_PORT is set; master_feed.py adds /metrics and
+/metrics.json to its own HTTP server.
+
+Environment:
+    MT5_COPIER_METRICS_PORT   copier metrics endpoint on 127.0.0.1 (default 0 = off)
+"""
+
+import json
+import os
+import threading
+import time
+
+# Linear sub-buckets per power of two: 2**SUB_BITS (32 → worst-case error 1/16 of the value)
+SUB_BITS = 5
+_SUB_COUNT = 1 << SUB_BITS
+_HALF = _SUB_COUNT >> 1
+# Largest tracked value: 2**MAX_BITS ns (~18 min); longer samples land in the last bucket
+MAX_BITS = 40
+_BUCKETS = (MAX_BITS - SUB_BITS + 1) * _HALF + _HALF
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def _bucket(value):
+    if value < _SUB_COUNT:
+        return value if value > 0 else 0
+    shift = value.bit_length() - SUB_BITS
+    return min(shift * _HALF + (value >> shift), _BUCKETS - 1)
+
+
+def _bucket_upper(index):
+    """Highest value that falls into bucket `index`."""
+    if index < _SUB_COUNT:
+        return index
+    shift = index // _HALF - 1
+    return ((index - shift * _HALF + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """Log-linear histogram of durations in nanoseconds."""
+
+    __slots__ = ("counts", "count", "total", "max", "_lock")
+
+    def __init__(self):
+        self.counts = [0] * _BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self._lock = threading.Lock()
+
+    def record(self, value_ns):
+        index = _bucket(value_ns)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value_ns
+            if value_ns > self.max:
+                self.max = value_ns
+
+    def quantiles(self, quantiles=QUANTILES):
+        """{q: value_ns} (upper edge of the bucket holding the q-th sample, capped at max)."""
+        with self._lock:
+            counts, count, largest = list(self.counts), self.count, self.max
+        result = {}
+        if not count:
+            return {q: None for q in quantiles}
+        targets = sorted((max(1, int(q * count + 0.5)), q) for q in quantiles)
+        seen, pending = 0, iter(targets)
+        rank, q = next(pending)
+        for index, n in enumerate(counts):
+            if not n:
+                continue
+            seen += n
+            while seen >= rank:
+                result[q] = min(_bucket_upper(index), largest)
+                try:
+                    rank, q = next(pending)
+                except StopIteration:
+                    return result
+        for _, q in targets:
+            result.setdefault(q, largest)
+        return result
+
+
+class _Timed:
+    __slots__ = ("metrics", "stage", "started")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.record(self.stage, time.perf_counter_ns() - self.started)
+        return False
+
+
+class StageMetrics:
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self.started_at = time.time()
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def _histogram(self, stage):
+        histogram = self._stages.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._stages.setdefault(stage, LatencyHistogram())
+        return histogram
+
+    def record(self, stage, elapsed_ns):
+        self._histogram(stage).record(elapsed_ns)
+
+    def since(self, stage, started_ns):
+        """Record `stage` as lasting from `started_ns` until now; returns now (the next stage's start)."""
+        now = time.perf_counter_ns()
+        self._histogram(stage).record(now - started_ns)
+        return now
+
+    def timed(self, stage):
+        return _Timed(self, stage)
+
+    def snapshot(self):
+        def ms(value):
+            return None if value is None else round(value / 1e6, 3)
+
+        stages = {}
+        for stage, histogram in sorted(self._stages.items()):
+            q = histogram.quantiles()
+            stages[stage] = {
+                "count": histogram.count,
+                "total_ms": ms(histogram.total),
+                "mean_ms": ms(histogram.total / histogram.count) if histogram.count else None,
+                "p50_ms": ms(q[0.5]),
+                "p90_ms": ms(q[0.9]),
+                "p99_ms": ms(q[0.99]),
+                "max_ms": ms(histogram.max),
+            }
+        return {"namespace": self.namespace, "uptime_s": round(time.time() - self.started_at, 1), "stages": stages}
+
+    def prometheus(self):
+        name = f"{self.namespace}_stage_seconds"
+        lines = [f"# HELP {name} Duration of each {self.namespace} hot-path stage.", f"# TYPE {name} summary"]
+        for stage, histogram in sorted(self._stages.items()):
+            for q, value in sorted(histogram.quantiles().items()):
+                if value is not None:
+                    lines.append(f'{name}{{stage="{stage}",quantile="{q}"}} {value / 1e9:.9f}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.total / 1e9:.9f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+        lines.append(f"# TYPE {name}_max gauge")
+        for stage, histogram in sorted(self._stages.items()):
+            lines.append(f'{name}_max{{stage="{stage}"}} {histogram.max / 1e9:.9f}')
+        return "\n".join(lines) + "\n"
+
+    def summary(self, stages=None):
+        s = self.snapshot()["stages"]
+        parts = [
+            f"{stage} {s[stage]['p50_ms']:.1f}/{s[stage]['p99_ms']:.1f}"
+            for stage in (stages or s) if stage in s
+        ]
+        return f"📊 Stages p50/p99 ms: {', '.join(parts) or 'no samples yet'}"
+
+
+# -----------------------------------------------------------------------------
+# Endpoint (Prometheus text on /metrics, JSON on /metrics.json)
+# -----------------------------------------------------------------------------
+def metrics_response(path, registries):
+    """(content_type, body) for a metrics `path`, or None if `path` is not a metrics path."""
+    path = path.split("?", 1)[0].strip("/")
+    if path == "metrics":
+        return "text/plain; version=0.0.4", "".join(r.prometheus() for r in registries).encode("utf-8")
+    if path == "metrics.json":
+        body = json.dumps({r.namespace: r.snapshot() for r in registries}, separators=(",", ":"))
+        return "application/json", body.encode("utf-8")
+    return None
+
+
+def serve_metrics(registries, port):
+    """Serve `registries` on 127.0.0.1:`port` from a daemon thread. Returns the server (None if it could not bind)."""
+    # http.server is only imported when the endpoint is enabled (it is slow to import)
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    registries = tuple(registries)
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            response = metrics_response(self.path, registries)
+            if response is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+            content_type, body = response
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # quiet
+
+    try:
+        server = ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+    except OSError as e:
+        print(f"⚠️ Metrics endpoint on port {port} unavailable: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"   Metrics: http://127.0.0.1:{port}/metrics (Prometheus) and /metrics.json")
+    return server
+
+
+def metrics_port_from_env():
+    return int(os.environ.get("MT5_COPIER_METRICS_PORT", "0"))
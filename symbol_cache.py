@@ -0,0 +1,112 @@
+"""
+Per-symbol contract cache for the slave account.
+
+Built once at startup for every slave_symbol in symbol_mapping.csv: each symbol
+is selected in Market Watch once and its contract specification is kept in
+memory, so the order paths need no symbol_select / symbol_info call per trade
+(only the one symbol_info_tick for the price).
+
+An entry is reloaded when it is older than `refresh_interval`, or at once when
+an order on the symbol failed in a way that suggests the contract changed
+(invalidate()).
+
+With `metrics` (a stage_metrics.StageMetrics) the symbol_select + symbol_info
+of every load is timed as the "symbol_select" stage.
+
+All calls must be made while the terminal is logged into the slave account.
+"""
+
+import time
+from collections import namedtuple
+
+import MetaTrader5 as mt5
+
+# How long a contract entry is trusted before it is reloaded (seconds)
+REFRESH_INTERVAL = 300.0
+
+SYMBOL_TRADE_MODE_DISABLED = getattr(mt5, "SYMBOL_TRADE_MODE_DISABLED", 0)
+SYMBOL_TRADE_MODE_CLOSEONLY = getattr(mt5, "SYMBOL_TRADE_MODE_CLOSEONLY", 3)
+
+# filling_mode is the symbol_info() bitmask (SYMBOL_FILLING_FOK=1, SYMBOL_FILLING_IOC=2),
+# not an ORDER_FILLING_* value.
+SymbolContract = namedtuple("SymbolContract", [
+    "symbol", "digits", "volume_min", "volume_step", "volume_max",
+    "filling_mode", "stops_level", "trade_mode", "loaded_at",
+])
+
+
+def normalize_volume(contract, volume):
+    """Round `volume` down to the symbol's volume step and clamp it to [volume_min, volume_max]."""
+    step = contract.volume_step or 0.01
+    steps = int(volume / step + 1e-9)
+    volume = round(steps * step, 8)
+    if volume < contract.volume_min:
+        volume = contract.volume_min
+    if contract.volume_max and volume > contract.volume_max:
+        volume = contract.volume_max
+    return volume
+
+
+def can_open(contract):
+    return contract.trade_mode not in (SYMBOL_TRADE_MODE_DISABLED, SYMBOL_TRADE_MODE_CLOSEONLY)
+
+
+class SymbolContractCache:
+    def __init__(self, refresh_interval=REFRESH_INTERVAL, clock=time.monotonic, metrics=None):
+        self.refresh_interval = refresh_interval
+        self._clock = clock
+        self._metrics = metrics
+        self._contracts = {}
+        self.loads = 0
+
+    def warm(self, symbols):
+        """Select and load every symbol in `symbols`. Returns the ones that could not be loaded."""
+        failed = [symbol for symbol in dict.fromkeys(symbols) if self._load(symbol) is None]
+        if failed:
+            print(f"⚠️ Slave symbols not available: {', '.join(failed)}")
+        print(f"ℹ️ Cached contract specs for {len(self._contracts)} slave symbol(s).")
+        return failed
+
+    def get(self, symbol):
+        """Contract for `symbol` (loaded on first use or when stale), or None if the terminal has no such symbol."""
+        contract = self._contracts.get(symbol)
+        if contract is None or self._clock() - contract.loaded_at >= self.refresh_interval:
+            contract = self._load(symbol)
+        return contract
+
+    def invalidate(self, symbol):
+        """Drop `symbol` so the next get() selects and reloads it."""
+        self._contracts.pop(symbol, None)
+
+    def _load(self, symbol):
+        self.loads += 1
+        started = time.perf_counter_ns()
+        selected = mt5.symbol_select(symbol, True)
+        info = mt5.symbol_info(symbol) if selected else None
+        if self._metrics is not None:
+            self._metrics.since("symbol_select", started)
+        if info is None:
+            self._contracts.pop(symbol, None)
+            return None
+        contract = SymbolContract(
+            symbol=symbol,
+            digits=info.digits,
+            volume_min=info.volume_min,
+            volume_step=info.volume_step,
+            volume_max=info.volume_max,
+            filling_mode=info.filling_mode,
+            stops_level=info.trade_stops_level,
+            trade_mode=info.trade_mode,
+            loaded_at=self._clock(),
+        )
+        self._contracts[symbol] = contract
+        return contract
+
+    def contracts(self):
+        return list(self._contracts.values())
+
+    def __contains__(self, symbol):
+        return symbol in self._contracts
+
+    def __len__(self):
+        return len(self._contracts)
@@ -0,0 +1,427 @@
+"""
+Compiled master → slave symbol mapping with hot reload.
+
+symbol_mapping.csv (master_symbol, slave_symbol, slave_lot) may hold, besides
+plain rows, rules with wildcards in master_symbol:
+
+    master_symbol,slave_symbol,slave_lot
+    EURUSD-STDc,EURUSD.c,1            exact row
+    *-STDc,*.c,1                      suffix rule: XAUUSD-STDc → XAUUSD.c
+    US30*,US30,0.5                    prefix rule: US30-STDc / US30.cash → US30
+    GER*-STDc,DE40*,1                 prefix + suffix rule
+    *[AB]USD?,*,1                     any other fnmatch pattern (* ? [..])
+
+A `*` in slave_symbol is replaced by what the master symbol's `*` matched
+(rules with one `*`) or left as is. Precedence: exact rows, then one-`*`
+rules by the length of their literal part (most specific first), then the
+other patterns in file order.
+
+SymbolMapping compiles the rows once: exact rows in a dict, one-`*` rules in
+a trie over their prefix (each node holding its suffix rules, longest
+first), other patterns as regexes. Every lookup result (also "not mapped")
+is cached per master symbol, so the copy loop pays a dict lookup per trade.
+A SymbolMapping is never modified; a reload builds a new one.
+
+MappingWatcher keeps the current SymbolMapping of one CSV file. A daemon
+thread checks the file's mtime and size every `check_interval` seconds and
+swaps a freshly compiled table in with one attribute assignment, so a loop
+that reads `watcher.mapping` once per pass never sees a half-built table
+and never waits for a reload. A file that fails to parse (e.g. caught while
+being written) keeps the previous table.
+
+The dashboard also pushes its edits to a running copier directly:
+serve_mapping_control() accepts the new CSV on PUT /mapping (127.0.0.1 only,
+MT5_COPIER_CONTROL_PORT) and MappingWatcher.apply() swaps it in the same way,
+so the change takes effect on the next pass without waiting for the file
+check. The pushed table has the version of the bytes the dashboard then
+writes to the file, so the file check that follows does not load it again.
+
+Environment:
+    MT5_COPIER_CONTROL_PORT   mapping control endpoint on 127.0.0.1 (default 0 = off)
+
+Run `python symbol_mapper.py --bench` for lookup and reload timings.
+"""
+
+import csv
+import fnmatch
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+
+COLUMNS = ("master_symbol", "slave_symbol", "slave_lot")
+# How often the watcher checks symbol_mapping.csv for changes (seconds)
+CHECK_INTERVAL = 1.0
+_GLOB_CHARS = "*?["
+
+
+class MappingError(ValueError):
+    pass
+
+
+class _Rule:
+    __slots__ = ("prefix", "suffix", "slave_symbol", "slave_lot", "literal")
+
+    def __init__(self, prefix, suffix, slave_symbol, slave_lot):
+        self.prefix = prefix
+        self.suffix = suffix
+        self.slave_symbol = slave_symbol
+        self.slave_lot = slave_lot
+        self.literal = len(prefix) + len(suffix)
+
+    def apply(self, symbol):
+        captured = symbol[len(self.prefix):len(symbol) - len(self.suffix)]
+        return {"slave_symbol": self.slave_symbol.replace("*", captured), "slave_lot": self.slave_lot}
+
+
+class _TrieNode:
+    __slots__ = ("children", "rules")
+
+    def __init__(self):
+        self.children = {}
+        self.rules = []  # _Rule ending their prefix here, longest suffix first
+
+
+def parse_rows(text):
+    """[(master_symbol, slave_symbol, slave_lot)] from CSV text; raises MappingError."""
+    reader = csv.DictReader(io.StringIO(text))
+    if reader.fieldnames is None or not all(c in reader.fieldnames for c in COLUMNS):
+        raise MappingError("CSV file must contain 'master_symbol', 'slave_symbol', and 'slave_lot' columns.")
+    rows = []
+    for line, row in enumerate(reader, start=2):
+        master, slave = (row["master_symbol"] or "").strip(), (row["slave_symbol"] or "").strip()
+        if not master and not slave:
+            continue
+        try:
+            rows.append((master, slave, float(row["slave_lot"])))
+        except (TypeError, ValueError):
+            raise MappingError(f"line {line}: slave_lot {row['slave_lot']!r} is not a number")
+    return rows
+
+
+class SymbolMapping:
+    """
+    Read-only master_symbol → {"slave_symbol", "slave_lot"} lookup.
+    Supports `in`, [], get(), and items() / values() / len() over the exact rows.
+    """
+
+    def __init__(self, rows=(), version=""):
+        self.version = version
+        self._rows = list(rows)
+        self._exact = {}
+        self._root = _TrieNode()
+        self._patterns = []  # (compiled regex, slave_symbol, slave_lot)
+        self._cache = {}
+        self.rules = 0
+        for master, slave, lot in self._rows:
+            if not any(c in master for c in _GLOB_CHARS):
+                self._exact[master] = {"slave_symbol": slave, "slave_lot": lot}
+            elif master.count("*") == 1 and not any(c in master for c in "?["):
+                prefix, suffix = master.split("*")
+                node = self._root
+                for char in prefix:
+                    node = node.children.setdefault(char, _TrieNode())
+                node.rules.append(_Rule(prefix, suffix, slave, lot))
+                self.rules += 1
+            else:
+                self._patterns.append((re.compile(fnmatch.translate(master)), slave, lot))
+                self.rules += 1
+        self._sort(self._root)
+
+    def _sort(self, root):
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            node.rules.sort(key=lambda r: len(r.suffix), reverse=True)
+            stack.extend(node.children.values())
+
+    @classmethod
+    def from_csv(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Mapping of CSV file contents; the version is a hash of the bytes (raises MappingError)."""
+        return cls(parse_rows(data.decode("utf-8-sig")), hashlib.sha1(data).hexdigest()[:12])
+
+    def lookup(self, symbol):
+        try:
+            return self._cache[symbol]
+        except KeyError:
+            pass
+        result = self._exact.get(symbol)
+        if result is None:
+            result = self._match_rule(symbol)
+        self._cache[symbol] = result
+        return result
+
+    def _match_rule(self, symbol):
+        best = None
+        node = self._root
+        depth = 0
+        while True:
+            for rule in node.rules:
+                if len(symbol) >= rule.literal and symbol.endswith(rule.suffix):
+                    if best is None or rule.literal > best.literal:
+                        best = rule
+                    break  # the rest of this node's rules have shorter suffixes
+            if depth == len(symbol):
+                break
+            node = node.children.get(symbol[depth])
+            if node is None:
+                break
+            depth += 1
+        if best is not None:
+            return best.apply(symbol)
+        for regex, slave, lot in self._patterns:
+            if regex.match(symbol):
+                return {"slave_symbol": slave, "slave_lot": lot}
+        return None
+
+    def scaled(self, multiplier):
+        """A copy with every slave_lot multiplied by `multiplier`."""
+        if multiplier == 1.0:
+            return self
+        return SymbolMapping([(m, s, lot * multiplier) for m, s, lot in self._rows], self.version)
+
+    def rows(self):
+        return list(self._rows)
+
+    def __contains__(self, symbol):
+        return self.lookup(symbol) is not None
+
+    def __getitem__(self, symbol):
+        result = self.lookup(symbol)
+        if result is None:
+            raise KeyError(symbol)
+        return result
+
+    def get(self, symbol, default=None):
+        result = self.lookup(symbol)
+        return default if result is None else result
+
+    def items(self):
+        return self._exact.items()
+
+    def values(self):
+        return self._exact.values()
+
+    def __len__(self):
+        return len(self._exact) + self.rules
+
+    def __bool__(self):
+        return bool(self._rows)
+
+
+def load_mapping(path):
+    """SymbolMapping of `path`; prints the problem and returns an empty mapping if it cannot be read."""
+    try:
+        return SymbolMapping.from_csv(path)
+    except MappingError as e:
+        print(f"❌ {path}: {e}")
+    except Exception as e:
+        print(f"❌ Error reading CSV file: {e}")
+    return SymbolMapping()
+
+
+def _file_key(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class MappingWatcher:
+    """Current SymbolMapping of `path` (attribute `mapping`), reloaded in the background when the file changes."""
+
+    def __init__(self, path, lot_multiplier=1.0, check_interval=CHECK_INTERVAL):
+        self.path = path
+        self.lot_multiplier = lot_multiplier
+        self.check_interval = check_interval
+        self.reloads = 0
+        self.pushes = 0
+        self.last_reload_ms = None
+        self._key = _file_key(path)
+        self.mapping = load_mapping(path).scaled(lot_multiplier)
+        self._swap_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="mapping-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.check_interval):
+            self.check()
+
+    def check(self):
+        """Reload if the file changed since the last load. Returns True if a new table was swapped in."""
+        key = _file_key(self.path)
+        if key is None or key == self._key:
+            return False
+        pushes = self.pushes
+        started = time.perf_counter()
+        try:
+            mapping = SymbolMapping.from_csv(self.path)
+        except Exception as e:
+            self._key = key  # warn once per change, not on every check until the file is fixed
+            print(f"⚠️ {self.path} changed but could not be loaded ({e}); keeping the previous mapping.")
+            return False
+        if _file_key(self.path) != key:
+            return False  # still being written: try again next check
+        with self._swap_lock:
+            if self.pushes != pushes:
+                return False  # a newer table was pushed while this one loaded: check again next time
+            self._key = key
+            if mapping.version == self.mapping.version:
+                return False
+            self.mapping = mapping.scaled(self.lot_multiplier)
+            self.reloads += 1
+        self.last_reload_ms = (time.perf_counter() - started) * 1000.0
+        print(
+            f"🔄 Reloaded {self.path}: {len(mapping.items())} symbol(s), {mapping.rules} rule(s) "
+            f"in {self.last_reload_ms:.1f} ms (version {mapping.version})."
+        )
+        return True
+
+    def apply(self, data):
+        """Swap in the mapping of pushed CSV bytes (raises MappingError, keeping the current one). Returns it."""
+        mapping = SymbolMapping.from_bytes(data)
+        with self._swap_lock:
+            self.pushes += 1
+            if mapping.version != self.mapping.version:
+                self.mapping = mapping.scaled(self.lot_multiplier)
+        print(
+            f"🔄 Mapping pushed from the dashboard: {len(mapping.items())} symbol(s), {mapping.rules} rule(s) "
+            f"(version {mapping.version})."
+        )
+        return mapping
+
+
+# -----------------------------------------------------------------------------
+# Control endpoint (PUT /mapping: new symbol_mapping.csv contents, GET /mapping: current version)
+# -----------------------------------------------------------------------------
+def serve_mapping_control(watcher, port):
+    """Serve PUT / GET /mapping for `watcher` on 127.0.0.1:`port` from a daemon thread (None if it could not bind)."""
+    # http.server is only imported when the endpoint is enabled (it is slow to import)
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MappingHandler(BaseHTTPRequestHandler):
+        def _reply(self, status, payload):
+            body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _summary(self, mapping):
+            return {"version": mapping.version, "symbols": len(mapping.items()), "rules": mapping.rules}
+
+        def do_GET(self):
+            if self.path.split("?", 1)[0].strip("/") != "mapping":
+                return self._reply(404, {"error": "not found"})
+            self._reply(200, self._summary(watcher.mapping))
+
+        def do_PUT(self):
+            if self.path.split("?", 1)[0].strip("/") != "mapping":
+                return self._reply(404, {"error": "not found"})
+            data = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            try:
+                mapping = watcher.apply(data)
+            except MappingError as e:
+                return self._reply(400, {"error": str(e)})
+            except UnicodeDecodeError as e:
+                return self._reply(400, {"error": f"not UTF-8: {e}"})
+            self._reply(200, self._summary(mapping))
+
+        def log_message(self, format, *args):
+            pass  # quiet
+
+    try:
+        server = ThreadingHTTPServer(("127.0.0.1", port), MappingHandler)
+    except OSError as e:
+        print(f"⚠️ Mapping control endpoint on port {port} unavailable: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mapping-control", daemon=True).start()
+    print(f"   Mapping control: http://127.0.0.1:{port}/mapping (dashboard edits apply on the next pass)")
+    return server
+
+
+def control_port_from_env():
+    return int(os.environ.get("MT5_COPIER_CONTROL_PORT", "0"))
+
+
+# -----------------------------------------------------------------------------
+# Benchmark: python symbol_mapper.py --bench [--symbols 10000]
+# -----------------------------------------------------------------------------
+def _bench(symbols=10000, lookups=200000):
+    import random
+    import tempfile
+
+    rng = random.Random(1)
+    names = [f"SYM{i:05d}" for i in range(symbols)]
+    lines = ["master_symbol,slave_symbol,slave_lot"]
+    lines += [f"{n}-STDc,{n}.c,1" for n in names]
+    lines += ["*-ECN,*.e,1", "IDX*,IDX,0.5", "GER*-STDc,DE40*,1", "*[XY]USD?,*,1"]
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "symbol_mapping.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+        started = time.perf_counter()
+        watcher = MappingWatcher(path)
+        load_ms = (time.perf_counter() - started) * 1000.0
+
+        queries = {
+            "exact": [f"{rng.choice(names)}-STDc" for _ in range(lookups)],
+            "suffix rule": [f"{rng.choice(names)}-ECN" for _ in range(lookups)],
+            "prefix rule": [f"IDX{rng.randrange(symbols)}" for _ in range(lookups)],
+            "unmapped": [f"{rng.choice(names)}-RAW" for _ in range(lookups)],
+        }
+        print(f"{symbols} exact rows + 4 rules: load + compile {load_ms:.1f} ms")
+        print(f"  {'lookup':<12} {'first (ns)':>10} {'cached (ns)':>11}")
+        for name, batch in queries.items():
+            mapping = SymbolMapping(watcher.mapping.rows())  # empty result cache
+            distinct = list(dict.fromkeys(batch))
+            started = time.perf_counter()
+            for symbol in distinct:
+                mapping.get(symbol)
+            first = (time.perf_counter() - started) / len(distinct) * 1e9
+            started = time.perf_counter()
+            for symbol in batch:
+                mapping.get(symbol)
+            cached = (time.perf_counter() - started) / len(batch) * 1e9
+            print(f"  {name:<12} {first:10.0f} {cached:11.0f}")
+
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("NEW-STDc,NEW.c,1\n")
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + 1))
+        watcher.check()
+        print(f"  reload after an edit: {watcher.last_reload_ms:.1f} ms (swap is one assignment)")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Symbol mapping lookup / reload benchmark")
+    parser.add_argument("--bench", action="store_true")
+    parser.add_argument("--symbols", type=int, default=10000)
+    args = parser.parse_args()
+    if args.bench:
+        _bench(args.symbols)
+    else:
+        mapping = load_mapping("symbol_mapping.csv")
+        print(f"{len(mapping.items())} symbol(s), {mapping.rules} rule(s), version {mapping.version}")